@@ -15,11 +15,16 @@ class Settings(BaseSettings):
     # 加密配置
     ENCRYPTION_KEY: str = "your-encryption-key-32-bytes-lo"
     FILE_ENCRYPTION_KEY: str = "your-file-encryption-key-32-bytes-long"
+    # 密钥轮换：轮换期间保留的旧密钥（逗号分隔），仅用于解密
+    ENCRYPTION_OLD_KEYS: str = ""
+    FILE_ENCRYPTION_OLD_KEYS: str = ""
+    BLIND_INDEX_KEY: Optional[str] = None  # 盲索引 HMAC 密钥，未配置时由 ENCRYPTION_KEY 派生
     
     # 文件上传配置
     UPLOAD_DIR: str = "./uploads"
     CONTRACT_STORAGE_DIR: Path = Path("./storage/contracts")
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
+    IMPORT_MAX_SIZE: int = 100 * 1024 * 1024  # 合同 Excel 导入文件的大小上限（字节）
     
     # OCR 配置
     OCR_ENABLED: bool = False
@@ -27,6 +32,40 @@ class Settings(BaseSettings):
     OCR_USE_GPU: bool = False
     POPPLER_PATH: Optional[str] = None  # Poppler 可执行文件路径（可选）
     OCR_MODEL_DIR: Optional[str] = None  # PaddleOCR 模型存储目录（可选，默认 ~/.paddleocr/）
+    OCR_BATCH_SIZE: int = 4  # 每次送入模型的页数（同时作为文本识别框的批大小）
+    # OCR 结果缓存：相同文件重复上传时跳过识别；超过保留天数或总容量（字节）时淘汰最久未使用的记录
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_MAX_AGE_DAYS: int = 90
+    OCR_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # OCR 工作进程数（每个进程加载一份模型，0 表示在 API 进程内识别）、排队上限、单个任务超时（秒）
+    # 使用 uvicorn --workers 时每个 API 进程各自启动一组工作进程
+    OCR_WORKERS: int = 1
+    OCR_QUEUE_SIZE: int = 16
+    OCR_TASK_TIMEOUT: int = 300
+
+    # 批量 OCR 上传：单批最多文件数（含压缩包内的文件）、单个 zip 及整个请求体的大小上限（字节）、同时识别的文件组数
+    OCR_BATCH_MAX_FILES: int = 500
+    OCR_BATCH_MAX_ARCHIVE_SIZE: int = 500 * 1024 * 1024
+    OCR_BATCH_PARALLELISM: int = 2
+
+    # 请求处理线程池大小：同步路由处理函数、同步依赖与 run_in_threadpool 共用（anyio 默认 40）
+    THREADPOOL_WORKERS: int = 40
+
+    # 后台任务配置
+    JOB_WORKERS: int = 2  # 导入/导出/OCR 后台任务的工作线程数
+    JOB_RETENTION_DAYS: int = 7  # 已结束任务（含导出文件与 OCR 识别草稿）的保留天数
+
+    # 仪表盘统计缓存时间（秒），合同或审批任务变更时会提前失效
+    DASHBOARD_CACHE_TTL: int = 30
+
+    # 批量导出时解密敏感字段的线程数
+    DECRYPT_WORKERS: int = 4
+
+    # 附件解密缓存：总容量与单个文件上限（字节）、过期时间（秒），总容量为 0 时关闭
+    ATTACHMENT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    ATTACHMENT_CACHE_MAX_FILE_BYTES: int = 10 * 1024 * 1024
+    ATTACHMENT_CACHE_TTL: int = 300
     
     class Config:
         env_file = ".env"
@@ -10,6 +10,9 @@ from app.models.workflow import WorkflowStage
 from app.models.notification import Notification, NotificationType
 from app.models.announcement import Announcement
 from app.models.contract_field_config import ContractFieldConfig
+from app.models.background_job import BackgroundJob, BackgroundJobFile
+from app.models.contract_stats import ContractStat
+from app.models.ocr_result_cache import OcrResultCache
 
 __all__ = [
     "Contract",
@@ -28,5 +31,9 @@ __all__ = [
     "NotificationType",
     "Announcement",
     "ContractFieldConfig",
+    "BackgroundJob",
+    "BackgroundJobFile",
+    "ContractStat",
+    "OcrResultCache",
 ]
 
@@ -0,0 +1,59 @@
+"""后台任务模型"""
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON, String, Text
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+def generate_uuid() -> str:
+    return str(uuid.uuid4())
+
+
+class BackgroundJob(Base):
+    """导入/导出/OCR 等耗时操作的后台任务记录"""
+    __tablename__ = "background_jobs"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    job_type = Column(String(20), nullable=False, index=True)  # import / export / ocr
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending / running / completed / failed
+    phase = Column(String(50))  # 当前阶段说明，如“解析 Excel”“写入数据库”
+    params = Column(JSON, default=dict)
+
+    # 进度
+    total = Column(Integer)
+    processed = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    errors = Column(JSON, default=list)
+
+    # 结果
+    result = Column(JSON)
+    result_file = Column(Text)  # 加密存储的结果文件相对路径
+    result_filename = Column(String(255))
+    result_media_type = Column(String(100))
+    error_message = Column(Text)
+
+    created_by = Column(String(36), ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    def __repr__(self) -> str:
+        return f"<BackgroundJob(id={self.id}, job_type={self.job_type}, status={self.status})>"
+
+
+class BackgroundJobFile(Base):
+    """
+    后台任务引用的存储文件（OCR 任务上传的合同文件）
+    识别草稿中的 file_url 指向这些文件，任务记录清理前计入引用，避免文件被释放或清理
+    """
+    __tablename__ = "background_job_files"
+
+    job_id = Column(String(36), ForeignKey("background_jobs.id", ondelete="CASCADE"), primary_key=True)
+    file_path = Column(String(500), primary_key=True, index=True)
+
+    def __repr__(self) -> str:
+        return f"<BackgroundJobFile(job_id={self.job_id}, file_path={self.file_path})>"
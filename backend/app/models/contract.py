@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Date, Text, DateTime
+from sqlalchemy import Column, String, Integer, Float, Date, Text, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -9,6 +9,10 @@ def generate_uuid():
 
 class Contract(Base):
     __tablename__ = "contracts"
+    __table_args__ = (
+        # 键集分页：ORDER BY created_at DESC, id DESC
+        Index("ix_contracts_created_at_id", "created_at", "id"),
+    )
 
     # 主键
     id = Column(String(36), primary_key=True, default=generate_uuid)
@@ -41,6 +45,11 @@ class Contract(Base):
     emergency_contact = Column(String(50))
     emergency_phone = Column(String(500))  # 加密存储
 
+    # 盲索引（明文的 HMAC），用于对加密字段精确查询
+    id_number_bidx = Column(String(64), index=True)
+    phone_number_bidx = Column(String(64), index=True)
+    emergency_phone_bidx = Column(String(64), index=True)
+
     # 教育信息
     education = Column(String(50))
     graduation_school = Column(String(100))
@@ -73,29 +82,31 @@ class Contract(Base):
     ocr_confidence = Column(Float, default=0.0)  # 平均置信度
 
     # 时间戳
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 键集分页依赖 (created_at, id) 全序，created_at 不允许为空
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    # 关系
+    # 关系（默认延迟加载，查询时通过 app.services.contract_service 中的加载策略显式选择）
     attachments = relationship(
         "ContractAttachment",
         back_populates="contract",
         cascade="all, delete-orphan",
-        lazy="joined"
+        order_by="ContractAttachment.uploaded_at.desc()",
+        lazy="select"
     )
     timelines = relationship(
         "ContractTimeline",
         back_populates="contract",
         cascade="all, delete-orphan",
         order_by="ContractTimeline.created_at",
-        lazy="joined"
+        lazy="select"
     )
     logs = relationship(
         "ContractLog",
         back_populates="contract",
         cascade="all, delete-orphan",
-        order_by="ContractLog.created_at",
-        lazy="joined"
+        order_by="ContractLog.created_at.desc()",
+        lazy="select"
     )
 
     def __repr__(self):
@@ -0,0 +1,30 @@
+"""合同统计汇总表模型"""
+from sqlalchemy import Boolean, Column, Float, Integer, String
+
+from app.database import Base
+
+
+class ContractStat(Base):
+    """
+    按 部门 / 在职状态 / 审批状态 / 合同到期月份 / 是否外聘 汇总的合同数量
+    由合同的增删改与导入增量维护，仪表盘等统计直接读取该表而不扫描 contracts
+    维度为空时统一存空字符串，保证联合主键可用于 ON CONFLICT 累加
+    """
+    __tablename__ = "contract_stats"
+
+    department = Column(String(50), primary_key=True, default="")
+    job_status = Column(String(20), primary_key=True, default="")
+    approval_status = Column(String(20), primary_key=True, default="")
+    end_month = Column(String(7), primary_key=True, default="")  # YYYY-MM
+    is_external = Column(Boolean, primary_key=True, default=False)  # 职务包含“外聘”
+
+    contract_count = Column(Integer, nullable=False, default=0)
+    # 用于计算平均 OCR 置信度（忽略空值）
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ContractStat(department={self.department}, job_status={self.job_status}, "
+            f"approval_status={self.approval_status}, end_month={self.end_month}, count={self.contract_count})>"
+        )
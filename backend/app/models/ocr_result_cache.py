@@ -0,0 +1,23 @@
+"""OCR 识别结果缓存模型"""
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class OcrResultCache(Base):
+    """
+    按文件内容 SHA-256 与 OCR 引擎版本缓存的识别文本行
+    文本行包含身份证号等敏感信息，加密后存储；重复上传同一文件时跳过识别，只重新解析字段
+    """
+    __tablename__ = "ocr_result_cache"
+
+    checksum = Column(String(64), primary_key=True)
+    engine_version = Column(String(100), primary_key=True)
+    text_lines = Column(Text, nullable=False)  # 加密后的 JSON：[[文本, 置信度], ...]
+    size = Column(Integer, nullable=False)  # 密文字节数，用于按容量淘汰
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self) -> str:
+        return f"<OcrResultCache(checksum={self.checksum}, engine_version={self.engine_version})>"
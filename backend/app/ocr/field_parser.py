@@ -1,21 +1,144 @@
 import re
+from collections import deque
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from dateutil import parser as date_parser
 
+# 字段定义：(字段名, 标签（按优先级）, 值类型)，按顺序解析
+# 值类型：text 原样保存；date 解析为 YYYY-MM-DD；int 取整数
+FIELD_LABELS: List[Tuple[str, Tuple[str, ...], str]] = [
+    ('teacher_code', ('员工工号', '工号', '员工编号'), 'text'),
+    ('name', ('姓名',), 'text'),
+    ('gender', ('性别',), 'text'),
+    ('age', ('年龄',), 'int'),
+    ('nation', ('民族',), 'text'),
+    ('id_number', ('身份证号码', '身份证号', '证件号码'), 'text'),
+    ('birthplace', ('籍贯',), 'text'),
+    ('political_status', ('政治面貌', '党派'), 'text'),
+    ('department', ('部门', '所在部门'), 'text'),
+    ('position', ('职务', '岗位'), 'text'),
+    ('entry_date', ('入职日期', '入职时间'), 'date'),
+    ('regular_date', ('转正日期', '转正时间'), 'date'),
+    ('contract_start', ('合同开始日', '合同起始日期', '合同生效日期'), 'date'),
+    ('contract_end', ('合同到期日', '合同终止日期', '合同结束日'), 'date'),
+    ('job_status', ('在职状态', '工作状态'), 'text'),
+    ('resign_date', ('离职日期', '离职时间'), 'date'),
+    ('phone_number', ('电话号码', '手机号码', '联系电话'), 'text'),
+    ('education', ('最高学历', '学历'), 'text'),
+    ('graduation_school', ('毕业院校', '毕业学校'), 'text'),
+    ('major', ('专业', '所学专业'), 'text'),
+    ('degree', ('学位',), 'text'),
+    ('graduation_date', ('毕业时间', '毕业日期'), 'date'),
+    ('diploma_no', ('毕业证号', '毕业证编号'), 'text'),
+    ('degree_no', ('学位证号', '学位证编号'), 'text'),
+    ('teacher_cert_no', ('教师资格证号', '教师资格证'), 'text'),
+    ('teacher_cert_type', ('教师资格种类', '教师资格类型'), 'text'),
+    ('title_rank', ('职称等级', '职称'), 'text'),
+    ('title_cert_no', ('职称证号', '职称证书编号'), 'text'),
+    ('title_cert_date', ('职称取证时间', '取证日期'), 'date'),
+    ('teaching_subject', ('任教学科', '学科'), 'text'),
+    ('teaching_grade', ('任教年级', '年级'), 'text'),
+    ('address', ('家庭住址', '住址', '现住址'), 'text'),
+    ('emergency_contact', ('紧急联系人',), 'text'),
+    ('emergency_phone', ('联系电话', '紧急联系电话'), 'text'),
+    ('start_work_date', ('参加工作时间', '参加工作日期'), 'date'),
+    ('teaching_years', ('教龄',), 'int'),
+    ('last_work', ('上一份工作经历', '上一单位', '原工作单位'), 'text'),
+    ('psychology_cert', ('心理证', '心理咨询师证书'), 'text'),
+    ('certificate_type', ('持证类别', '证书类别'), 'text'),
+    ('mandarin_level', ('普通话等级', '普通话水平'), 'text'),
+    ('remarks', ('备注',), 'text'),
+]
+
+# 表格中的分类表头，不能作为字段值
+SECTION_HEADERS = frozenset(['分类', '字段', '数据示例', '基础信息', '入职信息', '教育背景', '资格证书', '工作信息', '其他'])
+
+_DATE_PATTERNS = [
+    re.compile(r'(\d{4})[年\-/](\d{1,2})[月\-/](\d{1,2})'),
+    re.compile(r'(\d{4})\.(\d{1,2})\.(\d{1,2})'),
+]
+_INTEGER_PATTERN = re.compile(r'\d+')
+
+
+class LabelMatcher:
+    """Aho-Corasick 自动机：一次扫描找出文本中出现的全部标签（包括相互包含的标签，如“学位”与“学位证号”）"""
+
+    def __init__(self, labels: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+        for label in labels:
+            state = 0
+            for char in label.lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                    self._goto[state][char] = next_state
+                state = next_state
+            if label not in self._output[state]:
+                self._output[state] += (label,)
+
+        # 按层构建失败指针，并把失败状态的输出并入当前状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[str]:
+        """返回 text 中出现的标签（忽略大小写）"""
+        found: Set[str] = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                found.update(self._output[state])
+        return found
+
+
+_LABEL_MATCHER = LabelMatcher(label for _, labels, _ in FIELD_LABELS for label in labels)
+
+
+def _inline_value_pattern(label: str) -> re.Pattern:
+    """冒号格式：标签与值在同一行，如“姓名：张三”"""
+    return re.compile(re.escape(label) + r'\s*[:：]\s*(\S.*)', re.IGNORECASE)
+
+
+_INLINE_VALUE_PATTERNS = {
+    label: _inline_value_pattern(label)
+    for _, labels, _ in FIELD_LABELS
+    for label in labels
+}
+
+
 class FieldParser:
     """字段解析器：从 OCR 文本中提取结构化字段"""
-    
+
     def __init__(self, text_lines: list):
         """
         初始化解析器
         text_lines: [(text, confidence), ...]
+        一次扫描全部文本行，建立 标签 -> 所在行号 的索引，之后按字段查找只访问命中的行
         """
         self.text_lines = text_lines
         self.full_text = '\n'.join([text for text, _ in text_lines])
         self.confidence_map = {text: conf for text, conf in text_lines}
-    
+        self.label_index: Dict[str, List[int]] = {}
+        for index, (text, _) in enumerate(text_lines):
+            for label in _LABEL_MATCHER.find(text):
+                self.label_index.setdefault(label, []).append(index)
+
     def extract_field(
         self,
         patterns: list[str],
@@ -23,49 +146,75 @@ class FieldParser:
         flags: int = re.IGNORECASE,
     ) -> Tuple[Optional[str], float]:
         """
-        根据正则表达式列表提取字段
+        根据正则表达式列表提取字段（有分组时取第一个分组，否则取整个匹配）
         返回：(值, 置信度)
         """
         for pattern in patterns:
             match = re.search(pattern, self.full_text, flags)
             if match:
-                value = match.group(1).strip()
+                value = (match.group(1) if match.re.groups else match.group(0)).strip()
                 # 查找对应的置信度
                 confidence = self._find_confidence(value)
                 return value, confidence
         return default, 0.0
-    
+
+    def find_value_after_label(self, labels: Iterable[str]) -> Tuple[Optional[str], float]:
+        """
+        查找标签对应的值
+        先按表格形式（标签和值在相邻行）查找，找不到再按冒号格式（标签和值在同一行）查找
+        返回：(值, 置信度)
+        """
+        labels = tuple(labels)
+        for label in labels:
+            for index in self._lines_with(label):
+                if index + 1 < len(self.text_lines):
+                    next_text, next_conf = self.text_lines[index + 1]
+                    # 过滤掉"分类"、"字段"、"数据示例"这类表头
+                    if next_text.strip() and next_text not in SECTION_HEADERS:
+                        return next_text.strip(), next_conf
+
+        for label in labels:
+            pattern = _INLINE_VALUE_PATTERNS.get(label) or _inline_value_pattern(label)
+            for index in self._lines_with(label):
+                text, conf = self.text_lines[index]
+                match = pattern.search(text)
+                if match:
+                    return match.group(1).strip(), conf
+        return None, 0.0
+
+    def _lines_with(self, label: str) -> List[int]:
+        """标签所在的行号；不在 FIELD_LABELS 中的标签逐行查找"""
+        if label in _INLINE_VALUE_PATTERNS:
+            return self.label_index.get(label, [])
+        label = label.lower()
+        return [index for index, (text, _) in enumerate(self.text_lines) if label in text.lower()]
+
     def _find_confidence(self, value: str) -> float:
         """查找文本对应的置信度"""
         for text, conf in self.text_lines:
             if value in text:
                 return conf
         return 0.0
-    
+
     def parse_date(self, date_str: str) -> Optional[str]:
         """解析日期字符串，返回标准格式 YYYY-MM-DD"""
         if not date_str:
             return None
-        
+
         try:
             # 尝试多种日期格式
-            date_formats = [
-                r'(\d{4})[年\-/](\d{1,2})[月\-/](\d{1,2})',
-                r'(\d{4})\.(\d{1,2})\.(\d{1,2})',
-            ]
-            
-            for fmt in date_formats:
-                match = re.search(fmt, date_str)
+            for pattern in _DATE_PATTERNS:
+                match = pattern.search(date_str)
                 if match:
                     year, month, day = match.groups()
                     return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-            
+
             # 使用 dateutil 解析
             parsed_date = date_parser.parse(date_str, fuzzy=True)
             return parsed_date.strftime('%Y-%m-%d')
         except:
             return None
-    
+
     def extract_all_fields(self) -> Tuple[Dict[str, Any], Dict[str, float]]:
         """
         提取所有字段
@@ -80,224 +229,30 @@ class FieldParser:
             fields[key] = value
             if conf is not None:
                 confidence[key] = conf
-        
-        # 辅助函数：在列表中查找字段值（支持表格形式）
-        def find_value_after_label(label_patterns: list[str]) -> Tuple[Optional[str], float]:
-            """
-            在 text_lines 中查找标签后的值
-            适用于表格形式：标签和值在相邻行
-            """
-            for pattern in label_patterns:
-                for i, (text, conf) in enumerate(self.text_lines):
-                    if re.search(pattern, text, re.IGNORECASE):
-                        # 找到了标签，检查下一行是否是值
-                        if i + 1 < len(self.text_lines):
-                            next_text, next_conf = self.text_lines[i + 1]
-                            # 过滤掉"分类"、"字段"、"数据示例"这类表头
-                            if next_text.strip() and next_text not in ['分类', '字段', '数据示例', '基础信息', '入职信息', '教育背景', '资格证书', '工作信息', '其他']:
-                                return next_text.strip(), next_conf
-            # 如果表格形式没找到，尝试冒号格式
-            return self.extract_field(label_patterns)
-        
-        # 员工工号
-        value, conf = find_value_after_label([r'员工工号', r'工号', r'员工编号'])
-        set_field('teacher_code', value, conf)
-        
-        # 姓名
-        value, conf = find_value_after_label([r'姓名'])
-        set_field('name', value, conf)
-        
-        # 性别
-        value, conf = find_value_after_label([r'性别'])
-        set_field('gender', value, conf)
-        
-        # 年龄
-        value, conf = find_value_after_label([r'年龄'])
-        if value and value.isdigit():
-            set_field('age', int(value), conf)
-        
-        # 民族
-        value, conf = find_value_after_label([r'民族'])
-        set_field('nation', value, conf)
-        
-        # 身份证号
-        value, conf = find_value_after_label([r'身份证号码', r'身份证号', r'证件号码'])
-        if value:
-            set_field('id_number', value, conf)
+
+        for key, labels, kind in FIELD_LABELS:
+            value, conf = self.find_value_after_label(labels)
+            if not value:
+                continue
+
+            if kind == 'date':
+                set_field(key, self.parse_date(value), conf)
+            elif key == 'age':
+                if value.isdigit():
+                    set_field(key, int(value), conf)
+            elif kind == 'int':
+                # 尝试提取数字
+                match = _INTEGER_PATTERN.search(value)
+                if match:
+                    set_field(key, int(match.group(0)), conf)
+            else:
+                set_field(key, value, conf)
+
             # 如果没有年龄但有身份证号，尝试从身份证号计算
-            if 'age' not in fields:
+            if key == 'id_number' and 'age' not in fields:
                 calculated_age = self._calculate_age_from_id(value)
                 if calculated_age:
                     set_field('age', calculated_age, conf or 0.9)
-        
-        # 籍贯
-        value, conf = find_value_after_label([r'籍贯'])
-        set_field('birthplace', value, conf)
-        
-        # 政治面貌
-        value, conf = find_value_after_label([r'政治面貌', r'党派'])
-        set_field('political_status', value, conf)
-        
-        # 部门
-        value, conf = find_value_after_label([r'部门', r'所在部门'])
-        set_field('department', value, conf)
-        
-        # 职务
-        value, conf = find_value_after_label([r'职务', r'岗位'])
-        set_field('position', value, conf)
-        
-        # 入职日期
-        value, conf = find_value_after_label([r'入职日期', r'入职时间'])
-        if value:
-            parsed_date = self.parse_date(value)
-            if parsed_date:
-                set_field('entry_date', parsed_date, conf)
-
-        # 转正日期
-        value, conf = find_value_after_label([r'转正日期', r'转正时间'])
-        if value:
-            parsed_date = self.parse_date(value)
-            if parsed_date:
-                set_field('regular_date', parsed_date, conf)
-        
-        # 合同开始日期
-        value, conf = find_value_after_label([r'合同开始日', r'合同起始日期', r'合同生效日期'])
-        if value:
-            parsed_date = self.parse_date(value)
-            if parsed_date:
-                set_field('contract_start', parsed_date, conf)
-        
-        # 合同结束日期
-        value, conf = find_value_after_label([r'合同到期日', r'合同终止日期', r'合同结束日'])
-        if value:
-            parsed_date = self.parse_date(value)
-            if parsed_date:
-                set_field('contract_end', parsed_date, conf)
-
-        # 在职状态
-        value, conf = find_value_after_label([r'在职状态', r'工作状态'])
-        set_field('job_status', value, conf)
-
-        # 离职日期
-        value, conf = find_value_after_label([r'离职日期', r'离职时间'])
-        if value:
-            parsed_date = self.parse_date(value)
-            if parsed_date:
-                set_field('resign_date', parsed_date, conf)
-        
-        # 电话号码
-        value, conf = find_value_after_label([r'电话号码', r'手机号码', r'联系电话'])
-        set_field('phone_number', value, conf)
-        
-        # 最高学历
-        value, conf = find_value_after_label([r'最高学历', r'学历'])
-        set_field('education', value, conf)
-        
-        # 毕业院校
-        value, conf = find_value_after_label([r'毕业院校', r'毕业学校'])
-        set_field('graduation_school', value, conf)
-        
-        # 专业
-        value, conf = find_value_after_label([r'专业', r'所学专业'])
-        set_field('major', value, conf)
-        
-        # 学位
-        value, conf = find_value_after_label([r'学位'])
-        set_field('degree', value, conf)
-        
-        # 毕业时间
-        value, conf = find_value_after_label([r'毕业时间', r'毕业日期'])
-        if value:
-            parsed_date = self.parse_date(value)
-            if parsed_date:
-                set_field('graduation_date', parsed_date, conf)
-
-        # 毕业证号
-        value, conf = find_value_after_label([r'毕业证号', r'毕业证编号'])
-        set_field('diploma_no', value, conf)
-
-        # 学位证号
-        value, conf = find_value_after_label([r'学位证号', r'学位证编号'])
-        set_field('degree_no', value, conf)
-        
-        # 教师资格证号
-        value, conf = find_value_after_label([r'教师资格证号', r'教师资格证'])
-        set_field('teacher_cert_no', value, conf)
-        
-        # 教师资格种类
-        value, conf = find_value_after_label([r'教师资格种类', r'教师资格类型'])
-        set_field('teacher_cert_type', value, conf)
-        
-        # 职称等级
-        value, conf = find_value_after_label([r'职称等级', r'职称'])
-        set_field('title_rank', value, conf)
-
-        # 职称证号
-        value, conf = find_value_after_label([r'职称证号', r'职称证书编号'])
-        set_field('title_cert_no', value, conf)
-
-        # 职称取证时间
-        value, conf = find_value_after_label([r'职称取证时间', r'取证日期'])
-        if value:
-            parsed_date = self.parse_date(value)
-            if parsed_date:
-                set_field('title_cert_date', parsed_date, conf)
-        
-        # 任教学科
-        value, conf = find_value_after_label([r'任教学科', r'学科'])
-        set_field('teaching_subject', value, conf)
-        
-        # 任教年级
-        value, conf = find_value_after_label([r'任教年级', r'年级'])
-        set_field('teaching_grade', value, conf)
-        
-        # 家庭住址
-        value, conf = find_value_after_label([r'家庭住址', r'住址', r'现住址'])
-        set_field('address', value, conf)
-        
-        # 紧急联系人
-        value, conf = find_value_after_label([r'紧急联系人'])
-        set_field('emergency_contact', value, conf)
-        
-        # 紧急联系电话
-        value, conf = find_value_after_label([r'联系电话', r'紧急联系电话'])
-        set_field('emergency_phone', value, conf)
-
-        # 参加工作时间
-        value, conf = find_value_after_label([r'参加工作时间', r'参加工作日期'])
-        if value:
-            parsed_date = self.parse_date(value)
-            if parsed_date:
-                set_field('start_work_date', parsed_date, conf)
-
-        # 教龄
-        value, conf = find_value_after_label([r'教龄'])
-        if value:
-            # 尝试提取数字
-            match = re.search(r'(\d+)', value)
-            if match:
-                set_field('teaching_years', int(match.group(1)), conf)
-        
-        # 上一份工作经历
-        value, conf = find_value_after_label([r'上一份工作经历', r'上一单位', r'原工作单位'])
-        set_field('last_work', value, conf)
-
-        # 心理证
-        value, conf = find_value_after_label([r'心理证', r'心理咨询师证书'])
-        set_field('psychology_cert', value, conf)
-
-        # 持证类别
-        value, conf = find_value_after_label([r'持证类别', r'证书类别'])
-        set_field('certificate_type', value, conf)
-
-        # 普通话等级
-        value, conf = find_value_after_label([r'普通话等级', r'普通话水平'])
-        set_field('mandarin_level', value, conf)
-
-        # 备注
-        value, conf = find_value_after_label([r'备注'])
-        if value:
-            set_field('remarks', value.strip(), conf)
 
         # 如果未从文本解析出教龄但存在参加工作时间，自动计算
         if 'teaching_years' not in fields:
@@ -311,24 +266,24 @@ class FieldParser:
             fields['job_status'] = '在职'
 
         return fields, confidence
-    
+
     def _calculate_age_from_id(self, id_number: str) -> int:
         """从身份证号计算年龄"""
         if len(id_number) < 14:
             return 0
-        
+
         try:
             birth_year = int(id_number[6:10])
             birth_month = int(id_number[10:12])
             birth_day = int(id_number[12:14])
-            
+
             today = datetime.now()
             age = today.year - birth_year
-            
+
             # 如果还没到生日，年龄减1
             if today.month < birth_month or (today.month == birth_month and today.day < birth_day):
                 age -= 1
-            
+
             return age
         except:
             return 0
@@ -344,4 +299,3 @@ class FieldParser:
         if (today.month, today.day) < (parsed.month, parsed.day):
             years -= 1
         return max(years, 0)
-
@@ -1,50 +1,88 @@
 import logging
 import os
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class OCRRecognitionError(RuntimeError):
+    """部分页面渲染或识别失败，结果不完整"""
+
+
 class BaseOCREngine:
     """OCR 引擎抽象基类"""
 
     enabled: bool = True
+    # 识别结果缓存按该版本区分，升级 OCR 库或更换模型后旧缓存不再命中
+    version: str = "base"
 
     def process_image(self, image_path: str) -> List[Tuple[str, float]]:
         raise NotImplementedError
 
+    def process_batch(self, images: Sequence[Any]) -> List[List[Tuple[str, float]]]:
+        """批量识别多张图片，返回与输入顺序一致的逐张结果；默认逐张调用 process_image"""
+        return [self.process_image(image) for image in images]
+
     def process_pdf(self, pdf_path: str) -> List[Tuple[str, float]]:
         raise NotImplementedError
 
+    def count_pdf_pages(self, pdf_path: str) -> int:
+        raise NotImplementedError
+
+    def process_pdf_pages(self, pdf_path: str, first_page: int, last_page: int) -> List[Tuple[str, float]]:
+        """
+        识别 PDF 的指定页范围（页码从 1 开始，含首尾），供工作进程按页并行识别
+        任一页渲染或识别失败时抛出 OCRRecognitionError，不返回缺页的结果
+        """
+        raise NotImplementedError
+
     def process_file(self, file_path: str) -> List[Tuple[str, float]]:
         raise NotImplementedError
 
     def get_full_text(self, text_lines: List[Tuple[str, float]]) -> str:
         return '\n'.join([text for text, _ in text_lines])
 
+    def warm_up(self) -> bool:
+        """预先加载模型，返回引擎是否可用"""
+        return self.enabled
+
 
 class PaddleOCREngine(BaseOCREngine):
     """基于 PaddleOCR 的引擎实现"""
     
     enabled = True  # 标记为启用状态
 
-    def __init__(self):
+    def __init__(self, batch_size: Optional[int] = None):
         # 为避免导入 paddleocr 失败阻塞应用，这里延迟导入
         from paddleocr import PaddleOCR
         import pdf2image
 
         self.PaddleOCR = PaddleOCR
         self.pdf2image = pdf2image
+        self.version = self._detect_version()
         self.device = "gpu:0" if settings.OCR_USE_GPU else "cpu"
+        # 每次送入模型的页数，同时作为文本识别框的批大小
+        self.batch_size = max(batch_size or settings.OCR_BATCH_SIZE, 1)
         self._ocr = None
         self._init_error: Exception | None = None
         
         # 设置模型目录，避免每次下载
         self._setup_model_dir()
     
+    @staticmethod
+    def _detect_version() -> str:
+        from importlib import metadata
+
+        try:
+            library_version = metadata.version("paddleocr")
+        except metadata.PackageNotFoundError:
+            library_version = "unknown"
+        model = f"-{settings.OCR_MODEL_DIR}" if settings.OCR_MODEL_DIR else ""
+        return f"paddleocr-{library_version}-ch{model}"[:100]
+
     def _setup_model_dir(self):
         """设置 PaddleOCR 模型目录，避免重复下载"""
         # PaddleOCR 3.0 使用 PaddleX，模型保存在 ~/.paddlex 目录
@@ -92,6 +130,9 @@ class PaddleOCREngine(BaseOCREngine):
         logger.info("[OCR] 已设置 PADDLEX_HOME=%s", model_dir_str)
         logger.info("[OCR] 已设置 PADDLEOCR_HOME=%s", model_dir_str)
 
+    def warm_up(self) -> bool:
+        return self._ensure_ocr_initialized()
+
     def _ensure_ocr_initialized(self) -> bool:
         logger.info("[OCR] 检查 PaddleOCR 初始化状态...")
         
@@ -132,13 +173,16 @@ class PaddleOCREngine(BaseOCREngine):
             # 新版 PaddleOCR 使用 use_textline_orientation 替代 use_angle_cls
             try:
                 ocr_kwargs["use_textline_orientation"] = True
+                ocr_kwargs["text_recognition_batch_size"] = self.batch_size
                 logger.info("[OCR] 尝试使用新版 API (use_textline_orientation)")
                 self._ocr = self.PaddleOCR(**ocr_kwargs)
             except TypeError:
                 # 兼容旧版本
                 logger.warning("[OCR] 新版 API 不支持，尝试使用旧版 API (use_angle_cls)")
                 ocr_kwargs.pop("use_textline_orientation", None)
+                ocr_kwargs.pop("text_recognition_batch_size", None)
                 ocr_kwargs["use_angle_cls"] = True
+                ocr_kwargs["rec_batch_num"] = self.batch_size
                 self._ocr = self.PaddleOCR(**ocr_kwargs)
             
             logger.info("[OCR] *** PaddleOCR 初始化成功! device=%s, model_dir=%s ***", 
@@ -151,25 +195,69 @@ class PaddleOCREngine(BaseOCREngine):
 
     def process_image(self, image_path: str) -> List[Tuple[str, float]]:
         logger.info("[OCR] 开始处理图片: %s", image_path)
-        
+        return self._recognize(image_path, image_path) or []
+
+    def _recognize(self, image: Any, label: str) -> Optional[List[Tuple[str, float]]]:
+        """识别单张图片，image 为文件路径或 BGR 格式的 numpy 数组；识别失败返回 None"""
         if not self._ensure_ocr_initialized():
-            logger.error("[OCR] PaddleOCR 未初始化成功，无法处理图片 %s", image_path)
-            return []
+            logger.error("[OCR] PaddleOCR 未初始化成功，无法处理图片 %s", label)
+            return None
 
         try:
             logger.info("[OCR] 调用 PaddleOCR.ocr() 进行识别...")
             # 新版 PaddleOCR 不再支持 cls 参数，改为 use_textline_orientation
             try:
-                result = self._ocr.ocr(image_path, use_textline_orientation=True)
+                result = self._ocr.ocr(image, use_textline_orientation=True)
             except TypeError:
                 # 如果仍然不支持，则使用无参数调用
                 logger.warning("[OCR] 使用默认参数调用 ocr()")
-                result = self._ocr.ocr(image_path)
+                result = self._ocr.ocr(image)
 
-            if not result:
-                logger.warning("[OCR] OCR 返回结果为空")
-                return []
+            return self._parse_result(result)
+        except Exception as exc:
+            logger.exception("[OCR] OCR 处理图片失败: %s", exc)
+            return None
+
+    def process_batch(self, images: Sequence[Any]) -> List[List[Tuple[str, float]]]:
+        """
+        批量识别多张图片（文件路径或 BGR numpy 数组），一次送入 batch_size 张
+        旧版 PaddleOCR 不支持多图输入时逐张识别（文本识别框仍按 rec_batch_num 成批）
+        识别失败的图片返回空列表
+        """
+        return [lines or [] for lines in self._recognize_batch(images)]
+
+    def _recognize_batch(self, images: Sequence[Any]) -> List[Optional[List[Tuple[str, float]]]]:
+        """process_batch 的实现，识别失败的图片返回 None 以便与空白页区分"""
+        images = list(images)
+        if not images:
+            return []
+        if not self._ensure_ocr_initialized():
+            logger.error("[OCR] PaddleOCR 未初始化成功，无法批量处理 %d 张图片", len(images))
+            return [None for _ in images]
+
+        predict = getattr(self._ocr, "predict", None)
+        if predict is None:
+            return [self._recognize(image, f"batch[{idx}]") for idx, image in enumerate(images)]
+
+        results: List[Optional[List[Tuple[str, float]]]] = []
+        for start in range(0, len(images), self.batch_size):
+            chunk = images[start:start + self.batch_size]
+            try:
+                outputs = list(predict(chunk, use_textline_orientation=True))
+            except Exception as exc:
+                logger.exception("[OCR] 批量识别失败（第 %d-%d 张）: %s", start + 1, start + len(chunk), exc)
+                results.extend(None for _ in chunk)
+                continue
+            results.extend(self._parse_result([output]) for output in outputs)
+        return results
+
+    def _parse_result(self, result: Any) -> List[Tuple[str, float]]:
+        """把 PaddleOCR 单张图片的返回结果解析为 (文本, 置信度) 列表，兼容新旧版本的多种格式"""
+        if not result:
+            logger.warning("[OCR] OCR 返回结果为空")
+            return []
 
+        try:
             text_lines: List[Tuple[str, float]] = []
             
             # 调试：打印返回数据结构
@@ -264,9 +352,46 @@ class PaddleOCREngine(BaseOCREngine):
             logger.info("[OCR] 图片 OCR 完成，识别到 %d 行文本", len(text_lines))
             return text_lines
         except Exception as exc:
-            logger.exception("[OCR] OCR 处理图片失败: %s", exc)
+            logger.exception("[OCR] 解析 OCR 结果失败: %s", exc)
             return []
 
+    def _poppler_kwargs(self) -> dict:
+        # 如果配置了自定义 Poppler 路径，使用它，否则使用系统 PATH 中的 Poppler
+        return {"poppler_path": settings.POPPLER_PATH} if settings.POPPLER_PATH else {}
+
+    def count_pdf_pages(self, pdf_path: str) -> int:
+        info = self.pdf2image.pdfinfo_from_path(pdf_path, **self._poppler_kwargs())
+        return int(info["Pages"])
+
+    def render_pdf_pages(self, pdf_path: str, first_page: int, last_page: int) -> List[Any]:
+        """只渲染指定页范围，返回 PaddleOCR 可直接识别的 BGR numpy 数组"""
+        import numpy as np
+
+        images = self.pdf2image.convert_from_path(
+            pdf_path,
+            first_page=first_page,
+            last_page=last_page,
+            **self._poppler_kwargs(),
+        )
+        pages = []
+        for image in images:
+            with image:
+                pages.append(np.ascontiguousarray(np.asarray(image.convert("RGB"))[:, :, ::-1]))
+        return pages
+
+    def process_pdf_pages(self, pdf_path: str, first_page: int, last_page: int) -> List[Tuple[str, float]]:
+        try:
+            pages = self.render_pdf_pages(pdf_path, first_page, last_page)
+        except Exception as exc:
+            logger.exception("[OCR] PDF 第 %d-%d 页渲染失败: %s", first_page, last_page, exc)
+            raise OCRRecognitionError(f"PDF 第 {first_page}-{last_page} 页渲染失败") from exc
+        text_lines: List[Tuple[str, float]] = []
+        for page, page_lines in enumerate(self._recognize_batch(pages), start=first_page):
+            if page_lines is None:
+                raise OCRRecognitionError(f"PDF 第 {page} 页识别失败")
+            text_lines.extend(page_lines)
+        return text_lines
+
     def process_pdf(self, pdf_path: str) -> List[Tuple[str, float]]:
         logger.info("[OCR] 开始处理 PDF: %s", pdf_path)
         
@@ -275,29 +400,13 @@ class PaddleOCREngine(BaseOCREngine):
             return []
 
         try:
-            logger.info("[OCR] 将 PDF 转换为图片...")
-            
-            # 如果配置了自定义 Poppler 路径，使用它
-            poppler_path = settings.POPPLER_PATH
-            if poppler_path:
-                logger.info("[OCR] 使用自定义 Poppler 路径: %s", poppler_path)
-                images = self.pdf2image.convert_from_path(pdf_path, poppler_path=poppler_path)
-            else:
-                logger.info("[OCR] 使用系统 PATH 中的 Poppler")
-                images = self.pdf2image.convert_from_path(pdf_path)
-            
-            logger.info("[OCR] PDF 转换完成，共 %d 页", len(images))
-
+            page_count = self.count_pdf_pages(pdf_path)
             all_text_lines: List[Tuple[str, float]] = []
-            for idx, image in enumerate(images):
-                logger.info("[OCR] 正在处理第 %d/%d 页...", idx + 1, len(images))
-                temp_image_path = f"temp_page_{idx}.jpg"
-                image.save(temp_image_path, "JPEG")
-
-                text_lines = self.process_image(temp_image_path)
-                all_text_lines.extend(text_lines)
-
-                os.remove(temp_image_path)
+            # 每次只渲染并识别 batch_size 页，内存占用与总页数无关
+            for first_page in range(1, page_count + 1, self.batch_size):
+                last_page = min(first_page + self.batch_size - 1, page_count)
+                logger.info("[OCR] 正在处理第 %d-%d/%d 页...", first_page, last_page, page_count)
+                all_text_lines.extend(self.process_pdf_pages(pdf_path, first_page, last_page))
 
             logger.info("[OCR] PDF OCR 完成，共识别到 %d 行文本", len(all_text_lines))
             return all_text_lines
@@ -324,6 +433,7 @@ class DummyOCREngine(BaseOCREngine):
     """占位 OCR 引擎，实现空操作"""
 
     enabled = False
+    version = "disabled"
 
     def process_image(self, image_path: str) -> List[Tuple[str, float]]:
         logger.info("OCR 已禁用，跳过图片识别: %s", image_path)
@@ -333,6 +443,12 @@ class DummyOCREngine(BaseOCREngine):
         logger.info("OCR 已禁用，跳过 PDF 识别: %s", pdf_path)
         return []
 
+    def count_pdf_pages(self, pdf_path: str) -> int:
+        return 0
+
+    def process_pdf_pages(self, pdf_path: str, first_page: int, last_page: int) -> List[Tuple[str, float]]:
+        return []
+
     def process_file(self, file_path: str) -> List[Tuple[str, float]]:
         logger.info("OCR 已禁用，直接返回空结果: %s", file_path)
         return []
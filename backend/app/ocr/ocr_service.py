@@ -1,8 +1,12 @@
 import logging
-from typing import Dict, List, Tuple
+import math
+import os
+from typing import Dict, List, Optional, Tuple
 
 from app.config import settings
 from app.ocr.ocr_engine import ocr_engine
+from app.ocr.ocr_worker_pool import ocr_worker_pool
+from app.services.ocr_cache_service import OcrCacheService
 from app.ocr.field_parser import FieldParser
 
 logger = logging.getLogger(__name__)
@@ -12,9 +16,16 @@ class OCRService:
     """OCR 服务：协调 OCR 识别和字段解析"""
     
     @staticmethod
-    def process_contract_file(file_path: str) -> Tuple[Dict, Dict[str, float], str, List[str]]:
+    def process_contract_file(
+        file_path: str,
+        *,
+        wait: bool = False,
+        checksum: Optional[str] = None,
+    ) -> Tuple[Dict, Dict[str, float], str, List[str]]:
         """
         处理合同文件
+        相同内容（checksum 为文件 SHA-256，未提供时计算）识别过时直接使用缓存的文本行，只重新解析字段
+        OCR 工作进程已启动时在工作进程中识别：排队已满时 wait=False 抛出 OCRQueueFull，wait=True 等待空位
         返回：(字段字典, 置信度字典, 原始文本, 低置信字段)
         """
         logger.info("=" * 60)
@@ -27,10 +38,62 @@ class OCRService:
             logger.warning("[SERVICE] OCR 引擎 enabled=False，跳过识别")
             return {}, {}, "OCR 功能已禁用，未执行识别", []
 
-        logger.info("[SERVICE] 调用 ocr_engine.process_file(%s)", file_path)
-        text_lines = ocr_engine.process_file(file_path)
+        text_lines = None
+        if settings.OCR_CACHE_ENABLED:
+            checksum = checksum or OcrCacheService.file_checksum(file_path)
+            text_lines = OcrCacheService.get(checksum, ocr_engine.version)
+            if text_lines is not None:
+                logger.info("[SERVICE] 命中 OCR 结果缓存，跳过识别: %s", checksum)
+
+        if text_lines is None:
+            if ocr_worker_pool.running:
+                text_lines = OCRService.recognize_in_workers(file_path, wait=wait)
+            else:
+                logger.info("[SERVICE] 调用 ocr_engine.process_file(%s)", file_path)
+                text_lines = ocr_engine.process_file(file_path)
+            OCRService._store_in_cache(checksum, text_lines)
         logger.info("[SERVICE] ocr_engine.process_file 返回了 %d 行文本", len(text_lines))
-        
+
+        return OCRService.parse_text_lines(text_lines)
+
+    @staticmethod
+    def process_contract_images(
+        file_paths: List[str],
+        *,
+        wait: bool = False,
+        checksums: Optional[List[Optional[str]]] = None,
+    ) -> List[Tuple[Dict, Dict[str, float], str, List[str]]]:
+        """
+        批量处理多张合同图片：未命中缓存的图片一次送入引擎的 process_batch，结果与输入顺序一致
+        返回：每张图片的 (字段字典, 置信度字典, 原始文本, 低置信字段)
+        """
+        if not getattr(ocr_engine, "enabled", True):
+            return [({}, {}, "OCR 功能已禁用，未执行识别", []) for _ in file_paths]
+
+        checksums = list(checksums or [None] * len(file_paths))
+        batch_lines: List[Optional[List[Tuple[str, float]]]] = [None] * len(file_paths)
+        if settings.OCR_CACHE_ENABLED:
+            for index, file_path in enumerate(file_paths):
+                checksums[index] = checksums[index] or OcrCacheService.file_checksum(file_path)
+                batch_lines[index] = OcrCacheService.get(checksums[index], ocr_engine.version)
+
+        missing = [index for index, lines in enumerate(batch_lines) if lines is None]
+        if missing:
+            paths = [file_paths[index] for index in missing]
+            logger.info("[SERVICE] 批量识别 %d 张图片（缓存命中 %d 张）", len(paths), len(file_paths) - len(paths))
+            if ocr_worker_pool.running:
+                recognized = ocr_worker_pool.run("process_batch", paths, block=wait)
+            else:
+                recognized = ocr_engine.process_batch(paths)
+            for index, lines in zip(missing, recognized):
+                batch_lines[index] = lines
+                OCRService._store_in_cache(checksums[index], lines)
+
+        return [OCRService.parse_text_lines(lines or []) for lines in batch_lines]
+
+    @staticmethod
+    def parse_text_lines(text_lines: List[Tuple[str, float]]) -> Tuple[Dict, Dict[str, float], str, List[str]]:
+        """从识别出的文本行解析合同字段，返回：(字段字典, 置信度字典, 原始文本, 低置信字段)"""
         if not text_lines:
             logger.warning("[SERVICE] OCR 未识别到任何文本，返回空结果")
             return {}, {}, "", []
@@ -63,7 +126,48 @@ class OCRService:
         logger.info("=" * 60)
 
         return fields, confidence, raw_text, low_confidence
-    
+
+    @staticmethod
+    def _store_in_cache(checksum: Optional[str], text_lines: List[Tuple[str, float]]) -> None:
+        # 引擎出错时返回空列表（PDF 页段失败时抛出异常，不会走到这里），空结果不缓存，避免后续上传一直命中失败结果
+        if checksum and text_lines and settings.OCR_CACHE_ENABLED:
+            OcrCacheService.put(checksum, ocr_engine.version, text_lines)
+
+    @staticmethod
+    def recognize_in_workers(file_path: str, *, wait: bool = False) -> List[Tuple[str, float]]:
+        """
+        在 OCR 工作进程中识别：PDF 按页段拆分为独立任务并行识别（各进程只渲染自己的页段并批量推理），
+        按页码顺序合并；页段不超过 OCR_BATCH_SIZE，页数较少时缩小页段以便分摊到全部工作进程
+        首段按 wait 决定排队已满时是否失败，之后的页段等待空位，保证已接受的文件完整识别
+        """
+        if os.path.splitext(file_path)[1].lower() != ".pdf":
+            logger.info("[SERVICE] 提交到 OCR 工作进程: %s", file_path)
+            return ocr_worker_pool.run("process_file", file_path, block=wait)
+
+        page_count = ocr_engine.count_pdf_pages(file_path)
+        span = max(1, min(settings.OCR_BATCH_SIZE, math.ceil(page_count / max(ocr_worker_pool.workers, 1))))
+        logger.info("[SERVICE] PDF 共 %d 页，每 %d 页提交到 OCR 工作进程: %s", page_count, span, file_path)
+        futures = []
+        try:
+            for first_page in range(1, page_count + 1, span):
+                futures.append(ocr_worker_pool.submit(
+                    "process_pdf_pages",
+                    file_path,
+                    first_page,
+                    min(first_page + span - 1, page_count),
+                    block=wait or first_page > 1,
+                ))
+            text_lines: List[Tuple[str, float]] = []
+            for future in futures:
+                text_lines.extend(ocr_worker_pool.result(future))
+            return text_lines
+        except Exception:
+            # 任一页段失败或超时，该文件的识别结果已不可用，取消其余页段释放工作进程
+            for future in futures:
+                if not future.done():
+                    ocr_worker_pool.cancel(future)
+            raise
+
     @staticmethod
     def get_low_confidence_fields(confidence: Dict[str, float], threshold: float = 0.8) -> list:
         """获取置信度低于阈值的字段"""
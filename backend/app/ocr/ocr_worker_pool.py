@@ -0,0 +1,297 @@
+"""
+OCR 工作进程池：每个进程持有独立的 OCR 引擎实例并在启动时预热模型，
+识别任务在 API 进程中有界排队，逐个分发给空闲的工作进程
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import wait
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OCRQueueFull(RuntimeError):
+    """OCR 任务排队数已达上限"""
+
+
+class OCRWorkerError(RuntimeError):
+    """OCR 工作进程执行失败、超时或异常退出"""
+
+
+def _worker_main(worker_id: int, conn) -> None:
+    """工作进程入口：创建并预热引擎，然后循环执行任务，收到 None 或连接关闭时退出"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+    from app.ocr.ocr_engine import ocr_engine
+
+    conn.send(("ready", None, ocr_engine.warm_up()))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        task_id, method, args = task
+        try:
+            value = getattr(ocr_engine, method)(*args)
+        except Exception as exc:
+            logger.exception("[OCR-WORKER %d] 任务 %d 执行失败", worker_id, task_id)
+            conn.send(("failed", task_id, f"{type(exc).__name__}: {exc}"))
+        else:
+            conn.send(("done", task_id, value))
+
+
+class _Worker:
+    """工作进程及其专用管道（每个进程独占管道，进程被强制结束不会影响其他进程）"""
+
+    def __init__(self, worker_id: int, process, conn) -> None:
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = conn
+        self.ready = False
+        self.task_id: Optional[int] = None
+        # 已被强制结束、等待收集线程重启，不再分发任务
+        self.terminating = False
+
+
+class OCRWorkerPool:
+    """固定数量的 OCR 工作进程；工作进程异常退出时自动重启，并使其正在执行的任务失败"""
+
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, workers: int, max_queue: int, task_timeout: float) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.task_timeout = task_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, _Worker] = {}
+        self._backlog: Deque[Tuple[int, str, tuple]] = deque()
+        self._pending: Dict[int, Future] = {}
+        self._slots = threading.BoundedSemaphore(max(workers + max_queue, 1))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._collector: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._collector is not None
+
+    def start(self) -> None:
+        """启动全部工作进程，模型在各进程中后台加载，启动期间提交的任务排队等待"""
+        if self.running or self.workers <= 0:
+            return
+        self._stopping.clear()
+        with self._lock:
+            for worker_id in range(self.workers):
+                self._workers[worker_id] = self._spawn(worker_id)
+        self._collector = threading.Thread(target=self._collect, name="ocr-pool-collector", daemon=True)
+        self._collector.start()
+        logger.info("[OCR] 已启动 %d 个 OCR 工作进程，排队上限 %d", self.workers, self.max_queue)
+
+    def shutdown(self, timeout: float = 10) -> None:
+        """通知工作进程退出，超时未退出的强制结束；未完成的任务标记为失败"""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._collector.join(timeout)
+        self._collector = None
+        with self._lock:
+            workers = list(self._workers.values())
+            pending = list(self._pending.values())
+            self._workers.clear()
+            self._pending.clear()
+            self._backlog.clear()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        for future in pending:
+            self._finish(future, error="OCR 工作进程已停止")
+
+    def submit(self, method: str, *args: Any, block: bool = False) -> Future:
+        """
+        提交任务，在工作进程中调用引擎的 method(*args)
+        排队数已满时：block=False 立即抛出 OCRQueueFull，block=True 等待空位
+        """
+        if not self.running:
+            raise OCRWorkerError("OCR 工作进程未启动")
+        if not self._slots.acquire(blocking=block):
+            raise OCRQueueFull("OCR 任务排队已满，请稍后重试")
+        future: Future = Future()
+        with self._lock:
+            task_id = next(self._ids)
+            future.task_id = task_id
+            self._pending[task_id] = future
+            self._backlog.append((task_id, method, args))
+            self._dispatch()
+        return future
+
+    def run(self, method: str, *args: Any, block: bool = False) -> Any:
+        """提交任务并等待结果，超过 task_timeout 抛出 OCRWorkerError"""
+        return self.result(self.submit(method, *args, block=block))
+
+    def result(self, future: Future) -> Any:
+        """等待已提交任务的结果，超过 task_timeout 时取消任务并抛出 OCRWorkerError"""
+        try:
+            return future.result(timeout=self.task_timeout)
+        except FutureTimeoutError:
+            self.cancel(future)
+            raise OCRWorkerError(f"OCR 识别超时（{self.task_timeout} 秒）")
+
+    def cancel(self, future: Future) -> None:
+        """
+        取消任务：排队中的直接移除；执行中的强制结束所在工作进程，
+        由收集线程重启该进程、使任务失败并释放排队名额
+        """
+        task_id = getattr(future, "task_id", None)
+        with self._lock:
+            if task_id not in self._pending:
+                return
+            for index, task in enumerate(self._backlog):
+                if task[0] == task_id:
+                    del self._backlog[index]
+                    self._pending.pop(task_id)
+                    break
+            else:
+                for worker in self._workers.values():
+                    if worker.task_id == task_id and not worker.terminating:
+                        logger.warning("[OCR] 取消工作进程 %d 上执行中的任务 %d，强制结束该进程", worker.worker_id, task_id)
+                        worker.terminating = True
+                        worker.process.terminate()
+                return
+        self._finish(future, error="OCR 任务已取消")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            workers = list(self._workers.values())
+            return {
+                "workers": len(workers),
+                "ready": sum(1 for worker in workers if worker.ready),
+                "running": sum(1 for worker in workers if worker.task_id is not None),
+                "queued": len(self._backlog),
+                "max_queue": self.max_queue,
+            }
+
+    def _spawn(self, worker_id: int) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, child_conn),
+            name=f"ocr-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(worker_id, process, parent_conn)
+
+    def _dispatch(self) -> None:
+        """把排队的任务发给空闲的工作进程（调用方持有 _lock）"""
+        for worker in self._workers.values():
+            if not self._backlog:
+                return
+            if worker.task_id is not None or worker.terminating:
+                continue
+            task = self._backlog.popleft()
+            try:
+                worker.conn.send(task)
+            except OSError:
+                # 进程已退出，任务放回队首，由收集线程重启进程后重新分发
+                self._backlog.appendleft(task)
+                continue
+            worker.task_id = task[0]
+
+    def _finish(self, future: Future, *, value: Any = None, error: Optional[str] = None) -> None:
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(OCRWorkerError(error))
+        self._slots.release()
+
+    def _collect(self) -> None:
+        """收集线程：接收任务结果并分发后续任务；进程退出（sentinel 就绪）时重启"""
+        while not self._stopping.is_set():
+            with self._lock:
+                handles: Dict[Any, _Worker] = {}
+                for worker in self._workers.values():
+                    handles[worker.conn] = worker
+                    handles[worker.process.sentinel] = worker
+            for handle in wait(list(handles), timeout=self.POLL_INTERVAL):
+                worker = handles[handle]
+                if self._workers.get(worker.worker_id) is not worker:
+                    continue
+                if handle is worker.conn:
+                    try:
+                        message = worker.conn.recv()
+                    except (EOFError, OSError):
+                        self._restart(worker)
+                    else:
+                        self._handle(worker, message)
+                else:
+                    self._restart(worker)
+
+    def _handle(self, worker: _Worker, message: Tuple[str, Optional[int], Any]) -> None:
+        kind, task_id, payload = message
+        if kind == "ready":
+            worker.ready = True
+            if payload:
+                logger.info("[OCR] 工作进程 %d 模型加载完成", worker.worker_id)
+            else:
+                logger.warning("[OCR] 工作进程 %d 的 OCR 引擎不可用（已禁用或模型加载失败），识别将返回空结果", worker.worker_id)
+            return
+
+        with self._lock:
+            worker.task_id = None
+            future = self._pending.pop(task_id, None)
+            self._dispatch()
+        if future is None:
+            return
+        if kind == "done":
+            self._finish(future, value=payload)
+        else:
+            self._finish(future, error=payload)
+
+    def _restart(self, worker: _Worker) -> None:
+        # 先取走进程退出前已写入管道的结果
+        messages: List[Tuple[str, Optional[int], Any]] = []
+        try:
+            while worker.conn.poll():
+                messages.append(worker.conn.recv())
+        except (EOFError, OSError):
+            pass
+        for message in messages:
+            self._handle(worker, message)
+
+        worker.process.join(1)
+        if worker.terminating:
+            logger.info("[OCR] 工作进程 %d 已因任务取消结束，正在重启", worker.worker_id)
+        else:
+            logger.error("[OCR] 工作进程 %d 异常退出（exitcode=%s），正在重启", worker.worker_id, worker.process.exitcode)
+        worker.conn.close()
+        with self._lock:
+            future = self._pending.pop(worker.task_id, None) if worker.task_id is not None else None
+            self._workers[worker.worker_id] = self._spawn(worker.worker_id)
+            self._dispatch()
+        if future is not None:
+            self._finish(future, error="OCR 任务已取消" if worker.terminating else "OCR 工作进程异常退出")
+
+
+ocr_worker_pool = OCRWorkerPool(
+    workers=settings.OCR_WORKERS,
+    max_queue=settings.OCR_QUEUE_SIZE,
+    task_timeout=settings.OCR_TASK_TIMEOUT,
+)
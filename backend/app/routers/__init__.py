@@ -6,6 +6,7 @@ from .settings import router as settings_router
 from .profile import router as profile_router
 from .announcement import router as announcement_router
 from .operations import router as operations_router
+from .jobs import router as jobs_router
 
 __all__ = [
     "contracts_router",
@@ -16,4 +17,5 @@ __all__ = [
     "profile_router",
     "announcement_router",
     "operations_router",
+    "jobs_router",
 ]
@@ -20,7 +20,7 @@ router = APIRouter(prefix="/approvals", tags=["approvals"])
 
 
 @router.get("/tasks", response_model=ApprovalTaskListResponse)
-async def get_approval_tasks(
+def get_approval_tasks(
     status: Optional[str] = Query(None),
     stage: Optional[str] = Query(None),
     keyword: Optional[str] = Query(None),
@@ -64,7 +64,7 @@ async def get_approval_tasks(
 
 
 @router.post("/tasks/{task_id}/approve", response_model=ApprovalActionResponse)
-async def approve_task(
+def approve_task(
     task_id: str,
     payload: ApprovalActionRequest | None = Body(default=None),
     db: Session = Depends(get_db),
@@ -107,7 +107,7 @@ async def approve_task(
 
 
 @router.post("/tasks/{task_id}/return", response_model=ApprovalActionResponse)
-async def return_task(
+def return_task(
     task_id: str,
     payload: ApprovalActionRequest | None = Body(default=None),
     db: Session = Depends(get_db),
@@ -150,7 +150,7 @@ async def return_task(
 
 
 @router.get("/stats/overview", response_model=ApprovalStatsOverview)
-async def get_approval_stats_overview(
+def get_approval_stats_overview(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("contracts.audit")),
 ):
@@ -163,7 +163,7 @@ async def get_approval_stats_overview(
 
 
 @router.get("/stats/stages", response_model=list[ApprovalStageSummary])
-async def get_approval_stage_summary(
+def get_approval_stage_summary(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("contracts.audit")),
 ):
@@ -176,7 +176,7 @@ async def get_approval_stage_summary(
 
 
 @router.get("/tasks/{task_id}/history", response_model=list[ApprovalHistoryRead], dependencies=[Depends(require_permission("contracts.audit"))])
-async def get_approval_history(
+def get_approval_history(
     task_id: str,
     db: Session = Depends(get_db),
 ):
@@ -188,7 +188,7 @@ async def get_approval_history(
 
 
 @router.post("/tasks/send-reminder")
-async def send_approval_reminder(
+def send_approval_reminder(
     contract_id: Optional[str] = Query(None, description="合同ID"),
     teacher_name: Optional[str] = Query(None, description="教师姓名"),
     department: Optional[str] = Query(None, description="部门"),
@@ -230,7 +230,7 @@ async def send_approval_reminder(
 
 
 @router.delete("/tasks/{task_id}")
-async def delete_approval_task(
+def delete_approval_task(
     task_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("contracts.audit")),
@@ -263,7 +263,7 @@ async def delete_approval_task(
 
 
 @router.delete("/tasks/batch/by-contract/{contract_id}")
-async def delete_all_approval_tasks_by_contract(
+def delete_all_approval_tasks_by_contract(
     contract_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("contracts.audit")),
@@ -287,7 +287,7 @@ async def delete_all_approval_tasks_by_contract(
 
 
 @router.delete("/tasks/batch/by-teacher")
-async def delete_all_approval_tasks_by_teacher(
+def delete_all_approval_tasks_by_teacher(
     teacher_name: str = Query(..., description="教师姓名"),
     department: str = Query(..., description="部门"),
     db: Session = Depends(get_db),
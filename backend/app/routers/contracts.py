@@ -1,22 +1,23 @@
 ﻿from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Union
 import io
 import math
 import os
 import re
-import tempfile
 from datetime import datetime
 import mimetypes
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.utils.auth import require_permission
 from app.schemas.contract import (
     ContractCreate,
     ContractUpdate,
     ContractResponse,
     PaginatedResponse,
+    CursorPaginatedResponse,
     OcrResult,
     ContractLifecycleResponse,
     ContractTimelineEvent,
@@ -25,14 +26,20 @@ from app.schemas.contract import (
     ContractAttachmentItem,
 )
 from app.services.contract_service import ContractService
-from app.services.file_storage_service import file_storage_service
+from app.services.contract_import_service import ContractImportService
+from app.services.dashboard_service import DashboardService
+from app.services.contract_file_service import ContractFileService
 from app.services.operation_log_service import OperationLogService
 from app.models.contract import Contract
 from app.ocr.ocr_service import ocr_service
+from app.ocr.ocr_worker_pool import OCRQueueFull
 from app.utils.excel_export import exporter
+from app.utils.data_export import data_exporter
 from app.utils.excel_import import parse_contracts_from_bytes, FIELD_TO_LABEL
+from app.utils.file_response import decrypted_file_response
+from app.utils.upload import ReceivedUpload, UploadRejected, receive_upload
 from pydantic import ValidationError
-from app.config import settings
+from app.utils.encryption import SENSITIVE_FIELDS
 
 router = APIRouter()
 
@@ -61,28 +68,28 @@ async def upload_contract(
     
     if file_ext not in allowed_extensions:
         raise HTTPException(status_code=400, detail="不支持的文件类型")
-    
-    # 读取文件内容并验证大小
-    content = await file.read()
-    file_size = len(content)
 
-    if file_size > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(status_code=400, detail="文件大小超过限制")
-    if file_size == 0:
-        raise HTTPException(status_code=400, detail="文件内容为空")
+    try:
+        # 直接使用 Starlette 缓存上传内容的临时文件：OCR 需要路径时才写出一份，加密存储从原文件读取
+        async with receive_upload(file, suffix=file_ext) as upload:
+            return await run_in_threadpool(_recognize_contract_upload, db, upload, request)
+    except UploadRejected as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-    temp_path: Optional[str] = None
-    storage_meta = None
 
+def _recognize_contract_upload(db: Session, upload: ReceivedUpload, request: Optional[Request]) -> OcrResult:
+    """OCR 识别并加密存储已接收的合同文件（在线程池中执行）"""
+    storage_meta = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-            tmp_file.write(content)
-            temp_path = tmp_file.name
-
-        fields, confidence, raw_text, low_confidence_fields = ocr_service.process_contract_file(temp_path)
+        try:
+            fields, confidence, raw_text, low_confidence_fields = ocr_service.process_contract_file(
+                upload.path, checksum=upload.checksum
+            )
+        except OCRQueueFull as exc:
+            raise HTTPException(status_code=503, detail=str(exc))
 
         try:
-            storage_meta = file_storage_service.save_encrypted(io.BytesIO(content), file.filename)
+            storage_meta = ContractFileService.store_upload(upload)
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"合同文件存储失败: {exc}")
 
@@ -93,7 +100,7 @@ async def upload_contract(
             confidence=confidence,
             raw_text=raw_text,
             low_confidence_fields=low_confidence_fields,
-            original_filename=file.filename,
+            original_filename=upload.filename,
         )
 
         OperationLogService.log(
@@ -101,45 +108,34 @@ async def upload_contract(
             module="contracts",
             action="upload",
             operator=request.state.user if hasattr(request.state, "user") else None,
-            summary=f"上传合同文件 {file.filename}",
+            summary=f"上传合同文件 {upload.filename}",
             detail=f"已存储至加密目录: {storage_meta.relative_path}",
             request=request,
             extra={
-                "original_filename": file.filename,
+                "original_filename": upload.filename,
                 "average_confidence": fields.get('ocr_confidence'),
                 "confidence": confidence,
                 "low_confidence_fields": low_confidence_fields,
-                "file_size": file_size,
+                "file_size": storage_meta.size,
                 "storage_path": storage_meta.relative_path,
                 "checksum": storage_meta.checksum,
+                "deduplicated": storage_meta.deduplicated,
             },
         )
 
         return result
     except HTTPException:
         if storage_meta:
-            try:
-                file_storage_service.delete(storage_meta.relative_path)
-            except Exception:
-                pass
+            ContractFileService.release(db, [storage_meta.relative_path])
         raise
     except Exception as exc:
         if storage_meta:
-            try:
-                file_storage_service.delete(storage_meta.relative_path)
-            except Exception:
-                pass
+            ContractFileService.release(db, [storage_meta.relative_path])
         raise HTTPException(status_code=500, detail=f"OCR 识别失败: {exc}")
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except OSError:
-                pass
 
 
 @router.get("/contracts/template", dependencies=[Depends(require_permission("contracts.read"))])
-async def download_contract_template():
+def download_contract_template():
     """
     下载合同导入模板
     """
@@ -157,64 +153,40 @@ async def download_contract_template():
 
 
 @router.post("/contracts/import", dependencies=[Depends(require_permission("contracts.import"))])
-async def import_contracts(
+def import_contracts(
     file: UploadFile = File(...),
+    dry_run: bool = Query(False, description="仅校验并返回每行的新增/更新/拒绝预览，不写入数据库"),
     request: Request = None,
     db: Session = Depends(get_db)
 ):
     """
     导入合同 Excel
+    - dry_run=true: 预演导入，返回逐行变更预览
     """
     if not file.filename.lower().endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="请上传 Excel 文件 (.xlsx/.xls)")
 
-    content = await file.read()
+    # 同步处理函数在线程池中执行，直接读取 UploadFile 底层的临时文件
+    content = file.file.read()
+    if dry_run:
+        try:
+            return ContractImportService.preview_file(db, content)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
     try:
         parsed_records = parse_contracts_from_bytes(content)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
-    created = 0
-    updated = 0
-    errors: list[str] = []
-
-    for row_index, record in parsed_records:
-        record['approval_status'] = record.get('approval_status') or "approved"
-        teacher_code = record.get('teacher_code')
-        if not teacher_code:
-            errors.append(f'第 {row_index} 行缺少工号，已跳过')
-            continue
-
-        # 自动计算教龄
-        if record.get('teaching_years') is None and record.get('start_work_date'):
-            record['teaching_years'] = _calculate_teaching_years(record['start_work_date'])
-
-        existing = db.query(Contract).filter_by(teacher_code=teacher_code).first()
-
-        if existing:
-            try:
-                update_payload = ContractUpdate(**record)
-                ContractService.update_contract(db, existing.id, update_payload)
-                updated += 1
-            except ValidationError as exc:
-                error_msgs = '; '.join(
-                    [f"{FIELD_TO_LABEL.get(err['loc'][-1], err['loc'][-1])}: {err['msg']}" for err in exc.errors()]
-                )
-                errors.append(f'第 {row_index} 行数据校验失败：{error_msgs}')
-            except Exception as exc:
-                errors.append(f'第 {row_index} 行更新失败：{exc}')
-        else:
-            try:
-                create_payload = ContractCreate(**record)
-                ContractService.create_contract(db, create_payload)
-                created += 1
-            except ValidationError as exc:
-                error_msgs = '; '.join(
-                    [f"{FIELD_TO_LABEL.get(err['loc'][-1], err['loc'][-1])}: {err['msg']}" for err in exc.errors()]
-                )
-                errors.append(f'第 {row_index} 行数据校验失败：{error_msgs}')
-            except Exception as exc:
-                errors.append(f'第 {row_index} 行创建失败：{exc}')
+    import_result = ContractImportService.import_records(
+        db,
+        parsed_records,
+        operator=_get_operator_name(request),
+    )
+    created = import_result["created"]
+    updated = import_result["updated"]
+    errors: list[str] = import_result["errors"]
 
     result = {
         "imported": created + updated,
@@ -238,8 +210,12 @@ async def import_contracts(
 
 
 
-@router.get("/contracts", response_model=PaginatedResponse, dependencies=[Depends(require_permission("contracts.read"))])
-async def get_contracts(
+@router.get(
+    "/contracts",
+    response_model=Union[PaginatedResponse, CursorPaginatedResponse],
+    dependencies=[Depends(require_permission("contracts.read"))],
+)
+def get_contracts(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     department: Optional[str] = None,
@@ -247,11 +223,48 @@ async def get_contracts(
     search: Optional[str] = None,
     approval_status: Optional[str] = Query('approved'),
     expiring_within_days: Optional[int] = Query(None, ge=1, le=365),
+    pagination: str = Query('offset', pattern='^(offset|cursor)$'),
+    cursor: Optional[str] = None,
+    total_mode: str = Query('none', pattern='^(none|estimate|exact)$'),
+    fields: Optional[str] = Query(None, description="逗号分隔的需要返回的敏感字段，未列出的敏感字段返回空值且不解密"),
     db: Session = Depends(get_db)
 ):
     """
     获取合同列表（分页）
+    - pagination=offset: 传统页码分页（默认）
+    - pagination=cursor: 游标分页，使用上一页返回的 next_cursor 翻页，total_mode 控制是否统计总数
+    - fields: 不传时返回全部字段
     """
+    hidden_fields: set[str] = set()
+    if fields is not None:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        hidden_fields = set(SENSITIVE_FIELDS) - requested
+
+    if pagination == 'cursor' or cursor:
+        try:
+            contracts, next_cursor, total = ContractService.get_contracts_by_cursor(
+                db=db,
+                cursor=cursor,
+                page_size=page_size,
+                department=department,
+                job_status=job_status,
+                search=search,
+                approval_status=approval_status,
+                expiring_within_days=expiring_within_days,
+                total_mode=total_mode,
+                hidden_fields=hidden_fields,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+        return CursorPaginatedResponse(
+            data=[ContractResponse.model_validate(c) for c in contracts],
+            page_size=page_size,
+            next_cursor=next_cursor,
+            total=total,
+            total_is_estimate=total_mode == 'estimate' and total is not None,
+        )
+
     contracts, total = ContractService.get_contracts(
         db=db,
         page=page,
@@ -261,6 +274,7 @@ async def get_contracts(
         search=search,
         approval_status=approval_status,
         expiring_within_days=expiring_within_days,
+        hidden_fields=hidden_fields,
     )
     
     total_pages = math.ceil(total / page_size)
@@ -275,36 +289,52 @@ async def get_contracts(
 
 
 @router.get("/contracts/export", dependencies=[Depends(require_permission("contracts.export"))])
-async def export_contracts(
+def export_contracts(
     department: Optional[str] = None,
     job_status: Optional[str] = None,
     search: Optional[str] = None,
     approval_status: Optional[str] = Query('approved'),
     ids: Optional[list[str]] = Query(None),
+    export_format: str = Query('xlsx', alias='format', pattern='^(xlsx|csv|parquet)$'),
     request: Request = None,
     db: Session = Depends(get_db)
 ):
     """
-    导出合同列表为 Excel
+    导出合同列表（服务端游标分批读取并流式写出）
+    - format=xlsx: Excel（默认）
+    - format=csv / parquet: 供数据分析使用，不做单元格样式处理
     """
-    contracts = ContractService.get_contracts_for_export(
-        db=db,
-        department=department,
-        job_status=job_status,
-        search=search,
-        approval_status=approval_status,
-        ids=ids,
-    )
-    
-    # 生成 Excel
-    excel_data = exporter.export_contracts(contracts)
-    
-    # 返回文件流
-    filename = f"contracts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    if export_format == 'parquet' and not data_exporter.parquet_available():
+        raise HTTPException(status_code=400, detail="服务器未安装 pyarrow，暂不支持 Parquet 导出")
+
+    stream_writers = {
+        'xlsx': exporter.export_contracts_stream,
+        'csv': data_exporter.export_csv_stream,
+        'parquet': data_exporter.export_parquet_stream,
+    }
+    media_types = {
+        'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        'csv': "text/csv; charset=utf-8",
+        'parquet': "application/vnd.apache.parquet",
+    }
+    filename = f"contracts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+
+    def generate_export():
+        # 响应体在路由返回后才开始生成，因此使用独立会话
+        with SessionLocal() as export_db:
+            contracts = ContractService.iter_contracts_for_export(
+                db=export_db,
+                department=department,
+                job_status=job_status,
+                search=search,
+                approval_status=approval_status,
+                ids=ids,
+            )
+            yield from stream_writers[export_format](contracts)
     
     response = StreamingResponse(
-        io.BytesIO(excel_data),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        generate_export(),
+        media_type=media_types[export_format],
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
         }
@@ -324,6 +354,7 @@ async def export_contracts(
             "search": search,
             "approval_status": approval_status,
             "ids": ids,
+            "format": export_format,
         },
     )
 
@@ -331,7 +362,7 @@ async def export_contracts(
 
 
 @router.get("/contracts/{contract_id}", response_model=ContractResponse, dependencies=[Depends(require_permission("contracts.read"))])
-async def get_contract(
+def get_contract(
     contract_id: str,
     request: Request = None,
     db: Session = Depends(get_db)
@@ -362,7 +393,7 @@ async def get_contract(
 
 
 @router.get("/contracts/{contract_id}/lifecycle", response_model=ContractLifecycleResponse, dependencies=[Depends(require_permission("contracts.read"))])
-async def get_contract_lifecycle(
+def get_contract_lifecycle(
     contract_id: str,
     request: Request = None,
     db: Session = Depends(get_db)
@@ -391,7 +422,7 @@ async def get_contract_lifecycle(
     response_model=ContractTimelineEvent,
     dependencies=[Depends(require_permission("contracts.update"))],
 )
-async def create_contract_timeline_event(
+def create_contract_timeline_event(
     contract_id: str,
     payload: ContractTimelineEventCreate,
     request: Request = None,
@@ -422,7 +453,7 @@ async def create_contract_timeline_event(
     response_model=ContractTimelineEvent,
     dependencies=[Depends(require_permission("contracts.update"))],
 )
-async def update_contract_timeline_event(
+def update_contract_timeline_event(
     contract_id: str,
     event_id: str,
     payload: ContractTimelineEventUpdate,
@@ -453,7 +484,7 @@ async def update_contract_timeline_event(
     "/contracts/{contract_id}/lifecycle/events/{event_id}",
     dependencies=[Depends(require_permission("contracts.update"))],
 )
-async def delete_contract_timeline_event(
+def delete_contract_timeline_event(
     contract_id: str,
     event_id: str,
     request: Request = None,
@@ -493,25 +524,33 @@ async def upload_contract_attachment(
 ):
     if not file.filename and not name:
         raise HTTPException(status_code=400, detail="附件缺少文件名")
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="附件内容为空")
 
-    operator_name = _get_operator_name(request)
     filename = name or file.filename or "附件"
 
     try:
-        attachment = ContractService.add_attachment(
-            db,
-            contract_id,
-            filename=filename,
-            content=content,
-            uploader=operator_name,
-            content_type=file.content_type,
-        )
+        async with receive_upload(file, filename=filename) as upload:
+            return await run_in_threadpool(
+                _store_contract_attachment, db, contract_id, upload, file.content_type, request
+            )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
+
+def _store_contract_attachment(
+    db: Session,
+    contract_id: str,
+    upload: ReceivedUpload,
+    content_type: Optional[str],
+    request: Optional[Request],
+):
+    """保存已接收的合同附件并记录日志（在线程池中执行）"""
+    attachment = ContractService.add_attachment(
+        db,
+        contract_id,
+        upload=upload,
+        uploader=_get_operator_name(request),
+        content_type=content_type,
+    )
     if not attachment:
         raise HTTPException(status_code=404, detail="合同不存在")
 
@@ -520,7 +559,7 @@ async def upload_contract_attachment(
         module="contracts",
         action="attachment_upload",
         operator=request.state.user if hasattr(request.state, "user") else None,
-        summary=f"上传合同附件 {filename}",
+        summary=f"上传合同附件 {upload.filename}",
         detail=f"合同ID: {contract_id}",
         request=request,
         target_type="contract",
@@ -534,7 +573,7 @@ async def upload_contract_attachment(
     "/contracts/{contract_id}/attachments/{attachment_id}",
     dependencies=[Depends(require_permission("contracts.update"))],
 )
-async def delete_contract_attachment(
+def delete_contract_attachment(
     contract_id: str,
     attachment_id: str,
     request: Request = None,
@@ -564,7 +603,7 @@ async def delete_contract_attachment(
     "/contracts/{contract_id}/attachments/{attachment_id}/download",
     dependencies=[Depends(require_permission("contracts.read"))],
 )
-async def download_contract_attachment(
+def download_contract_attachment(
     contract_id: str,
     attachment_id: str,
     request: Request = None,
@@ -575,21 +614,23 @@ async def download_contract_attachment(
         if not result:
             raise HTTPException(status_code=404, detail="附件不存在或合同不存在")
 
-        attachment, data = result
-        
-        # 先记录日志
+        attachment, decrypted = result
+        range_header = request.headers.get("range") if request else None
+
+        # 先记录日志（分段请求只在首段记录，避免预览器多次拉取产生重复日志）
         try:
-            OperationLogService.log(
-                db=db,
-                module="contracts",
-                action="attachment_download",
-                operator=request.state.user if hasattr(request.state, "user") else None,
-                summary=f"下载合同附件 {attachment.name}",
-                detail=f"合同ID: {contract_id}",
-                request=request,
-                target_type="contract",
-                target_id=contract_id,
-            )
+            if not range_header or range_header.replace(" ", "").startswith("bytes=0-"):
+                OperationLogService.log(
+                    db=db,
+                    module="contracts",
+                    action="attachment_download",
+                    operator=request.state.user if hasattr(request.state, "user") else None,
+                    summary=f"下载合同附件 {attachment.name}",
+                    detail=f"合同ID: {contract_id}",
+                    request=request,
+                    target_type="contract",
+                    target_id=contract_id,
+                )
         except Exception as log_error:
             # 日志记录失败不应该影响下载
             print(f"日志记录失败: {log_error}")
@@ -601,15 +642,15 @@ async def download_contract_attachment(
         from urllib.parse import quote
         encoded_filename = quote(attachment.name)
         
-        # 使用 Response 而不是 StreamingResponse，因为数据已经在内存中
-        from fastapi.responses import Response
-        response = Response(
-            content=data,
+        # 分块解密后流式返回，支持 Range 请求
+        response = decrypted_file_response(
+            decrypted,
+            range_header=range_header,
             media_type=media_type,
             headers={
                 "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
-                "Access-Control-Expose-Headers": "Content-Disposition",
-            }
+                "Access-Control-Expose-Headers": "Content-Disposition, Content-Range, Accept-Ranges",
+            },
         )
         
         return response
@@ -623,7 +664,7 @@ async def download_contract_attachment(
 
 
 @router.post("/contracts", response_model=ContractResponse, dependencies=[Depends(require_permission("contracts.create"))])
-async def create_contract(
+def create_contract(
     contract: ContractCreate,
     original_filename: Optional[str] = None,
     request: Request = None,
@@ -675,7 +716,7 @@ async def create_contract(
 
 
 @router.patch("/contracts/{contract_id}", response_model=ContractResponse, dependencies=[Depends(require_permission("contracts.update"))])
-async def update_contract(
+def update_contract(
     contract_id: str,
     contract_update: ContractUpdate,
     request: Request = None,
@@ -727,7 +768,7 @@ async def update_contract(
 
 
 @router.delete("/contracts/{contract_id}", dependencies=[Depends(require_permission("contracts.delete"))])
-async def delete_contract(
+def delete_contract(
     contract_id: str,
     request: Request = None,
     db: Session = Depends(get_db)
@@ -755,56 +796,25 @@ async def delete_contract(
 
 
 @router.get("/contracts/stats/dashboard", dependencies=[Depends(require_permission("contracts.audit"))])
-async def get_dashboard_stats(
+def get_dashboard_stats(
     db: Session = Depends(get_db)
 ):
     """
-    获取仪表盘统计数据
+    获取仪表盘统计数据（单条聚合查询，结果短时间缓存）
     """
-    from sqlalchemy import func
-    from app.models.contract import Contract
-    
-    # 教师总数
-    total = db.query(func.count(Contract.id)).filter(Contract.approval_status == "approved").scalar() or 0
-    
-    # 在职合同数
-    active = db.query(func.count(Contract.id)).filter(
-        Contract.approval_status == "approved",
-        Contract.job_status == '在职'
-    ).scalar() or 0
-    
-    # 即将到期（30天内）
-    expiring = ContractService.get_expiring_contracts(db, days=30)
-
-    # 待复核（OCR 置信度低于 0.8）
-    breakdown = ContractService.get_dashboard_breakdown(db)
-
-    return {
-        "totalTeachers": total,
-        "activeContracts": active,
-        "expiringSoon": len(expiring),
-        "pendingReview": breakdown['pendingReview'],
-        "averageConfidence": breakdown['averageConfidence'],
-        "breakdown": breakdown,
-        "sidebarSummary": breakdown['sidebarSummary'],
-    }
+    return DashboardService.get_stats(db)
 
 
 @router.get("/contracts/stats/dashboard/summary", dependencies=[Depends(require_permission("contracts.audit"))])
-async def get_dashboard_summary(
+def get_dashboard_summary(
     db: Session = Depends(get_db)
 ):
-    from sqlalchemy import func
-    from app.models.contract import Contract
-
-    breakdown = ContractService.get_dashboard_breakdown(db)
-    expiring_30 = breakdown['sidebarSummary']['expiringWithin30Days']
+    sidebar_summary = DashboardService.get_stats(db)['sidebarSummary']
 
     return {
-        "pendingReview": breakdown['sidebarSummary']['pendingReview'],
-        "probationTeachers": breakdown['sidebarSummary']['probationTeachers'],
-        "expiringWithin30Days": expiring_30,
-        "expiringWithin90Days": breakdown['sidebarSummary']['expiringWithin90Days'],
-        "averageConfidence": breakdown['sidebarSummary']['averageConfidence'],
+        "pendingReview": sidebar_summary['pendingReview'],
+        "probationTeachers": sidebar_summary['probationTeachers'],
+        "expiringWithin30Days": sidebar_summary['expiringWithin30Days'],
+        "expiringWithin90Days": sidebar_summary['expiringWithin90Days'],
+        "averageConfidence": sidebar_summary['averageConfidence'],
     }
-
@@ -0,0 +1,149 @@
+"""后台任务路由：提交耗时的导入/导出/OCR 任务并轮询进度"""
+from __future__ import annotations
+
+import os
+from contextlib import AsyncExitStack
+from typing import List
+
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db
+from app.models import User
+from app.schemas.job import ExportJobCreate, JobRead
+from app.services.job_service import JobService
+from app.utils.auth import get_current_user, require_permission
+from app.utils.data_export import data_exporter
+from app.utils.file_response import decrypted_file_response
+from app.utils.upload import UploadRejected, receive_upload
+
+router = APIRouter(prefix="/jobs", tags=["后台任务"])
+
+
+@router.post("/import", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_import_job(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("contracts.import")),
+):
+    """提交合同 Excel 导入任务"""
+    if not file.filename.lower().endswith(('.xlsx', '.xls')):
+        raise HTTPException(status_code=400, detail="请上传 Excel 文件 (.xlsx/.xls)")
+
+    try:
+        async with receive_upload(
+            file,
+            suffix=os.path.splitext(file.filename)[1].lower(),
+            max_size=settings.IMPORT_MAX_SIZE,
+        ) as upload:
+            return await run_in_threadpool(JobService.submit_import, db, upload=upload, operator=current_user)
+    except UploadRejected as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/export", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+def submit_export_job(
+    payload: ExportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("contracts.export")),
+):
+    """提交合同导出任务，完成后通过 /jobs/{job_id}/download 下载"""
+    if payload.format == 'parquet' and not data_exporter.parquet_available():
+        raise HTTPException(status_code=400, detail="服务器未安装 pyarrow，暂不支持 Parquet 导出")
+
+    return JobService.submit_export(db, params=payload.model_dump(), operator=current_user)
+
+
+@router.post("/ocr", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_ocr_job(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("contracts.create")),
+):
+    """提交合同文件 OCR 识别任务，识别结果在任务 result 中返回"""
+    allowed_extensions = ['.pdf', '.jpg', '.jpeg', '.png']
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in allowed_extensions:
+        raise HTTPException(status_code=400, detail="不支持的文件类型")
+
+    try:
+        async with receive_upload(file, suffix=file_ext) as upload:
+            return await run_in_threadpool(JobService.submit_ocr, db, upload=upload, operator=current_user)
+    except UploadRejected as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/ocr/batch", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_ocr_batch_job(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("contracts.create")),
+):
+    """
+    批量提交合同文件 OCR 识别任务（多个 pdf/jpg/png 文件，或包含这些文件的 zip）
+    result.items 返回逐文件状态（filename/status/error），吞吐量见 result.contracts_per_minute；
+    任务结束后（含中断）每项附带已完成文件的识别草稿 result
+    """
+    allowed_extensions = ['.pdf', '.jpg', '.jpeg', '.png', '.zip']
+    for file in files:
+        if os.path.splitext(file.filename or "")[1].lower() not in allowed_extensions:
+            raise HTTPException(status_code=400, detail=f"不支持的文件类型: {file.filename}")
+
+    try:
+        async with AsyncExitStack() as stack:
+            uploads = []
+            for file in files:
+                file_ext = os.path.splitext(file.filename)[1].lower()
+                max_size = settings.OCR_BATCH_MAX_ARCHIVE_SIZE if file_ext == '.zip' else None
+                uploads.append(await stack.enter_async_context(
+                    receive_upload(file, suffix=file_ext, max_size=max_size)
+                ))
+            return await run_in_threadpool(
+                JobService.submit_ocr_batch, db, uploads=uploads, operator=current_user
+            )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/{job_id}", response_model=JobRead)
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """查询任务状态与进度；OCR 任务完成后 result 为解密后的识别草稿"""
+    job = JobService.get_job(db, job_id, current_user)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    response = JobRead.model_validate(job)
+    response.result = JobService.load_result(job)
+    return response
+
+
+@router.get("/{job_id}/download")
+def download_job_result(
+    job_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """下载任务结果文件（导出任务）"""
+    job = JobService.get_job(db, job_id, current_user)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    try:
+        decrypted = JobService.open_result(job)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="结果文件不存在或已被清理")
+
+    return decrypted_file_response(
+        decrypted,
+        range_header=request.headers.get("range"),
+        media_type=job.result_media_type or "application/octet-stream",
+        headers={"Content-Disposition": f"attachment; filename={job.result_filename}"},
+    )
@@ -70,7 +70,7 @@ def update_my_profile(
 
 
 @router.post("/avatar", summary="上传头像")
-async def upload_avatar(
+def upload_avatar(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -91,7 +91,7 @@ async def upload_avatar(
         )
 
     # 检查文件大小（5MB）
-    content = await file.read()
+    content = file.file.read()
     if len(content) > 5 * 1024 * 1024:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
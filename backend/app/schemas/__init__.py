@@ -6,6 +6,7 @@ from .contract import (
     ContractUpdate,
     ContractResponse,
     PaginatedResponse,
+    CursorPaginatedResponse,
     OcrResult,
     ContractLifecycleResponse,
 )
@@ -37,6 +38,7 @@ from .auth import (
 )
 from .operation_log import OperationLogQuery, OperationLogResponse, OperationLogItem
 from .workflow import WorkflowConfigResponse, WorkflowConfigUpdate
+from .job import ExportJobCreate, JobRead
 from .field_config import (
     FieldConfigResponse,
     FieldConfigCreate,
@@ -49,6 +51,7 @@ __all__ = [
     "ContractUpdate",
     "ContractResponse",
     "PaginatedResponse",
+    "CursorPaginatedResponse",
     "OcrResult",
     "ContractLifecycleResponse",
     "AnnouncementCreate",
@@ -78,5 +81,7 @@ __all__ = [
     "FieldConfigCreate",
     "FieldConfigUpdate",
     "FieldConfigCollection",
+    "ExportJobCreate",
+    "JobRead",
 ]
 
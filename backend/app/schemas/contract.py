@@ -198,6 +198,15 @@ class PaginatedResponse(BaseModel):
     total_pages: int
 
 
+# 游标分页响应
+class CursorPaginatedResponse(BaseModel):
+    data: list[Any]
+    page_size: int
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+
 class ContractQuery(BaseModel):
     page: int = Field(1, ge=1)
     page_size: int = Field(20, ge=1, le=100)
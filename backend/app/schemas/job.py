@@ -0,0 +1,38 @@
+"""后台任务相关 Schema"""
+from datetime import datetime
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ExportJobCreate(BaseModel):
+    """提交导出任务的筛选条件"""
+
+    department: Optional[str] = None
+    job_status: Optional[str] = None
+    search: Optional[str] = None
+    approval_status: Optional[str] = "approved"
+    ids: Optional[List[str]] = None
+    format: str = Field("xlsx", pattern="^(xlsx|csv|parquet)$", description="导出格式")
+
+
+class JobRead(BaseModel):
+    """后台任务状态"""
+
+    id: str
+    job_type: str
+    status: str
+    phase: Optional[str] = None
+    total: Optional[int] = None
+    processed: int = 0
+    error_count: int = 0
+    errors: List[str] = []
+    result: Optional[Any] = None
+    result_filename: Optional[str] = None
+    error_message: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
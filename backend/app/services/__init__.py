@@ -1,11 +1,12 @@
 # Services package
 
 from .announcement_service import AnnouncementService
-from .file_storage_service import FileStorageService, StoredContractFile, file_storage_service
+from .file_storage_service import DecryptedFile, FileStorageService, StoredContractFile, file_storage_service
 from .operation_log_service import OperationLogService
 
 __all__ = [
     "AnnouncementService",
+    "DecryptedFile",
     "FileStorageService",
     "StoredContractFile",
     "file_storage_service",
@@ -11,6 +11,8 @@ from sqlalchemy.dialects.postgresql import JSONB
 from app.models.approval import ApprovalHistory, ApprovalTask
 from app.models.contract import Contract
 from app.models.workflow import WorkflowStage
+from app.services.contract_stats_service import ContractStatsService, stats_snapshot
+from app.services.dashboard_service import DashboardService
 
 
 @dataclass
@@ -221,13 +223,17 @@ class ApprovalService:
                     # 没有活跃任务，保持 pending 状态
                     overall = 'pending'
 
+                stats_before = stats_snapshot(contract)
                 contract.approval_status = overall
+                if overall != stats_before['approval_status']:
+                    ContractStatsService.record_change(db, stats_before, stats_snapshot(contract))
                 if overall == 'approved':
                     contract.approval_completed_at = datetime.now(timezone.utc)
                 else:
                     contract.approval_completed_at = None
 
         db.commit()
+        DashboardService.invalidate()
 
         ApprovalService.add_history(
             db=db,
@@ -405,6 +411,7 @@ class ApprovalService:
         # 由于设置了 cascade="all, delete-orphan"，删除任务时会自动删除关联的历史记录和核查项
         db.delete(task)
         db.commit()
+        DashboardService.invalidate()
         return True
 
     @staticmethod
@@ -427,6 +434,7 @@ class ApprovalService:
             db.delete(task)
         
         db.commit()
+        DashboardService.invalidate()
         return count
 
     @staticmethod
@@ -452,6 +460,7 @@ class ApprovalService:
             db.delete(task)
         
         db.commit()
+        DashboardService.invalidate()
         return count
     
     @staticmethod
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 from datetime import date, timedelta
-from typing import List
+from typing import List, Sequence
 
 from sqlalchemy.orm import Session, selectinload
 
-from app.models.approval import ApprovalTask, ApprovalCheckItem, ApprovalHistory
+from app.models.approval import ApprovalTask, ApprovalCheckItem, ApprovalHistory, generate_uuid
 from app.models.contract import Contract
 from app.models.workflow import WorkflowStage
 from app.models.user import User
@@ -25,13 +25,27 @@ class ApprovalWorkflowService:
     def create_workflow_for_contract(cls, db: Session, contract: Contract) -> None:
         if not contract or not contract.id:
             return
+        cls.create_workflows_for_contracts(db, [contract])
 
-        existing_tasks = (
-            db.query(ApprovalTask.id)
-            .filter(ApprovalTask.contract_id == contract.id)
-            .first()
-        )
-        if existing_tasks:
+    @classmethod
+    def create_workflows_for_contracts(cls, db: Session, contracts: Sequence[Contract]) -> None:
+        """批量为合同生成审批任务，流程阶段与协助人只查询一次（供批量导入使用）"""
+        contracts = [contract for contract in contracts if contract and contract.id]
+        if not contracts:
+            return
+
+        contract_ids = [contract.id for contract in contracts]
+        existing_contract_ids = {
+            contract_id
+            for (contract_id,) in (
+                db.query(ApprovalTask.contract_id)
+                .filter(ApprovalTask.contract_id.in_(contract_ids))
+                .distinct()
+                .all()
+            )
+        }
+        contracts = [contract for contract in contracts if contract.id not in existing_contract_ids]
+        if not contracts:
             return
 
         WorkflowService.ensure_default_stages(db)
@@ -46,6 +60,15 @@ class ApprovalWorkflowService:
         if not stages:
             return
 
+        assistant_ids = {user_id for stage in stages for user_id in (stage.assistants or [])}
+        assistant_map = {}
+        if assistant_ids:
+            assistant_map = {
+                user.id: user
+                for user in db.query(User).filter(User.id.in_(assistant_ids)).all()
+            }
+
+        stage_assignees = {}
         for stage in stages:
             owner_name = None
             if stage.owner:
@@ -55,46 +78,50 @@ class ApprovalWorkflowService:
             assignees = []
             if owner_name:
                 assignees.append(owner_name)
-            
-            # 如果有协助人，查询他们的信息并添加到 assignees
-            if stage.assistants:
-                assistant_users = db.query(User).filter(User.id.in_(stage.assistants)).all()
-                for assistant in assistant_users:
-                    assistant_name = assistant.full_name or assistant.username
-                    if assistant_name and assistant_name not in assignees:
-                        assignees.append(assistant_name)
-
-            task = ApprovalTask(
-                contract_id=contract.id,
-                teacher_name=contract.name or "",
-                department=contract.department or "",
-                stage=stage.key,
-                status="pending",
-                priority=cls.DEFAULT_PRIORITY,
-                owner=owner_name or "待指派",
-                assignees=assignees,
-                due_date=cls._calculate_due_date(stage, contract),
-                remarks=stage.description,
-            )
-            db.add(task)
-            db.flush()
 
-            for index, label in enumerate(stage.checklist or []):
-                item = ApprovalCheckItem(
+            for assistant_id in stage.assistants or []:
+                assistant = assistant_map.get(assistant_id)
+                if not assistant:
+                    continue
+                assistant_name = assistant.full_name or assistant.username
+                if assistant_name and assistant_name not in assignees:
+                    assignees.append(assistant_name)
+
+            stage_assignees[stage.key] = (owner_name, assignees)
+
+        for contract in contracts:
+            for stage in stages:
+                owner_name, assignees = stage_assignees[stage.key]
+                task = ApprovalTask(
+                    id=generate_uuid(),
+                    contract_id=contract.id,
+                    teacher_name=contract.name or "",
+                    department=contract.department or "",
+                    stage=stage.key,
+                    status="pending",
+                    priority=cls.DEFAULT_PRIORITY,
+                    owner=owner_name or "待指派",
+                    assignees=list(assignees),
+                    due_date=cls._calculate_due_date(stage, contract),
+                    remarks=stage.description,
+                )
+                db.add(task)
+
+                for index, label in enumerate(stage.checklist or []):
+                    item = ApprovalCheckItem(
+                        task_id=task.id,
+                        label=label,
+                        completed=False,
+                        order=index,
+                    )
+                    db.add(item)
+
+                history = ApprovalHistory(
                     task_id=task.id,
-                    label=label,
-                    completed=False,
-                    order=index,
+                    action="created",
+                    operator="system",
+                    comment="系统根据流程配置生成审批任务",
                 )
-                db.add(item)
-
-            history = ApprovalHistory(
-                task_id=task.id,
-                action="created",
-                operator="system",
-                comment="系统根据流程配置生成审批任务",
-            )
-            db.add(history)
+                db.add(history)
 
         db.flush()
-
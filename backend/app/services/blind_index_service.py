@@ -0,0 +1,94 @@
+"""盲索引回填：为已有合同计算身份证号、电话的盲索引"""
+from __future__ import annotations
+
+import logging
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import and_, bindparam, or_
+from sqlalchemy.orm import Session
+
+from app.models.contract import Contract
+from app.utils.encryption import BLIND_INDEX_FIELDS, blind_index, plaintext_for_blind_index
+
+logger = logging.getLogger(__name__)
+
+
+class BlindIndexService:
+    """按主键顺序分批回填盲索引，可随时中断后重新运行"""
+
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def backfill(
+        db: Session,
+        *,
+        recompute: bool = False,
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, int]:
+        """
+        回填盲索引
+        recompute=False 时只处理有密文但缺少盲索引的行；更换 BLIND_INDEX_KEY 后需 recompute=True 全量重算
+        progress: 可选回调 (已扫描行数, 已更新行数)
+        未加密的历史明文直接计算盲索引；形如密文却无法解密的字段（密钥已不在密钥环中或数据损坏）
+        盲索引保持为空并记录日志
+        返回：{"scanned", "updated", "undecryptable"}
+        """
+        table = Contract.__table__
+        size = batch_size or BlindIndexService.BATCH_SIZE
+        source_columns = [table.c[field] for field in BLIND_INDEX_FIELDS]
+        index_columns = [table.c[column] for column in BLIND_INDEX_FIELDS.values()]
+
+        # 显式保留 updated_at，回填不应表现为业务数据变更
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam('_id'))
+            .values(
+                updated_at=table.c.updated_at,
+                **{column: bindparam(column) for column in BLIND_INDEX_FIELDS.values()},
+            )
+        )
+
+        scanned = 0
+        updated = 0
+        undecryptable = 0
+        last_id = ''
+        while True:
+            query = db.query(table.c.id, *source_columns).filter(table.c.id > last_id)
+            if not recompute:
+                query = query.filter(or_(*[
+                    and_(source.isnot(None), source != '', index.is_(None))
+                    for source, index in zip(source_columns, index_columns)
+                ]))
+            rows = query.order_by(table.c.id).limit(size).all()
+            if not rows:
+                break
+
+            params = []
+            for row in rows:
+                values = {'_id': row.id}
+                for field, column in BLIND_INDEX_FIELDS.items():
+                    ciphertext = getattr(row, field)
+                    values[column] = None
+                    if not ciphertext:
+                        continue
+                    plaintext = plaintext_for_blind_index(ciphertext)
+                    if plaintext is None:
+                        # 不能对密文计算盲索引，否则该行永远无法被精确搜索到
+                        undecryptable += 1
+                        logger.warning("盲索引回填：合同 %s 的 %s 无法解密，盲索引保持为空", row.id, field)
+                        continue
+                    values[column] = blind_index(plaintext)
+                params.append(values)
+
+            db.execute(stmt, params)
+            db.commit()
+
+            scanned += len(rows)
+            updated += len(params)
+            last_id = rows[-1].id
+            if progress:
+                progress(scanned, updated)
+
+        logger.info("盲索引回填完成：扫描 %d 行，更新 %d 行，无法解密 %d 个字段", scanned, updated, undecryptable)
+        return {"scanned": scanned, "updated": updated, "undecryptable": undecryptable}
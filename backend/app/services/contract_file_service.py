@@ -0,0 +1,136 @@
+"""合同文件引用管理：内容寻址文件按合同、附件与后台任务中的引用统计，最后一个引用移除后删除"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterable, Optional, Set
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.background_job import BackgroundJobFile
+from app.models.contract import Contract
+from app.models.contract_attachment import ContractAttachment
+from app.services.file_storage_service import BLOB_PREFIX, StoredContractFile, file_storage_service
+
+if TYPE_CHECKING:
+    from app.utils.upload import ReceivedUpload
+
+logger = logging.getLogger(__name__)
+
+
+class ContractFileService:
+    """合同原始文件与附件的存储、引用统计与释放"""
+
+    # 内容寻址文件最近一次被上传（复用）后的保护期：
+    # 上传接口返回路径到创建合同之间文件尚未被引用，期间不因其他引用释放而删除
+    RELEASE_GRACE_SECONDS = 3600
+
+    @staticmethod
+    def store(
+        file_obj: BinaryIO,
+        filename: str,
+        *,
+        checksum: Optional[str] = None,
+        size: Optional[int] = None,
+    ) -> StoredContractFile:
+        """按内容保存合同文件，相同内容重复上传时直接复用"""
+        return file_storage_service.save_content_addressed(file_obj, filename, checksum=checksum, size=size)
+
+    @staticmethod
+    def store_upload(upload: "ReceivedUpload") -> StoredContractFile:
+        """保存已接收的上传（摘要已在接收时计算）"""
+        return ContractFileService.store(upload.open(), upload.filename, checksum=upload.checksum, size=upload.size)
+
+    @staticmethod
+    def reference_count(db: Session, relative_path: str) -> int:
+        """统计合同、附件与未清理的后台任务（OCR 草稿）中引用该文件的记录数"""
+        contracts = select(func.count(Contract.id)).where(Contract.file_url == relative_path).scalar_subquery()
+        attachments = (
+            select(func.count(ContractAttachment.id))
+            .where(ContractAttachment.file_url == relative_path)
+            .scalar_subquery()
+        )
+        jobs = (
+            select(func.count(BackgroundJobFile.job_id))
+            .where(BackgroundJobFile.file_path == relative_path)
+            .scalar_subquery()
+        )
+        return int(db.execute(select(contracts + attachments + jobs)).scalar() or 0)
+
+    @staticmethod
+    def release(db: Session, relative_paths: Iterable[Optional[str]]) -> int:
+        """
+        在引用记录删除并提交后调用：文件已无引用时删除，返回删除的文件数
+        内容寻址文件在保护期内不删除，留给 collect_garbage 清理；删除失败只记录日志
+        """
+        removed = 0
+        now = time.time()
+        for relative_path in {path for path in relative_paths if path}:
+            try:
+                if ContractFileService.reference_count(db, relative_path):
+                    continue
+                if file_storage_service.is_blob_path(relative_path):
+                    modified_at = file_storage_service.modified_at(relative_path)
+                    if now - modified_at < ContractFileService.RELEASE_GRACE_SECONDS:
+                        continue
+                file_storage_service.delete(relative_path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+            except Exception:
+                logger.warning("删除合同文件失败: %s", relative_path, exc_info=True)
+        return removed
+
+    @staticmethod
+    def referenced_blobs(db: Session) -> Set[str]:
+        """当前被合同、附件或后台任务引用的内容寻址文件路径"""
+        prefix = f"{BLOB_PREFIX}/%"
+        rows = db.execute(union_all(
+            select(Contract.file_url).where(Contract.file_url.like(prefix)),
+            select(ContractAttachment.file_url).where(ContractAttachment.file_url.like(prefix)),
+            select(BackgroundJobFile.file_path).where(BackgroundJobFile.file_path.like(prefix)),
+        ))
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def collect_garbage(
+        db: Session,
+        *,
+        grace_seconds: Optional[int] = None,
+        dry_run: bool = False,
+    ) -> Dict[str, int]:
+        """
+        清理无引用且超过保护期的内容寻址文件（上传后未创建合同、保护期内释放的文件等）
+        未清理的后台任务引用的文件（OCR 任务的输入与草稿中的 file_url）视为有引用
+        dry_run 时不删除，removed 为将被删除的文件数
+        返回：{"scanned", "unreferenced", "removed"}
+        """
+        grace = ContractFileService.RELEASE_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        referenced = ContractFileService.referenced_blobs(db)
+        deadline = time.time() - grace
+
+        result = {"scanned": 0, "unreferenced": 0, "removed": 0}
+        for relative_path, modified_at in file_storage_service.iter_blobs():
+            result["scanned"] += 1
+            if relative_path in referenced:
+                continue
+            result["unreferenced"] += 1
+            if modified_at > deadline:
+                continue
+            if dry_run:
+                result["removed"] += 1
+                continue
+            # 遍历期间可能被重新上传或引用，删除前逐个复核
+            if file_storage_service.modified_at(relative_path) > deadline:
+                continue
+            if ContractFileService.reference_count(db, relative_path):
+                continue
+            file_storage_service.delete(relative_path)
+            result["removed"] += 1
+
+        logger.info(
+            "合同文件清理完成：扫描 %d 个，无引用 %d 个，删除 %d 个",
+            result["scanned"], result["unreferenced"], result["removed"],
+        )
+        return result
@@ -0,0 +1,557 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.models.contract import Contract, generate_uuid
+from app.schemas.contract import ContractCreate, ContractUpdate
+from app.services.approval_workflow_service import ApprovalWorkflowService
+from app.services.contract_service import (
+    CONTRACT_LIST_LOAD,
+    FIELD_LABEL_MAP,
+    ContractService,
+    _format_value_for_log,
+)
+from app.services.contract_stats_service import ContractStatsService, StatsDelta, stats_snapshot
+from app.services.dashboard_service import DashboardService
+from app.services.workflow_service import WorkflowService
+from app.utils.encryption import SENSITIVE_FIELDS, blind_indexes_for, decrypt_field, encrypt_field
+from app.utils.excel_import import _convert_cell_value, load_sheet_rows
+from app.utils.import_validation import validate_rows, validation_message
+
+logger = logging.getLogger(__name__)
+
+# 批量写入时由数据库维护、不参与 upsert 的列
+_SERVER_MANAGED_COLUMNS = {'created_at'}
+# 合并到并发创建的同工号合同时保持不变的列
+_IMMUTABLE_COLUMNS = {'id', 'teacher_code', 'created_at'}
+
+
+@dataclass
+class _PlannedContract:
+    """一个工号在本次导入中的最终写入状态"""
+
+    contract_id: str
+    is_new: bool
+    # 数据库中的原始列值（敏感字段为密文）
+    row: Dict[str, Any]
+    # 解密后的列值，用于生成变更日志
+    plain: Dict[str, Any]
+    # (行号, 'create' | 'update')
+    rows: List[Tuple[int, str]] = field(default_factory=list)
+    logs: List[Dict[str, Any]] = field(default_factory=list)
+    needs_workflow: bool = False
+    # 导入前的统计字段快照，用于增量维护 contract_stats（新建合同为 None）
+    original_stats: Optional[Dict[str, Any]] = None
+    # 已有合同中取值发生变化的列，写入时只更新这些列，避免覆盖预取之后他人的修改
+    dirty: Set[str] = field(default_factory=set)
+
+
+class ContractImportService:
+    """合同批量导入：预取已有工号、整体校验后按批 upsert，并批量写入日志/时间线/审批任务"""
+
+    BATCH_SIZE = 500
+    # 预览校验时每个子任务处理的行数
+    VALIDATE_BATCH_SIZE = 500
+    # 数据行达到该数量时才启用多进程校验，小文件进程启动开销大于收益
+    PARALLEL_THRESHOLD = 2000
+    MAX_VALIDATE_WORKERS = 4
+
+    @classmethod
+    def import_records(
+        cls,
+        db: Session,
+        records: List[Tuple[int, Dict[str, Any]]],
+        *,
+        operator: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[int, Optional[int], int], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        导入 parse_contracts_from_bytes 解析出的记录
+        progress: 可选进度回调 (已处理的 Excel 行数, 总行数, 目前的错误行数)，校验完成后及每批提交后调用
+        返回：{"created", "updated", "errors"}，错误信息格式与逐行导入保持一致
+        """
+        errors: List[Tuple[int, str]] = []
+        existing = cls._prefetch_existing(db, records)
+        planned: Dict[str, _PlannedContract] = {}
+
+        for row_index, record in records:
+            record['approval_status'] = record.get('approval_status') or "approved"
+            teacher_code = record.get('teacher_code')
+            if not teacher_code:
+                errors.append((row_index, f'第 {row_index} 行缺少工号，已跳过'))
+                continue
+
+            state = planned.get(teacher_code)
+            try:
+                if state is None and teacher_code not in existing:
+                    planned[teacher_code] = cls._plan_create(ContractCreate(**record), row_index, operator)
+                else:
+                    if state is None:
+                        state = cls._state_from_existing(existing[teacher_code])
+                        planned[teacher_code] = state
+                    cls._plan_update(state, ContractUpdate(**record), row_index, operator)
+            except ValidationError as exc:
+                errors.append((row_index, validation_message(row_index, exc)))
+
+        states = [state for state in planned.values() if state.rows]
+        if any(state.needs_workflow for state in states):
+            # 默认流程阶段缺失时该方法会直接提交，需在批量写入的保存点之外调用
+            WorkflowService.ensure_default_stages(db)
+
+        created = 0
+        updated = 0
+        processed_rows = len(records) - sum(len(state.rows) for state in states)
+        if progress:
+            progress(processed_rows, len(records), len(errors))
+        size = batch_size or cls.BATCH_SIZE
+        for start in range(0, len(states), size):
+            batch = states[start:start + size]
+            try:
+                with db.begin_nested():
+                    cls._write_batch(db, batch)
+                written = batch
+            except Exception as exc:
+                # 批量写入失败时逐条重试，定位具体出错的行
+                logger.warning("批量导入写入失败，改为逐条写入: %s", exc)
+                written = []
+                for state in batch:
+                    try:
+                        with db.begin_nested():
+                            cls._write_batch(db, [state])
+                        written.append(state)
+                    except Exception as row_exc:
+                        for row_index, kind in state.rows:
+                            action = '创建' if kind == 'create' else '更新'
+                            errors.append((row_index, f'第 {row_index} 行{action}失败：{row_exc}'))
+            db.commit()
+
+            for state in written:
+                created += sum(1 for _, kind in state.rows if kind == 'create')
+                updated += sum(1 for _, kind in state.rows if kind == 'update')
+
+            processed_rows += sum(len(state.rows) for state in batch)
+            if progress:
+                progress(processed_rows, len(records), len(errors))
+
+        if states:
+            DashboardService.invalidate()
+
+        errors.sort(key=lambda item: item[0])
+        return {
+            "created": created,
+            "updated": updated,
+            "errors": [message for _, message in errors],
+        }
+
+    @classmethod
+    def preview_file(
+        cls,
+        db: Session,
+        file_bytes: bytes,
+        *,
+        workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        导入预演（dry-run）：完整执行单元格转换与 Schema 校验并计算每行的变更，不写入数据库
+        大文件按批分发到进程池校验；新增/更新的判定只依赖一次预取的已有工号
+        返回：{"total", "created", "updated", "rejected", "rows": [...]}
+        """
+        column_map, raw_rows = load_sheet_rows(file_bytes)
+        code_column = next(idx for idx, name in column_map.items() if name == 'teacher_code')
+
+        teacher_codes: List[Optional[str]] = []
+        for _, raw_row in raw_rows:
+            try:
+                value = raw_row[code_column - 1] if code_column <= len(raw_row) else None
+                teacher_codes.append(_convert_cell_value('teacher_code', value))
+            except ValueError:
+                teacher_codes.append(None)
+        existing = cls._prefetch_existing(
+            db, [(row_index, {'teacher_code': code}) for (row_index, _), code in zip(raw_rows, teacher_codes)]
+        )
+
+        # 同一工号在表中首次出现且库中不存在时按新增校验，其余按更新校验
+        seen = set(existing)
+        tasks = []
+        for (row_index, raw_row), code in zip(raw_rows, teacher_codes):
+            kind = 'update' if code in seen else 'create'
+            if code:
+                seen.add(code)
+            tasks.append((row_index, raw_row, kind))
+
+        validated = cls._validate_parallel(column_map, tasks, workers)
+        raw_by_row = dict(raw_rows)
+
+        planned: Dict[str, _PlannedContract] = {}
+        rows: List[Dict[str, Any]] = []
+        for row_index, record, payload, error in validated:
+            if record is None and error is None:
+                continue
+            teacher_code = record.get('teacher_code') if record else None
+            if (
+                isinstance(payload, ContractUpdate)
+                and teacher_code not in planned
+                and teacher_code not in existing
+            ):
+                # 该工号更早的新增行未通过校验，与实际导入一致改按新增重新校验
+                (_, record, payload, error), = validate_rows(
+                    column_map, [(row_index, raw_by_row[row_index], 'create')]
+                )
+            if error is not None:
+                rows.append({
+                    "row": row_index,
+                    "action": "reject",
+                    "teacher_code": teacher_code,
+                    "name": record.get('name') if record else None,
+                    "changes": [],
+                    "error": error,
+                })
+                continue
+
+            state = planned.get(teacher_code)
+            if isinstance(payload, ContractCreate):
+                state = cls._plan_create(payload, row_index, None)
+                planned[teacher_code] = state
+                data = payload.model_dump()
+                changes = [
+                    {
+                        "field": key,
+                        "field_label": FIELD_LABEL_MAP.get(key, key),
+                        "before": None,
+                        "after": _format_value_for_log(value),
+                    }
+                    for key, value in data.items()
+                    if value is not None
+                ]
+                action = "create"
+            else:
+                if state is None:
+                    state = cls._state_from_existing(existing[teacher_code])
+                    planned[teacher_code] = state
+                logged = len(state.logs)
+                cls._plan_update(state, payload, row_index, None)
+                changes = state.logs[-1]["changes"] if len(state.logs) > logged else []
+                action = "update"
+
+            rows.append({
+                "row": row_index,
+                "action": action,
+                "teacher_code": teacher_code,
+                "name": state.plain.get('name'),
+                "changes": changes,
+                "error": None,
+            })
+
+        return {
+            "total": len(rows),
+            "created": sum(1 for row in rows if row["action"] == "create"),
+            "updated": sum(1 for row in rows if row["action"] == "update"),
+            "rejected": sum(1 for row in rows if row["action"] == "reject"),
+            "rows": rows,
+        }
+
+    @classmethod
+    def _validate_parallel(
+        cls,
+        column_map: Dict[int, str],
+        tasks: List[Tuple[int, Tuple[Any, ...], str]],
+        workers: Optional[int],
+    ) -> List[Tuple[int, Optional[Dict[str, Any]], Any, Optional[str]]]:
+        size = cls.VALIDATE_BATCH_SIZE
+        chunks = [tasks[start:start + size] for start in range(0, len(tasks), size)]
+        worker_count = workers or min(os.cpu_count() or 1, cls.MAX_VALIDATE_WORKERS)
+        if len(tasks) < cls.PARALLEL_THRESHOLD or worker_count <= 1 or len(chunks) <= 1:
+            return validate_rows(column_map, tasks)
+
+        try:
+            # 使用 spawn 启动子进程，避免在多线程的服务进程中 fork
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(worker_count, len(chunks)), mp_context=context) as pool:
+                results = pool.map(validate_rows, [column_map] * len(chunks), chunks)
+                return [item for chunk in results for item in chunk]
+        except Exception as exc:
+            logger.warning("多进程校验失败，改为单进程校验: %s", exc)
+            return validate_rows(column_map, tasks)
+
+    @staticmethod
+    def _prefetch_existing(db: Session, records: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """一次查询取出本次导入涉及的已有合同，返回 工号 -> 列值"""
+        teacher_codes = {record.get('teacher_code') for _, record in records if record.get('teacher_code')}
+        if not teacher_codes:
+            return {}
+
+        columns = [column.key for column in Contract.__table__.columns]
+        contracts = (
+            db.query(Contract)
+            .options(*CONTRACT_LIST_LOAD)
+            .filter(Contract.teacher_code.in_(teacher_codes))
+            .all()
+        )
+        existing = {}
+        for contract in contracts:
+            existing[contract.teacher_code] = {key: getattr(contract, key) for key in columns}
+            # 后续通过 upsert 写入，避免会话中残留过期实例
+            db.expunge(contract)
+        return existing
+
+    @staticmethod
+    def _state_from_existing(values: Dict[str, Any]) -> _PlannedContract:
+        plain = dict(values)
+        for field_name in SENSITIVE_FIELDS:
+            if plain.get(field_name):
+                try:
+                    plain[field_name] = decrypt_field(plain[field_name])
+                except Exception:
+                    pass
+        return _PlannedContract(
+            contract_id=values['id'],
+            is_new=False,
+            row=dict(values),
+            plain=plain,
+            original_stats=stats_snapshot(values),
+        )
+
+    @staticmethod
+    def _plan_create(payload: ContractCreate, row_index: int, operator: Optional[str]) -> _PlannedContract:
+        """与 ContractService.create_contract 相同的规则生成新合同行"""
+        data_dict = payload.model_dump()
+        if not data_dict.get('approval_status'):
+            data_dict['approval_status'] = 'pending'
+        ContractService._ensure_teaching_years(data_dict)
+
+        contract_id = generate_uuid()
+        plain = {column.key: None for column in Contract.__table__.columns}
+        plain.update(data_dict)
+        plain['id'] = contract_id
+        plain['approval_completed_at'] = (
+            datetime.now(timezone.utc) if data_dict.get('approval_status') == 'approved' else None
+        )
+        plain['updated_at'] = datetime.now(timezone.utc)
+
+        row = dict(plain)
+        row.update(blind_indexes_for(data_dict))
+        for field_name in SENSITIVE_FIELDS:
+            if row.get(field_name):
+                row[field_name] = encrypt_field(str(row[field_name]))
+
+        log_detail = f"创建合同 {data_dict.get('name')} ({data_dict.get('teacher_code')})"
+        state = _PlannedContract(
+            contract_id=contract_id,
+            is_new=True,
+            row=row,
+            plain=plain,
+            rows=[(row_index, 'create')],
+            needs_workflow=data_dict.get('approval_status') in ('pending', 'in_progress'),
+        )
+        state.logs.append({
+            "action": "创建合同",
+            "operator": operator,
+            "detail": log_detail,
+            "changes": [
+                {
+                    "field": key,
+                    "field_label": FIELD_LABEL_MAP.get(key, key),
+                    "before": None,
+                    "after": _format_value_for_log(data_dict.get(key)),
+                }
+                for key in ('teacher_code', 'name', 'department', 'job_status')
+                if key in data_dict
+            ] or None,
+            "timeline": {
+                "event_type": 'uploaded',
+                "title": '创建合同',
+                "description": log_detail,
+                "extra_data": {'approval_status': data_dict.get('approval_status')},
+            },
+        })
+        return state
+
+    @staticmethod
+    def _plan_update(
+        state: _PlannedContract,
+        payload: ContractUpdate,
+        row_index: int,
+        operator: Optional[str],
+    ) -> None:
+        """与 ContractService.update_contract 相同的规则合并更新字段"""
+        update_dict = payload.model_dump(exclude_unset=True)
+        ContractService._ensure_teaching_years(
+            update_dict,
+            fallback_start=state.plain.get('start_work_date'),
+            fallback_entry=state.plain.get('entry_date'),
+        )
+
+        changes = []
+        for key, value in update_dict.items():
+            before_val = _format_value_for_log(state.plain.get(key))
+            after_val = _format_value_for_log(value)
+            if before_val != after_val:
+                changes.append({
+                    "field": key,
+                    "field_label": FIELD_LABEL_MAP.get(key, key),
+                    "before": before_val,
+                    "after": after_val,
+                })
+
+            if state.plain.get(key) == value:
+                continue
+            state.dirty.add(key)
+            state.plain[key] = value
+            if key in SENSITIVE_FIELDS and value:
+                state.row[key] = encrypt_field(str(value))
+            else:
+                state.row[key] = value
+
+        for key, value in blind_indexes_for(update_dict).items():
+            if state.row.get(key) != value:
+                state.dirty.add(key)
+                state.row[key] = value
+        if 'approval_status' in state.dirty and 'approval_status' in update_dict:
+            completed_at = datetime.now(timezone.utc) if update_dict['approval_status'] == 'approved' else None
+            state.plain['approval_completed_at'] = completed_at
+            state.row['approval_completed_at'] = completed_at
+            state.dirty.add('approval_completed_at')
+        state.plain['updated_at'] = state.row['updated_at'] = datetime.now(timezone.utc)
+
+        state.rows.append((row_index, 'update'))
+        if changes:
+            state.logs.append({
+                "action": "更新合同信息",
+                "operator": operator,
+                "detail": f"更新合同 {state.plain.get('name')} ({state.plain.get('teacher_code')})",
+                "changes": changes,
+            })
+
+    @classmethod
+    def _write_batch(cls, db: Session, states: List[_PlannedContract]) -> None:
+        columns = [
+            column.key for column in Contract.__table__.columns
+            if column.key not in _SERVER_MANAGED_COLUMNS
+        ]
+        new_states = [state for state in states if state.is_new]
+        if new_states:
+            rows = [{key: state.row.get(key) for key in columns} for state in new_states]
+            inserted = cls._insert_rows(db, rows)
+            raced = [state for state in new_states if state.row['teacher_code'] not in inserted]
+            if raced:
+                cls._merge_into_existing(db, raced, columns)
+
+        updates = [
+            {'id': state.contract_id, 'updated_at': state.row['updated_at'], **{key: state.row[key] for key in state.dirty}}
+            for state in states
+            if not state.is_new and state.dirty
+        ]
+        if updates:
+            db.execute(update(Contract), updates)
+
+        deltas: StatsDelta = {}
+        for state in states:
+            if state.is_new or state.original_stats is not None:
+                ContractStatsService.add_change(deltas, state.original_stats, stats_snapshot(state.row))
+        ContractStatsService.apply_deltas(db, deltas)
+
+        for state in states:
+            for entry in state.logs:
+                ContractService._append_contract_log(
+                    db,
+                    contract_id=state.contract_id,
+                    action=entry["action"],
+                    operator=entry["operator"],
+                    detail=entry["detail"],
+                    changes=entry["changes"],
+                )
+                timeline = entry.get("timeline")
+                if timeline:
+                    ContractService._add_timeline_entry(
+                        db,
+                        contract_id=state.contract_id,
+                        operator=entry["operator"],
+                        commit=False,
+                        **timeline,
+                    )
+
+        workflow_ids = [state.contract_id for state in states if state.needs_workflow]
+        if workflow_ids:
+            contracts = (
+                db.query(Contract)
+                .options(*CONTRACT_LIST_LOAD)
+                .filter(Contract.id.in_(workflow_ids))
+                .all()
+            )
+            ApprovalWorkflowService.create_workflows_for_contracts(db, contracts)
+
+        db.flush()
+
+    @staticmethod
+    def _insert_rows(db: Session, rows: List[Dict[str, Any]]) -> Set[str]:
+        """
+        插入新合同：按 teacher_code 执行 INSERT ... ON CONFLICT DO NOTHING ... RETURNING
+        返回实际插入的工号；未返回的工号已在预取之后被并发创建
+        """
+        table = Contract.__table__
+        dialect = db.get_bind().dialect.name
+
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            # 不支持 ON CONFLICT 的数据库直接插入，工号冲突时由调用方逐条重试定位
+            db.execute(insert(Contract), rows)
+            return {row['teacher_code'] for row in rows}
+
+        stmt = (
+            dialect_insert(table)
+            .on_conflict_do_nothing(index_elements=[table.c.teacher_code])
+            .returning(table.c.teacher_code)
+        )
+        return {teacher_code for (teacher_code,) in db.execute(stmt, rows)}
+
+    @staticmethod
+    def _merge_into_existing(db: Session, states: List[_PlannedContract], columns: List[str]) -> None:
+        """
+        预取之后其他请求插入了同一工号：锁定并读取该合同，把本次导入提供的非空列作为更新合并进去
+        以读取到的行作为统计快照，写入时按 dirty 列更新并计入 contract_stats 的增量
+        """
+        table = Contract.__table__
+        current_rows = {
+            row.teacher_code: dict(row._mapping)
+            for row in db.execute(
+                table.select()
+                .where(table.c.teacher_code.in_([state.row['teacher_code'] for state in states]))
+                .with_for_update()
+            )
+        }
+        for state in states:
+            current = current_rows[state.row['teacher_code']]
+            logger.warning(
+                "导入工号 %s 时该工号已被并发创建，已合并更新到合同 %s",
+                state.row['teacher_code'], current['id'],
+            )
+            merged = {
+                key: state.row[key]
+                for key in columns
+                if key not in _IMMUTABLE_COLUMNS and state.row.get(key) is not None
+            }
+            state.contract_id = current['id']
+            state.is_new = False
+            state.needs_workflow = False
+            state.original_stats = stats_snapshot(current)
+            state.row = {**current, **merged}
+            state.dirty = {key for key, value in merged.items() if current.get(key) != value}
+            state.rows = [(row_index, 'update') for row_index, _ in state.rows]
+            for entry in state.logs:
+                if entry.pop("timeline", None):
+                    entry["action"] = "更新合同信息"
+                    entry["detail"] = f"更新合同 {state.plain.get('name')} ({state.plain.get('teacher_code')})"
@@ -1,10 +1,11 @@
-﻿from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+﻿from sqlalchemy.orm import Session, Query, lazyload, selectinload
+from sqlalchemy import or_, and_, tuple_, text, func
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, List, Tuple, Dict
+from typing import Optional, List, Tuple, Dict, Iterator, Collection
 from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-import io
+import base64
+import json
 import math
 import re
 
@@ -16,16 +17,29 @@ from app.models.approval import ApprovalTask
 from app.schemas.contract import (
     ContractCreate,
     ContractUpdate,
+    ContractResponse,
     ContractLifecycleResponse,
     ContractLifecycleSummary,
     ContractTimelineEventCreate,
     ContractTimelineEventUpdate,
 )
-from app.utils.encryption import encrypt_field, decrypt_field, SENSITIVE_FIELDS
+from app.utils.encryption import (
+    BLIND_INDEX_FIELDS,
+    SENSITIVE_FIELDS,
+    blind_index,
+    blind_indexes_for,
+    decrypt_field,
+    encrypt_field,
+)
+from app.utils.contract_view import ContractView, contract_views, decrypt_contracts_batch
 from app.services.approval_workflow_service import ApprovalWorkflowService
-from app.services.file_storage_service import file_storage_service
+from app.services.contract_stats_service import ContractStatsService, stats_snapshot
+from app.services.dashboard_service import DashboardService
+from app.services.contract_file_service import ContractFileService
+from app.services.file_storage_service import DecryptedFile, file_storage_service
 from app.utils.excel_import import FIELD_TO_LABEL
 from app.utils.field_defaults import DEFAULT_FIELD_CONFIGS
+from app.utils.upload import ReceivedUpload
 
 
 FIELD_LABEL_MAP: Dict[str, str] = {
@@ -43,6 +57,47 @@ def _format_value_for_log(value: Optional[object]) -> Optional[str]:
         return value.strftime("%Y-%m-%d")
     return str(value)
 
+
+# 搜索字段：PostgreSQL 下由 pg_trgm GIN 索引加速
+SEARCH_FIELDS = ('name', 'teacher_code', 'department')
+
+# 加载策略：列表/导出/到期扫描只取合同标量列，生命周期视图再批量加载关联数据
+CONTRACT_LIST_LOAD = (
+    lazyload(Contract.attachments),
+    lazyload(Contract.timelines),
+    lazyload(Contract.logs),
+)
+CONTRACT_LIFECYCLE_LOAD = (
+    selectinload(Contract.attachments),
+    selectinload(Contract.timelines),
+    selectinload(Contract.logs),
+)
+
+# 进程内缓存 pg_trgm 扩展是否可用，None 表示尚未探测
+_trgm_available: Optional[bool] = None
+
+
+def _encode_cursor(contract: Contract) -> str:
+    """将 (created_at, id) 编码为不透明的分页游标（created_at 为非空列）。"""
+    payload = {
+        "c": contract.created_at.isoformat(),
+        "i": contract.id,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """解析分页游标，格式非法时抛出 ValueError。"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(payload["c"])
+        contract_id = str(payload["i"])
+    except Exception as exc:
+        raise ValueError("分页游标无效，请刷新列表后重试") from exc
+    return created_at, contract_id
+
 class ContractService:
     model = Contract
     """合同服务：处理业务逻辑"""
@@ -54,7 +109,7 @@ class ContractService:
         *,
         operator: Optional[str] = None,
         original_filename: Optional[str] = None,
-    ) -> Contract:
+    ) -> ContractView:
         """创建合同记录"""
         # 准备数据
         data_dict = contract_data.model_dump()
@@ -70,7 +125,8 @@ class ContractService:
             if existing_contract:
                 raise ValueError(f"员工工号 {teacher_code} 已存在，请检查是否重复录入")
         
-        # 加密敏感字段
+        # 盲索引需基于明文计算，之后再加密敏感字段
+        data_dict.update(blind_indexes_for(data_dict))
         for field in SENSITIVE_FIELDS:
             if field in data_dict and data_dict[field]:
                 data_dict[field] = encrypt_field(str(data_dict[field]))
@@ -83,6 +139,7 @@ class ContractService:
             db_contract.approval_completed_at = datetime.now(timezone.utc)
         else:
             db_contract.approval_completed_at = None
+        ContractStatsService.record_change(db, None, stats_snapshot(db_contract))
 
         should_create_workflow = data_dict.get('approval_status') in ('pending', 'in_progress')
 
@@ -143,20 +200,22 @@ class ContractService:
             )
 
         db.commit()
+        DashboardService.invalidate()
         db.refresh(db_contract)
         
-        # 解密敏感字段用于返回
-        ContractService._decrypt_contract(db_contract)
-        
-        return db_contract
+        # 返回只读视图，敏感字段按需解密
+        return ContractView(db_contract)
     
     @staticmethod
-    def get_contract(db: Session, contract_id: str) -> Optional[Contract]:
+    def get_contract(db: Session, contract_id: str) -> Optional[ContractView]:
         """获取单个合同"""
-        contract = db.query(Contract).filter(Contract.id == contract_id).first()
-        if contract:
-            ContractService._decrypt_contract(contract)
-        return contract
+        contract = (
+            db.query(Contract)
+            .options(*CONTRACT_LIST_LOAD)
+            .filter(Contract.id == contract_id)
+            .first()
+        )
+        return ContractView(contract) if contract else None
     
     @staticmethod
     def get_contracts(
@@ -168,64 +227,91 @@ class ContractService:
         search: Optional[str] = None,
         approval_status: Optional[str] = "approved",
         expiring_within_days: Optional[int] = None,
-    ) -> tuple[List[Contract], int]:
+        hidden_fields: Collection[str] = (),
+    ) -> tuple[List[ContractView], int]:
         """
         获取合同列表（分页）
-        返回：(合同列表, 总数)
+        hidden_fields: 调用方不需要的敏感字段，读取为 None 且不解密
+        返回：(合同视图列表, 总数)
         """
-        query = db.query(Contract)
-
-        if approval_status and approval_status != "all":
-            query = query.filter(Contract.approval_status == approval_status)
-        
-        # ID 筛选优先
-        # 部门筛选
-        if department:
-            query = query.filter(Contract.department == department)
-        
-        # 在职状态筛选
-        if job_status:
-            query = query.filter(Contract.job_status == job_status)
-        
-        # 搜索（姓名、工号、部门）
-        if search:
-            query = query.filter(
-                or_(
-                    Contract.name.contains(search),
-                    Contract.teacher_code.contains(search),
-                    Contract.department.contains(search),
-                )
-            )
-        
-        if expiring_within_days is not None:
-            today = datetime.now().date()
-            future_date = today + timedelta(days=expiring_within_days)
-            active_statuses = ['在职', '试用期']
-
-            query = query.filter(
-                Contract.contract_end.isnot(None),
-                Contract.contract_end >= today,
-                Contract.contract_end <= future_date,
-                Contract.job_status.in_(active_statuses),
-            )
+        query = ContractService._build_list_query(
+            db,
+            department=department,
+            job_status=job_status,
+            search=search,
+            approval_status=approval_status,
+            expiring_within_days=expiring_within_days,
+        )
 
         # 计算总数
         total = query.count()
+
+        # 有搜索词且支持相似度排序时按相关度排序
+        order_by = [Contract.created_at.desc()]
+        if search and ContractService._trgm_enabled(db):
+            order_by.insert(0, ContractService._search_rank(search).desc())
         
         # 分页
         contracts = (
-            query.order_by(Contract.created_at.desc())
+            query.order_by(*order_by)
             .offset((page - 1) * page_size)
             .limit(page_size)
             .all()
         )
         
-        # 解密敏感字段
-        for contract in contracts:
-            ContractService._decrypt_contract(contract)
-        
-        return contracts, total
-    
+        return contract_views(contracts, hidden=hidden_fields), total
+
+    @staticmethod
+    def get_contracts_by_cursor(
+        db: Session,
+        cursor: Optional[str] = None,
+        page_size: int = 20,
+        department: Optional[str] = None,
+        job_status: Optional[str] = None,
+        search: Optional[str] = None,
+        approval_status: Optional[str] = "approved",
+        expiring_within_days: Optional[int] = None,
+        total_mode: str = "none",
+        hidden_fields: Collection[str] = (),
+    ) -> tuple[List[ContractView], Optional[str], Optional[int]]:
+        """
+        基于 (created_at, id) 游标的键集分页，翻页成本与深度无关
+        total_mode: none 不统计 / estimate 使用查询计划估算 / exact 精确统计
+        hidden_fields: 调用方不需要的敏感字段，读取为 None 且不解密
+        返回：(合同视图列表, 下一页游标, 总数)
+        """
+        query = ContractService._build_list_query(
+            db,
+            department=department,
+            job_status=job_status,
+            search=search,
+            approval_status=approval_status,
+            expiring_within_days=expiring_within_days,
+        )
+
+        total: Optional[int] = None
+        if total_mode == "exact":
+            total = query.count()
+        elif total_mode == "estimate":
+            total = ContractService._estimate_count(db, query)
+
+        if cursor:
+            created_at, contract_id = _decode_cursor(cursor)
+            query = query.filter(
+                tuple_(Contract.created_at, Contract.id) < tuple_(created_at, contract_id)
+            )
+
+        # 多取一条用于判断是否存在下一页
+        rows = (
+            query.order_by(Contract.created_at.desc(), Contract.id.desc())
+            .limit(page_size + 1)
+            .all()
+        )
+        contracts = rows[:page_size]
+        next_cursor = _encode_cursor(contracts[-1]) if len(rows) > page_size else None
+
+        return contract_views(contracts, hidden=hidden_fields), next_cursor, total
+
     @staticmethod
     def update_contract(
         db: Session,
@@ -233,7 +319,7 @@ class ContractService:
         update_data: ContractUpdate,
         *,
         operator: Optional[str] = None,
-    ) -> Optional[Contract]:
+    ) -> Optional[ContractView]:
         """更新合同信息"""
         contract = db.query(Contract).filter(Contract.id == contract_id).first()
         if not contract:
@@ -268,13 +354,20 @@ class ContractService:
             if existing_contract:
                 raise ValueError(f"员工工号 {teacher_code} 已被其他合同使用，请检查是否重复")
 
-        # 加密敏感字段
+        # 盲索引需基于明文计算，之后再加密敏感字段
+        blind_indexes = blind_indexes_for(update_dict)
         for field in SENSITIVE_FIELDS:
             if field in update_dict and update_dict[field]:
                 update_dict[field] = encrypt_field(str(update_dict[field]))
         
+        stats_before = stats_snapshot(contract)
         for key, value in update_dict.items():
             setattr(contract, key, value)
+        for key, value in blind_indexes.items():
+            setattr(contract, key, value)
+        stats_after = stats_snapshot(contract)
+        if stats_after != stats_before:
+            ContractStatsService.record_change(db, stats_before, stats_after)
         
         if 'approval_status' in update_dict:
             if update_dict['approval_status'] == 'approved':
@@ -283,15 +376,16 @@ class ContractService:
                 contract.approval_completed_at = None
         contract.updated_at = datetime.now()
         db.commit()
+        DashboardService.invalidate()
         db.refresh(contract)
-        
-        # 解密敏感字段
-        ContractService._decrypt_contract(contract)
+
+        # 通过只读视图读取明文，底层实例保持密文，后续提交日志时不会写回明文
+        view = ContractView(contract)
 
         changes_payload = []
         for key in update_dict.keys():
             before_val = before_values.get(key)
-            after_val = _format_value_for_log(getattr(contract, key, None))
+            after_val = _format_value_for_log(getattr(view, key, None))
             if before_val == after_val:
                 continue
             changes_payload.append({
@@ -312,9 +406,9 @@ class ContractService:
             )
             db.commit()
             db.refresh(contract)
-            ContractService._decrypt_contract(contract)
+            view = ContractView(contract)
         
-        return contract
+        return view
     
     @staticmethod
     def delete_contract(db: Session, contract_id: str) -> bool:
@@ -323,8 +417,12 @@ class ContractService:
         if not contract:
             return False
         
+        file_paths = [contract.file_url, *(attachment.file_url for attachment in contract.attachments)]
+        ContractStatsService.record_change(db, stats_snapshot(contract), None)
         db.delete(contract)
         db.commit()
+        DashboardService.invalidate()
+        ContractFileService.release(db, file_paths)
         return True
     
     @staticmethod
@@ -335,70 +433,85 @@ class ContractService:
         search: Optional[str] = None,
         ids: Optional[List[str]] = None,
         approval_status: Optional[str] = "approved",
-    ) -> List[Contract]:
+    ) -> List[ContractView]:
         """获取用于导出的合同列表（不分页）"""
-        query = db.query(Contract)
-        
-        if ids:
-            query = query.filter(Contract.id.in_(ids))
-
-        if department:
-            query = query.filter(Contract.department == department)
+        query = ContractService._build_list_query(
+            db,
+            department=department,
+            job_status=job_status,
+            search=search,
+            approval_status=approval_status,
+            ids=ids,
+        )
 
-        if job_status:
-            query = query.filter(Contract.job_status == job_status)
+        if search and ContractService._trgm_enabled(db):
+            query = query.order_by(
+                ContractService._search_rank(search).desc(),
+                Contract.created_at.desc(),
+            )
+        
+        return decrypt_contracts_batch(query.all())
 
-        if approval_status and approval_status != "all":
-            query = query.filter(Contract.approval_status == approval_status)
+    @staticmethod
+    def iter_contracts_for_export(
+        db: Session,
+        department: Optional[str] = None,
+        job_status: Optional[str] = None,
+        search: Optional[str] = None,
+        ids: Optional[List[str]] = None,
+        approval_status: Optional[str] = "approved",
+        batch_size: int = 500,
+    ) -> Iterator[ContractView]:
+        """
+        逐批读取用于导出的合同（PostgreSQL 下使用服务端游标）
+        每批记录从会话中移除后在线程池中批量解密，以只读视图返回
+        """
+        query = ContractService._build_list_query(
+            db,
+            department=department,
+            job_status=job_status,
+            search=search,
+            approval_status=approval_status,
+            ids=ids,
+        )
 
-        if search:
-            query = query.filter(
-                or_(
-                    Contract.name.contains(search),
-                    Contract.teacher_code.contains(search),
-                    Contract.department.contains(search),
-                )
+        if search and ContractService._trgm_enabled(db):
+            query = query.order_by(
+                ContractService._search_rank(search).desc(),
+                Contract.created_at.desc(),
             )
-        
-        contracts = query.all()
-        
-        # 解密敏感字段
-        for contract in contracts:
-            ContractService._decrypt_contract(contract)
-        
-        return contracts
+
+        batch: List[Contract] = []
+        for contract in query.yield_per(batch_size):
+            db.expunge(contract)
+            batch.append(contract)
+            if len(batch) >= batch_size:
+                yield from decrypt_contracts_batch(batch)
+                batch = []
+        if batch:
+            yield from decrypt_contracts_batch(batch)
 
     @staticmethod
     def get_contract_lifecycle(db: Session, contract_id: str) -> Optional[ContractLifecycleResponse]:
-        contract = ContractService.get_contract(db, contract_id)
+        contract = (
+            db.query(Contract)
+            .options(*CONTRACT_LIFECYCLE_LOAD)
+            .filter(Contract.id == contract_id)
+            .first()
+        )
         if not contract:
             return None
+        view = ContractView(contract)
 
-        timelines = (
-            db.query(ContractTimeline)
-            .filter(ContractTimeline.contract_id == contract_id)
-            .order_by(ContractTimeline.created_at.asc())
-            .all()
-        )
+        # 关联数据的排序由 Contract 关系上的 order_by 保证
+        timelines = list(contract.timelines)
+        attachments = list(contract.attachments)
+        logs = list(contract.logs)
 
-        attachments = (
-            db.query(ContractAttachment)
-            .filter(ContractAttachment.contract_id == contract_id)
-            .order_by(ContractAttachment.uploaded_at.desc())
-            .all()
-        )
-
-        logs = (
-            db.query(ContractLog)
-            .filter(ContractLog.contract_id == contract_id)
-            .order_by(ContractLog.created_at.desc())
-            .all()
-        )
-
-        summary = ContractService._build_lifecycle_summary(contract, timelines, attachments, logs)
+        summary = ContractService._build_lifecycle_summary(view, timelines, attachments, logs)
 
         return ContractLifecycleResponse(
-            contract=contract,
+            contract=ContractResponse.model_validate(view),
             timeline=timelines,
             attachments=attachments,
             logs=logs,
@@ -559,20 +672,18 @@ class ContractService:
         db: Session,
         contract_id: str,
         *,
-        filename: str,
-        content: bytes,
+        upload: ReceivedUpload,
         uploader: Optional[str] = None,
         content_type: Optional[str] = None,
     ) -> Optional[ContractAttachment]:
+        """保存已接收的上传文件并登记为合同附件（附件名取 upload.filename）"""
         contract = db.query(Contract).filter(Contract.id == contract_id).first()
         if not contract:
             return None
 
-        if not content:
-            raise ValueError("附件内容为空")
-
+        filename = upload.filename
         suffix = Path(filename).suffix.lstrip('.')
-        storage_meta = file_storage_service.save_encrypted(io.BytesIO(content), filename)
+        storage_meta = ContractFileService.store_upload(upload)
 
         attachment = ContractAttachment(
             contract_id=contract_id,
@@ -617,10 +728,8 @@ class ContractService:
         db.delete(attachment)
         db.commit()
 
-        try:
-            file_storage_service.delete(file_path)
-        except Exception:
-            pass
+        # 同一文件可能仍被合同原件或其他附件引用，最后一个引用移除时才删除
+        ContractFileService.release(db, [file_path])
 
         ContractService._append_contract_log(
             db,
@@ -645,7 +754,8 @@ class ContractService:
         db: Session,
         contract_id: str,
         attachment_id: str,
-    ) -> Optional[tuple[ContractAttachment, bytes]]:
+    ) -> Optional[tuple[ContractAttachment, DecryptedFile]]:
+        """返回附件记录与可按区间流式解密的文件句柄"""
         attachment = (
             db.query(ContractAttachment)
             .filter(ContractAttachment.id == attachment_id, ContractAttachment.contract_id == contract_id)
@@ -654,8 +764,7 @@ class ContractService:
         if not attachment:
             return None
 
-        data = file_storage_service.load_decrypted(attachment.file_url)
-        return attachment, data
+        return attachment, file_storage_service.open_decrypted(attachment.file_url, cached=True)
 
     @staticmethod
     def _build_lifecycle_summary(
@@ -693,14 +802,14 @@ class ContractService:
         )
     
     @staticmethod
-    def get_expiring_contracts(db: Session, days: int = 30) -> List[Contract]:
+    def get_expiring_contracts(db: Session, days: int = 30) -> List[ContractView]:
         """获取即将到期的合同"""
         today = datetime.now().date()
         future_date = today + timedelta(days=days)
         
         active_statuses = ['在职', '试用期']
 
-        contracts = db.query(Contract).filter(
+        contracts = db.query(Contract).options(*CONTRACT_LIST_LOAD).filter(
             and_(
                 Contract.contract_end >= today,
                 Contract.contract_end <= future_date,
@@ -709,81 +818,110 @@ class ContractService:
             )
         ).all()
         
-        for contract in contracts:
-            ContractService._decrypt_contract(contract)
-        
-        return contracts
+        return contract_views(contracts)
 
     @staticmethod
     def get_dashboard_breakdown(db: Session) -> dict:
-        """获取仪表盘子项统计数据"""
-        from sqlalchemy import func, case
-        from app.models.approval import ApprovalTask
-
-        # 教师总数拆分：尝试按照职务识别专任/外聘
-        total_teachers = db.query(func.count(Contract.id)).filter(Contract.approval_status == "approved").scalar() or 0
-
-        regular_teachers = db.query(func.count(Contract.id)).filter(
-            Contract.approval_status == "approved",
-            Contract.job_status == '在职',
-            func.lower(func.coalesce(Contract.position, ''))
-            .notlike('%外聘%')
-        ).scalar() or 0
-
-        part_time_teachers = total_teachers - regular_teachers
-
-        # 试用期教师
-        probation_teachers = db.query(func.count(Contract.id)).filter(
-            Contract.approval_status == "approved",
-            func.lower(Contract.job_status) == '试用期'
-        ).scalar() or 0
-
-        expiring_30 = ContractService.get_expiring_contracts(db, days=30)
-        expiring_30_count = len(expiring_30)
-        expiring_contracts = len(ContractService.get_expiring_contracts(db, days=90))
-
-        # OCR 相关统计
-        average_confidence = db.query(func.avg(Contract.ocr_confidence)).filter(Contract.approval_status == "approved").scalar() or 0.0
-        
-        # 待复核：统计仍在流程中的审批任务数量（pending 或 in_progress）
-        pending_tasks = db.query(ApprovalTask.contract_id).filter(
-            ApprovalTask.status.in_(['pending', 'in_progress'])
-        ).all()
+        """获取仪表盘子项统计数据（与仪表盘总览共用同一份缓存统计）"""
+        return DashboardService.get_stats(db)['breakdown']
 
-        contract_ids = {task.contract_id for task in pending_tasks if task.contract_id}
-        if contract_ids:
-            pending_contracts = db.query(func.count(Contract.id)).filter(Contract.id.in_(contract_ids)).scalar() or 0
-        else:
-            pending_contracts = 0
-
-        return {
-            'totalTeachersBreakdown': {
-                'regular': regular_teachers,
-                'partTime': part_time_teachers,
-            },
-            'probationTeachers': probation_teachers,
-            'expiringWithin90Days': expiring_contracts,
-            'averageConfidence': average_confidence,
-            'pendingReview': pending_contracts,
-            'sidebarSummary': {
-                'pendingReview': pending_contracts,
-                'probationTeachers': probation_teachers,
-                'expiringWithin30Days': expiring_30_count,
-                'expiringWithin90Days': expiring_contracts,
-                'averageConfidence': average_confidence,
-            }
-        }
-    
     @staticmethod
-    def _decrypt_contract(contract: Contract):
-        """解密合同中的敏感字段"""
-        for field in SENSITIVE_FIELDS:
-            value = getattr(contract, field, None)
-            if value:
-                try:
-                    setattr(contract, field, decrypt_field(value))
-                except:
-                    pass  # 如果解密失败，保持原值
+    def _build_list_query(
+        db: Session,
+        *,
+        department: Optional[str] = None,
+        job_status: Optional[str] = None,
+        search: Optional[str] = None,
+        approval_status: Optional[str] = "approved",
+        expiring_within_days: Optional[int] = None,
+        ids: Optional[List[str]] = None,
+    ) -> Query:
+        """构建列表/导出共用的筛选查询（仅加载合同标量列）"""
+        query = db.query(Contract).options(*CONTRACT_LIST_LOAD)
+
+        if ids:
+            query = query.filter(Contract.id.in_(ids))
+
+        if approval_status and approval_status != "all":
+            query = query.filter(Contract.approval_status == approval_status)
+
+        # 部门筛选
+        if department:
+            query = query.filter(Contract.department == department)
+
+        # 在职状态筛选
+        if job_status:
+            query = query.filter(Contract.job_status == job_status)
+
+        # 搜索（姓名、工号、部门模糊匹配；身份证号、电话通过盲索引精确匹配）
+        if search:
+            search_index = blind_index(search)
+            conditions = [getattr(Contract, field).contains(search) for field in SEARCH_FIELDS]
+            if search_index:
+                conditions.extend(
+                    getattr(Contract, index_column) == search_index
+                    for index_column in BLIND_INDEX_FIELDS.values()
+                )
+            query = query.filter(or_(*conditions))
+
+        if expiring_within_days is not None:
+            today = datetime.now().date()
+            future_date = today + timedelta(days=expiring_within_days)
+            active_statuses = ['在职', '试用期']
+
+            query = query.filter(
+                Contract.contract_end.isnot(None),
+                Contract.contract_end >= today,
+                Contract.contract_end <= future_date,
+                Contract.job_status.in_(active_statuses),
+            )
+
+        return query
+
+    @staticmethod
+    def _trgm_enabled(db: Session) -> bool:
+        """判断当前数据库是否可使用 pg_trgm 相似度（SQLite 等退回普通 LIKE）"""
+        global _trgm_available
+        bind = db.get_bind()
+        if bind.dialect.name != "postgresql":
+            return False
+        if _trgm_available is None:
+            _trgm_available = bool(
+                db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+            )
+        return _trgm_available
+
+    @staticmethod
+    def _search_rank(search: str):
+        """搜索相关度：取各搜索字段与关键词的最大三元组相似度"""
+        return func.greatest(*[
+            func.similarity(func.coalesce(getattr(Contract, field), ''), search)
+            for field in SEARCH_FIELDS
+        ])
+
+    @staticmethod
+    def _estimate_count(db: Session, query: Query) -> int:
+        """
+        使用 PostgreSQL 查询计划的行数估算代替 COUNT(*)
+        其他数据库退回精确统计
+        """
+        bind = db.get_bind()
+        if bind.dialect.name != "postgresql":
+            return query.count()
+
+        compiled = query.with_entities(Contract.id).statement.compile(
+            dialect=bind.dialect,
+            compile_kwargs={"literal_binds": True},
+        )
+        # text() 会把冒号识别为绑定参数，字面量中的冒号需转义
+        sql = str(compiled).replace(":", "\\:")
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        try:
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except (TypeError, KeyError, IndexError, ValueError):
+            return query.count()
 
     @staticmethod
     def _append_contract_log(
@@ -0,0 +1,190 @@
+"""合同统计汇总表（contract_stats）的增量维护、重建与一致性校验"""
+from __future__ import annotations
+
+import logging
+import math
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.contract import Contract
+from app.models.contract_stats import ContractStat
+
+logger = logging.getLogger(__name__)
+
+# 汇总维度，顺序即 StatsKey 元组的顺序
+STATS_DIMENSIONS = ('department', 'job_status', 'approval_status', 'end_month', 'is_external')
+# 决定汇总维度与置信度的合同字段
+STATS_SOURCE_FIELDS = ('department', 'job_status', 'approval_status', 'contract_end', 'position', 'ocr_confidence')
+
+StatsKey = Tuple[str, str, str, str, bool]
+# [合同数, 置信度之和, 置信度非空数]
+StatsDelta = Dict[StatsKey, List[float]]
+
+
+def stats_snapshot(source: Any) -> Dict[str, Any]:
+    """从合同实例或列值字典中取出统计相关字段"""
+    if isinstance(source, Mapping):
+        return {name: source.get(name) for name in STATS_SOURCE_FIELDS}
+    return {name: getattr(source, name, None) for name in STATS_SOURCE_FIELDS}
+
+
+def stats_key(snapshot: Mapping[str, Any]) -> StatsKey:
+    contract_end = snapshot.get('contract_end')
+    end_month = contract_end.strftime('%Y-%m') if isinstance(contract_end, date) else ''
+    position = (snapshot.get('position') or '').lower()
+    return (
+        snapshot.get('department') or '',
+        snapshot.get('job_status') or '',
+        snapshot.get('approval_status') or '',
+        end_month,
+        '外聘' in position,
+    )
+
+
+class ContractStatsService:
+    """contract_stats 汇总表维护"""
+
+    # 一致性校验时置信度之和允许的浮点误差
+    CONFIDENCE_TOLERANCE = 1e-6
+
+    @staticmethod
+    def add_change(
+        deltas: StatsDelta,
+        before: Optional[Mapping[str, Any]],
+        after: Optional[Mapping[str, Any]],
+    ) -> None:
+        """把一条合同由 before 变为 after 的影响累加到 deltas（新增时 before 为空，删除时 after 为空）"""
+        for snapshot, sign in ((before, -1), (after, 1)):
+            if snapshot is None:
+                continue
+            entry = deltas.setdefault(stats_key(snapshot), [0, 0.0, 0])
+            entry[0] += sign
+            confidence = snapshot.get('ocr_confidence')
+            if confidence is not None:
+                entry[1] += sign * float(confidence)
+                entry[2] += sign
+
+    @staticmethod
+    def record_change(
+        db: Session,
+        before: Optional[Mapping[str, Any]],
+        after: Optional[Mapping[str, Any]],
+    ) -> None:
+        """在当前事务中记录单条合同变更，随合同写入一起提交"""
+        deltas: StatsDelta = {}
+        ContractStatsService.add_change(deltas, before, after)
+        ContractStatsService.apply_deltas(db, deltas)
+
+    @staticmethod
+    def apply_deltas(db: Session, deltas: StatsDelta) -> None:
+        """把累加好的增量写入汇总表（INSERT ... ON CONFLICT 原子累加）"""
+        rows = [
+            {
+                **dict(zip(STATS_DIMENSIONS, key)),
+                'contract_count': int(count),
+                'confidence_sum': float(confidence_sum),
+                'confidence_count': int(confidence_count),
+            }
+            for key, (count, confidence_sum, confidence_count) in deltas.items()
+            if count or confidence_count or confidence_sum
+        ]
+        if not rows:
+            return
+
+        table = ContractStat.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            dialect_insert = None
+
+        if dialect_insert is None:
+            for row in rows:
+                stat = db.get(ContractStat, tuple(row[name] for name in STATS_DIMENSIONS))
+                if stat is None:
+                    db.add(ContractStat(**row))
+                else:
+                    stat.contract_count += row['contract_count']
+                    stat.confidence_sum += row['confidence_sum']
+                    stat.confidence_count += row['confidence_count']
+            db.flush()
+            return
+
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in STATS_DIMENSIONS],
+            set_={
+                name: table.c[name] + stmt.excluded[name]
+                for name in ('contract_count', 'confidence_sum', 'confidence_count')
+            },
+        )
+        db.execute(stmt, rows)
+
+    @staticmethod
+    def compute_live(db: Session) -> StatsDelta:
+        """从 contracts 表逐批读取统计字段，重新计算完整汇总"""
+        columns = [getattr(Contract, name) for name in STATS_SOURCE_FIELDS]
+        totals: StatsDelta = {}
+        for row in db.query(*columns).yield_per(5000):
+            ContractStatsService.add_change(totals, None, dict(zip(STATS_SOURCE_FIELDS, row)))
+        return totals
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """
+        清空并重新生成汇总表，返回写入的分组数
+        重建期间的并发写入可能被覆盖，建议在维护窗口执行后再运行 check 确认
+        """
+        totals = ContractStatsService.compute_live(db)
+        db.query(ContractStat).delete(synchronize_session=False)
+        ContractStatsService.apply_deltas(db, totals)
+        db.commit()
+        return sum(1 for count, _, _ in totals.values() if count)
+
+    @staticmethod
+    def check(db: Session) -> List[Dict[str, Any]]:
+        """对比汇总表与实时统计，返回不一致的分组（为空表示一致）"""
+        live = ContractStatsService.compute_live(db)
+        stored: StatsDelta = {
+            tuple(getattr(stat, name) for name in STATS_DIMENSIONS): [
+                stat.contract_count,
+                stat.confidence_sum,
+                stat.confidence_count,
+            ]
+            for stat in db.query(ContractStat).all()
+        }
+
+        mismatches = []
+        for key in set(live) | set(stored):
+            expected = live.get(key, [0, 0.0, 0])
+            actual = stored.get(key, [0, 0.0, 0])
+            if (
+                expected[0] != actual[0]
+                or expected[2] != actual[2]
+                or not math.isclose(
+                    expected[1], actual[1], abs_tol=ContractStatsService.CONFIDENCE_TOLERANCE
+                )
+            ):
+                mismatches.append({
+                    **dict(zip(STATS_DIMENSIONS, key)),
+                    'expected': {'contract_count': expected[0], 'confidence_sum': expected[1], 'confidence_count': expected[2]},
+                    'actual': {'contract_count': actual[0], 'confidence_sum': actual[1], 'confidence_count': actual[2]},
+                })
+        mismatches.sort(key=lambda item: tuple(str(item[name]) for name in STATS_DIMENSIONS))
+        return mismatches
+
+    @staticmethod
+    def ensure_initialized(db: Session) -> bool:
+        """汇总表为空而合同表有数据时（首次部署）自动重建，返回是否执行了重建"""
+        if db.query(ContractStat).first() is not None:
+            return False
+        if db.query(func.count(Contract.id)).scalar() == 0:
+            return False
+        groups = ContractStatsService.rebuild(db)
+        logger.info("合同统计汇总表初始化完成，共 %d 个分组", groups)
+        return True
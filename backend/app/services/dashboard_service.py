@@ -0,0 +1,157 @@
+"""仪表盘统计服务：基于 contract_stats 汇总表的单条聚合查询 + 短 TTL 缓存"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, distinct, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.approval import ApprovalTask
+from app.models.contract import Contract
+from app.models.contract_stats import ContractStat
+
+# 到期统计只关注仍在岗的教师
+EXPIRING_JOB_STATUSES = ('在职', '试用期')
+PENDING_TASK_STATUSES = ('pending', 'in_progress')
+
+
+class _DashboardCache:
+    """进程内缓存最近一次的统计结果；失效时递增版本号，丢弃失效前开始计算的结果"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._generation = 0
+
+    def get(self) -> tuple[Optional[Dict[str, Any]], int]:
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                return self._value, self._generation
+            return None, self._generation
+
+    def set(self, value: Dict[str, Any], generation: int, ttl: float) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._value = value
+            self._expires_at = time.monotonic() + ttl
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._value = None
+
+
+_cache = _DashboardCache()
+
+
+class DashboardService:
+    """合同仪表盘统计"""
+
+    @staticmethod
+    def get_stats(db: Session) -> Dict[str, Any]:
+        """返回仪表盘统计（命中缓存时不访问数据库）"""
+        cached, generation = _cache.get()
+        if cached is not None:
+            return cached
+
+        stats = DashboardService._compute(db)
+        _cache.set(stats, generation, settings.DASHBOARD_CACHE_TTL)
+        return stats
+
+    @staticmethod
+    def invalidate() -> None:
+        """合同或审批任务变更后调用，使下一次请求重新统计"""
+        _cache.invalidate()
+
+    @staticmethod
+    def _compute(db: Session) -> Dict[str, Any]:
+        """
+        人数与置信度类指标读取 contract_stats 汇总表（行数与部门数同阶）；
+        到期（按天）与待复核指标通过 contract_end 索引和审批任务表计算，合并为一条 SQL
+        """
+        today = datetime.now().date()
+        approved = ContractStat.approval_status == "approved"
+        active = and_(approved, ContractStat.job_status == '在职')
+
+        def expiring_within(days: int):
+            return (
+                select(func.count(Contract.id))
+                .where(
+                    Contract.approval_status == "approved",
+                    Contract.job_status.in_(EXPIRING_JOB_STATUSES),
+                    Contract.contract_end >= today,
+                    Contract.contract_end <= today + timedelta(days=days),
+                )
+                .scalar_subquery()
+            )
+
+        pending_review = (
+            select(func.count(distinct(ApprovalTask.contract_id)))
+            .join(Contract, Contract.id == ApprovalTask.contract_id)
+            .where(ApprovalTask.status.in_(PENDING_TASK_STATUSES))
+            .scalar_subquery()
+        )
+
+        row = db.execute(
+            select(
+                func.sum(ContractStat.contract_count).filter(approved).label('total'),
+                func.sum(ContractStat.contract_count).filter(active).label('active'),
+                func.sum(ContractStat.contract_count).filter(
+                    active,
+                    ContractStat.is_external.is_(False),
+                ).label('regular'),
+                func.sum(ContractStat.contract_count).filter(
+                    approved,
+                    func.lower(ContractStat.job_status) == '试用期',
+                ).label('probation'),
+                func.sum(ContractStat.confidence_sum).filter(approved).label('confidence_sum'),
+                func.sum(ContractStat.confidence_count).filter(approved).label('confidence_count'),
+                expiring_within(30).label('expiring_30'),
+                expiring_within(90).label('expiring_90'),
+                pending_review.label('pending_review'),
+            ).select_from(ContractStat)
+        ).one()
+
+        total = int(row.total or 0)
+        regular = int(row.regular or 0)
+        probation = int(row.probation or 0)
+        expiring_30 = row.expiring_30 or 0
+        expiring_90 = row.expiring_90 or 0
+        average_confidence = (
+            float(row.confidence_sum) / row.confidence_count if row.confidence_count else 0.0
+        )
+        pending_review = row.pending_review or 0
+
+        sidebar_summary = {
+            'pendingReview': pending_review,
+            'probationTeachers': probation,
+            'expiringWithin30Days': expiring_30,
+            'expiringWithin90Days': expiring_90,
+            'averageConfidence': average_confidence,
+        }
+        breakdown = {
+            'totalTeachersBreakdown': {
+                'regular': regular,
+                'partTime': total - regular,
+            },
+            'probationTeachers': probation,
+            'expiringWithin90Days': expiring_90,
+            'averageConfidence': average_confidence,
+            'pendingReview': pending_review,
+            'sidebarSummary': sidebar_summary,
+        }
+        return {
+            "totalTeachers": total,
+            "activeContracts": int(row.active or 0),
+            "expiringSoon": expiring_30,
+            "pendingReview": pending_review,
+            "averageConfidence": average_confidence,
+            "breakdown": breakdown,
+            "sidebarSummary": sidebar_summary,
+        }
@@ -1,28 +1,47 @@
-import base64
 import hashlib
+import json
 import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from contextlib import nullcontext
 from dataclasses import dataclass
 from datetime import datetime
-from pathlib import Path
-from typing import BinaryIO, Optional
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Iterator, Optional
 
-from cryptography.fernet import Fernet
+from cryptography.fernet import MultiFernet
 
 from app.config import settings
+from app.utils.encryption import build_key_ring, parse_key_list
+from app.utils.file_crypto import HEADER, ChunkedFileCipher, derive_file_key, is_chunked
 
 logger = logging.getLogger(__name__)
 
 
-def _get_cipher() -> Fernet:
-    """根据配置生成 Fernet 加密器。"""
-    raw_key = settings.FILE_ENCRYPTION_KEY.encode()[:32]
-    padded_key = raw_key.ljust(32, b"0")
-    safe_key = base64.urlsafe_b64encode(padded_key)
-    return Fernet(safe_key)
+def _get_cipher() -> MultiFernet:
+    """根据配置生成旧格式（整文件 Fernet 令牌）的解密密钥环，仅用于读取历史文件。"""
+    return build_key_ring(settings.FILE_ENCRYPTION_KEY, settings.FILE_ENCRYPTION_OLD_KEYS)
+
+
+def _get_file_cipher() -> ChunkedFileCipher:
+    """根据配置生成分块加密器（主密钥加密，主密钥与旧密钥均可解密）。"""
+    raw_keys = [settings.FILE_ENCRYPTION_KEY, *parse_key_list(settings.FILE_ENCRYPTION_OLD_KEYS)]
+    return ChunkedFileCipher([derive_file_key(key) for key in raw_keys])
 
 
 _cipher = _get_cipher()
+_file_cipher = _get_file_cipher()
+
+# 按内容寻址存储的目录（相对存储根目录）
+BLOB_PREFIX = "blobs"
+# 旧部署使用过的存储目录，文件通过 scripts.migrate_storage 迁入主存储目录或记录到位置索引
+LEGACY_ROOTS = (Path("/data/contracts"), Path("/app/storage/contracts"), Path("/app/storage"))
+LOCATIONS_FILENAME = ".locations.json"
 
 
 @dataclass
@@ -34,6 +53,117 @@ class StoredContractFile:
     original_filename: str
     size: int
     checksum: str
+    deduplicated: bool = False
+
+
+class DecryptedFile:
+    """
+    已定位的加密文件，按需流式解密
+    分块格式只解密请求区间覆盖的分块；旧格式文件只能整体解密后再切片；
+    传入 data 时直接使用已解密的内容（缓存命中）
+    """
+
+    def __init__(self, path: Path, data: Optional[bytes] = None) -> None:
+        self.path = path
+        self._data = data
+        if self._data is None:
+            self._file_size = path.stat().st_size
+            with path.open("rb") as source:
+                self._header = source.read(HEADER.size)
+                if not is_chunked(self._header):
+                    source.seek(0)
+                    self._data = _cipher.decrypt(source.read())
+
+        if self._data is not None:
+            self.size = len(self._data)
+        else:
+            self.size = _file_cipher.plaintext_size(self._header, self._file_size)
+
+    def iter_bytes(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """产出明文区间 [start, end]（含两端）"""
+        if self._data is not None:
+            stop = self.size if end is None else end + 1
+            yield self._data[start:stop]
+            return
+
+        with self.path.open("rb") as source:
+            yield from _file_cipher.iter_decrypt(source, self._file_size, start, end)
+
+    def read(self) -> bytes:
+        return b"".join(self.iter_bytes())
+
+
+class _DecryptedFileCache:
+    """
+    进程内解密内容 LRU 缓存：按总字节数淘汰最久未使用的条目，条目超过 TTL 后失效
+    键为 (相对路径, 版本)，版本为内容摘要或文件修改时间+大小，文件被替换后旧条目不会再命中
+    """
+
+    def __init__(self, max_bytes: int, max_file_bytes: int, ttl: float) -> None:
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple[str, str], tuple[bytes, float]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple[str, str], data: bytes) -> None:
+        if len(data) > min(self.max_file_bytes, self.max_bytes):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (data, time.monotonic() + self.ttl)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, relative_path: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == relative_path]:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        data, _ = self._entries.pop(key)
+        self._size -= len(data)
+
+
+_decrypted_cache = _DecryptedFileCache(
+    max_bytes=settings.ATTACHMENT_CACHE_MAX_BYTES,
+    max_file_bytes=settings.ATTACHMENT_CACHE_MAX_FILE_BYTES,
+    ttl=settings.ATTACHMENT_CACHE_TTL,
+)
 
 
 class FileStorageService:
@@ -42,6 +172,10 @@ class FileStorageService:
     def __init__(self) -> None:
         self._root: Path = Path(settings.CONTRACT_STORAGE_DIR).resolve()
         self._root.mkdir(parents=True, exist_ok=True)
+        self._locations_file = self._root / LOCATIONS_FILENAME
+        self._locations: Dict[str, str] = {}
+        self._locations_mtime: Optional[int] = None
+        self._load_locations()
 
     def _generate_storage_path(self, extension: str) -> tuple[Path, str]:
         """生成带日期分层的随机文件路径。"""
@@ -56,21 +190,15 @@ class FileStorageService:
         return absolute_path, str(relative_path).replace("\\", "/")
 
     def save_encrypted(self, file_obj: BinaryIO, original_filename: str) -> StoredContractFile:
-        """保存文件到本地加密目录，返回保存后的元数据。"""
+        """分块读取并加密写入本地加密目录（每次生成新文件），返回保存后的元数据。"""
 
         extension = Path(original_filename).suffix.lower()
         absolute_path, relative_path = self._generate_storage_path(extension)
-
-        data = file_obj.read()
-        checksum = hashlib.sha256(data).hexdigest()
-
-        encrypted = _cipher.encrypt(data)
-
-        absolute_path.write_bytes(encrypted)
+        size, checksum = self._write_encrypted(file_obj, absolute_path)
 
         logger.info("合同文件已保存至加密目录", extra={
             "relative_path": relative_path,
-            "size": len(data),
+            "size": size,
             "original_filename": original_filename,
         })
 
@@ -78,96 +206,325 @@ class FileStorageService:
             file_id=Path(relative_path).stem,
             relative_path=relative_path,
             original_filename=original_filename,
-            size=len(data),
+            size=size,
             checksum=checksum,
         )
 
-    def load_decrypted(self, relative_path: str) -> bytes:
-        """读取并解密指定相对路径的文件内容。"""
+    def save_content_addressed(
+        self,
+        file_obj: BinaryIO,
+        original_filename: str,
+        *,
+        checksum: Optional[str] = None,
+        size: Optional[int] = None,
+    ) -> StoredContractFile:
+        """
+        按内容 SHA-256 寻址保存：相同内容只加密写入一次，重复上传直接复用已有文件
+        先计算摘要再决定是否加密，命中时不做任何加密和写入，只刷新文件修改时间
+        调用方在接收上传时已算出 checksum/size 的可直接传入，省去预读一遍
+        引用由合同与附件表的 file_url 统计，释放见 ContractFileService
+        """
+        with self._seekable(file_obj) as source:
+            start = source.tell()
+            if checksum is None or size is None:
+                digest = hashlib.sha256()
+                size = 0
+                for piece in iter(lambda: source.read(1024 * 1024), b""):
+                    digest.update(piece)
+                    size += len(piece)
+                checksum = digest.hexdigest()
+
+            relative_path = self.blob_path(checksum)
+            absolute_path = self._root / relative_path
+            deduplicated = absolute_path.is_file()
+            if deduplicated:
+                # 释放引用时的宽限期从最近一次上传算起，避免刚复用的文件被并发删除
+                os.utime(absolute_path)
+            else:
+                absolute_path.parent.mkdir(parents=True, exist_ok=True)
+                source.seek(start)
+                self._write_encrypted(source, absolute_path)
+
+        logger.info("合同文件已按内容保存", extra={
+            "relative_path": relative_path,
+            "size": size,
+            "original_filename": original_filename,
+            "deduplicated": deduplicated,
+        })
 
-        last_error: Optional[Exception] = None
-        for root in self._candidate_roots():
-            try:
-                absolute_path = self._resolve_path(relative_path, base_root=root)
-                encrypted = absolute_path.read_bytes()
-                return _cipher.decrypt(encrypted)
-            except FileNotFoundError as exc:
-                last_error = exc
-                continue
-            except ValueError as exc:
-                last_error = exc
-                continue
+        return StoredContractFile(
+            file_id=checksum,
+            relative_path=relative_path,
+            original_filename=original_filename,
+            size=size,
+            checksum=checksum,
+            deduplicated=deduplicated,
+        )
 
-        if last_error:
-            raise last_error
-        raise FileNotFoundError("合同文件不存在")
+    @staticmethod
+    def blob_path(checksum: str) -> str:
+        """内容寻址文件的相对路径：blobs/ab/cd/<sha256>"""
+        return f"{BLOB_PREFIX}/{checksum[:2]}/{checksum[2:4]}/{checksum}"
+
+    @staticmethod
+    def is_blob_path(relative_path: str) -> bool:
+        return relative_path.replace("\\", "/").startswith(f"{BLOB_PREFIX}/")
+
+    def iter_blobs(self) -> Iterator[tuple[str, float]]:
+        """遍历全部内容寻址文件，产出 (相对路径, 修改时间)"""
+        blob_root = self._root / BLOB_PREFIX
+        if not blob_root.is_dir():
+            return
+        for path in sorted(blob_root.rglob("*")):
+            if path.is_file() and not path.name.startswith("."):
+                yield path.relative_to(self._root).as_posix(), path.stat().st_mtime
+
+    def modified_at(self, relative_path: str) -> float:
+        """文件最后修改时间（内容寻址文件每次被复用时刷新）"""
+        return self._locate(relative_path).stat().st_mtime
+
+    @staticmethod
+    def _seekable(file_obj: BinaryIO):
+        """内容寻址需要读两遍：不可回退的流先转存到临时文件"""
+        if file_obj.seekable():
+            return nullcontext(file_obj)
+        spooled = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        for piece in iter(lambda: file_obj.read(1024 * 1024), b""):
+            spooled.write(piece)
+        spooled.seek(0)
+        return spooled
+
+    @staticmethod
+    def _write_encrypted(source: BinaryIO, absolute_path: Path) -> tuple[int, str]:
+        """加密写入临时文件后原子替换，避免读到半写的文件；返回 (明文大小, sha256)"""
+        temp_path = absolute_path.with_name(f".{absolute_path.name}.{uuid.uuid4().hex}.uploading")
+        try:
+            with temp_path.open("wb") as output:
+                result = _file_cipher.encrypt_stream(source, output)
+            os.replace(temp_path, absolute_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return result
+
+    def open_decrypted(self, relative_path: str, *, cached: bool = False) -> DecryptedFile:
+        """
+        定位加密文件，返回可按区间流式解密的句柄。
+        cached=True 时不超过缓存单文件上限的文件整体解密并放入 LRU 缓存（用于反复查看的附件）。
+        """
+        absolute_path = self._locate(relative_path)
+        if not cached or not _decrypted_cache.enabled:
+            return DecryptedFile(absolute_path)
+
+        key = (relative_path, self._content_version(relative_path, absolute_path))
+        data = _decrypted_cache.get(key)
+        if data is not None:
+            return DecryptedFile(absolute_path, data=data)
+
+        decrypted = DecryptedFile(absolute_path)
+        if decrypted.size > _decrypted_cache.max_file_bytes:
+            return decrypted
+        data = decrypted.read()
+        _decrypted_cache.put(key, data)
+        return DecryptedFile(absolute_path, data=data)
+
+    def cache_stats(self) -> dict:
+        """附件解密缓存的命中统计"""
+        return _decrypted_cache.stats()
+
+    def _content_version(self, relative_path: str, absolute_path: Path) -> str:
+        """缓存版本：内容寻址文件直接使用摘要，其余文件使用修改时间与大小"""
+        if self.is_blob_path(relative_path):
+            return absolute_path.name
+        stat = absolute_path.stat()
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def load_decrypted(self, relative_path: str) -> bytes:
+        """读取并解密指定相对路径的完整文件内容。"""
+        return self.open_decrypted(relative_path).read()
+
+    def rotate_file(self, absolute_path: Path) -> Optional[int]:
+        """
+        用主密钥重新加密单个存储文件（写临时文件后原子替换），返回改写的明文字节数
+        旧格式文件同时转换为分块格式；已是主密钥分块文件时不改写并返回 None
+        无法用密钥环解密时抛出 InvalidToken
+        """
+        with absolute_path.open("rb") as source:
+            header = source.read(HEADER.size)
+        if is_chunked(header) and _file_cipher.is_primary(header):
+            return None
+
+        decrypted = DecryptedFile(absolute_path)
+        temp_path = absolute_path.with_name(f".{absolute_path.name}.rotating")
+        try:
+            with temp_path.open("wb") as output:
+                size, _ = _file_cipher.encrypt_chunks(decrypted.iter_bytes(), output)
+            os.replace(temp_path, absolute_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return size
+
+    def iter_stored_files(self) -> Iterator[Path]:
+        """按路径顺序遍历主存储目录及位置索引中的加密文件（跳过临时文件和索引文件）"""
+        paths = {
+            path
+            for path in self._root.rglob("*")
+            if path.is_file() and not path.name.startswith(".")
+        }
+        paths.update(
+            path for path in (self._path_for(relative) for relative in self._locations) if path.is_file()
+        )
+        yield from sorted(paths, key=str)
 
     def delete(self, relative_path: str) -> None:
         """删除指定相对路径的合同文件。"""
-        for root in self._candidate_roots():
-            try:
-                absolute_path = self._resolve_path(relative_path, base_root=root)
-            except ValueError:
-                continue
-            if absolute_path.exists():
-                absolute_path.unlink()
-                break
+        _decrypted_cache.invalidate(relative_path)
+        try:
+            absolute_path = self._path_for(relative_path)
+        except ValueError:
+            return
+        absolute_path.unlink(missing_ok=True)
 
     def exists(self, relative_path: str) -> bool:
         """判断合同文件是否存在。"""
-        for root in self._candidate_roots():
-            try:
-                absolute_path = self._resolve_path(relative_path, base_root=root)
-            except ValueError:
-                continue
-            if absolute_path.exists():
-                return True
-        return False
-
-    def _candidate_roots(self) -> list[Path]:
-        """生成可能的存储根路径列表，用于兼容不同环境。"""
-        roots = [self._root]
-        fallback_roots = [Path("/data/contracts"), Path("/app/storage/contracts"), Path("/app/storage")]
-
-        for fallback in fallback_roots:
+        try:
+            return self._path_for(relative_path).is_file()
+        except ValueError:
+            return False
+
+    def _locate(self, relative_path: str) -> Path:
+        """
+        定位文件：按位置索引直接拼出绝对路径，只做一次 stat
+        未命中时若索引文件已被迁移命令更新则重新加载后再试一次
+        """
+        absolute_path = self._path_for(relative_path)
+        if absolute_path.is_file():
+            return absolute_path
+        if self._reload_locations():
+            absolute_path = self._path_for(relative_path)
+            if absolute_path.is_file():
+                return absolute_path
+        raise FileNotFoundError(f"合同文件不存在: {relative_path}")
+
+    def _path_for(self, relative_path: str) -> Path:
+        """不访问文件系统，计算文件所在的绝对路径"""
+        normalized = self._normalize(relative_path)
+        root = self._locations.get(normalized)
+        return (Path(root) if root else self._root) / normalized
+
+    def _normalize(self, relative_path: str) -> str:
+        """
+        把数据库中的文件路径规范为相对主存储目录的 POSIX 路径，拒绝目录穿越
+        兼容旧数据：绝对路径去掉所在存储根目录，相对路径去掉开头的根目录名
+        """
+        path = PurePosixPath(relative_path.replace("\\", "/"))
+        if path.is_absolute():
+            for root in (self._root, *LEGACY_ROOTS):
+                try:
+                    path = path.relative_to(root.as_posix())
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError("非法的合同文件路径")
+        elif path.parts and path.parts[0] in {self._root.name, "contracts", "storage"}:
+            path = PurePosixPath(*path.parts[1:])
+
+        if not path.parts or ".." in path.parts:
+            raise ValueError("非法的合同文件路径")
+        return path.as_posix()
+
+    # ---- 位置索引与历史目录迁移 ----
+
+    def _load_locations(self) -> None:
+        """加载位置索引：记录仍保存在历史存储目录中的文件 {相对路径: 所在根目录}"""
+        try:
+            stat = self._locations_file.stat()
+        except FileNotFoundError:
+            self._locations, self._locations_mtime = {}, None
+            return
+        self._locations = json.loads(self._locations_file.read_text(encoding="utf-8") or "{}")
+        self._locations_mtime = stat.st_mtime_ns
+
+    def _reload_locations(self) -> bool:
+        """索引文件有变化时重新加载，返回是否重新加载"""
+        try:
+            mtime = self._locations_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._locations_mtime:
+            return False
+        self._load_locations()
+        return True
+
+    def migrate_file(self, relative_path: str, *, move: bool = True, dry_run: bool = False) -> str:
+        """
+        把位于历史存储目录中的文件迁入主存储目录（供迁移命令使用），返回处理结果：
+        in_place：已在主存储目录；missing：各目录中都不存在；legacy：位于历史目录（dry_run）；
+        moved：已移动；duplicate：主目录已有相同文件（move 时删除历史副本）；
+        conflict：主目录存在不同内容的同名文件，以主目录为准，历史副本保持原样且不记录索引；
+        indexed：未移动（move=False），记录到位置索引
+        """
+        normalized = self._normalize(relative_path)
+        target = self._root / normalized
+        source = next(
+            (root / normalized for root in self._legacy_roots() if (root / normalized).is_file()),
+            None,
+        )
+        if source is None:
+            return "in_place" if target.is_file() else "missing"
+        if dry_run:
+            return "legacy"
+
+        if target.is_file():
+            # 读取时一直以主目录为准，不能让索引改为指向历史副本
+            self._locations.pop(normalized, None)
+            if target.stat().st_size == source.stat().st_size and _file_digest(target) == _file_digest(source):
+                if move:
+                    source.unlink()
+                return "duplicate"
+            logger.warning("主存储目录已有不同内容的同名文件，保留主目录文件: %s（历史副本 %s）", normalized, source)
+            return "conflict"
+
+        if not move:
+            self._locations[normalized] = source.as_posix()[: -len(normalized)].rstrip("/")
+            return "indexed"
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex}.migrating")
+        shutil.copy2(source, temp_path)
+        os.replace(temp_path, target)
+        source.unlink()
+        self._locations.pop(normalized, None)
+        return "moved"
+
+    def save_locations(self) -> None:
+        """写回位置索引（原子替换），运行中的实例在下次未命中时自动重新加载"""
+        temp_path = self._locations_file.with_name(f"{self._locations_file.name}.tmp")
+        temp_path.write_text(json.dumps(self._locations, ensure_ascii=False, indent=0), encoding="utf-8")
+        os.replace(temp_path, self._locations_file)
+        self._locations_mtime = self._locations_file.stat().st_mtime_ns
+
+    def _legacy_roots(self) -> list[Path]:
+        """存在且不同于主存储目录的历史存储目录"""
+        roots = []
+        for legacy in LEGACY_ROOTS:
             try:
-                resolved = fallback.resolve()
-            except Exception:
+                resolved = legacy.resolve()
+            except OSError:
                 continue
-            if resolved != self._root and resolved not in roots and resolved.exists():
+            if resolved != self._root and resolved not in roots and resolved.is_dir():
                 roots.append(resolved)
-
         return roots
 
-    def _resolve_path(self, relative_path: str, *, base_root: Optional[Path] = None) -> Path:
-        """根据相对路径解析文件绝对路径，防止目录穿越。"""
-        base = base_root or self._root
-        safe_relative = Path(relative_path)
 
-        # 兼容旧数据：如果传入的是绝对路径或包含根目录名，转换为相对路径
-        if safe_relative.is_absolute():
-            try:
-                safe_relative = safe_relative.relative_to(base)
-            except ValueError:
-                # 如果不能与当前 base 匹配，尝试其他 root
-                for candidate in self._candidate_roots():
-                    try:
-                        safe_relative = safe_relative.relative_to(candidate)
-                        base = candidate
-                        break
-                    except ValueError:
-                        continue
-                else:
-                    raise ValueError("非法的合同文件路径")
-        else:
-            parts = safe_relative.parts
-            if parts and parts[0] in {base.name, "contracts", "storage"}:
-                safe_relative = Path(*parts[1:])
-
-        normalized = (base / safe_relative).resolve()
-        if not str(normalized).startswith(str(base)):
-            raise ValueError("非法的合同文件路径")
-        return normalized
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as source:
+        for piece in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(piece)
+    return digest.hexdigest()
 
 
 file_storage_service = FileStorageService()
@@ -0,0 +1,745 @@
+"""后台任务服务：在进程内线程池中执行耗时的导入、导出与 OCR 识别"""
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.background_job import BackgroundJob, BackgroundJobFile
+from app.models.user import User
+from app.schemas.contract import OcrResult
+from app.services.contract_import_service import ContractImportService
+from app.services.contract_file_service import ContractFileService
+from app.services.contract_service import ContractService
+from app.services.file_storage_service import DecryptedFile, file_storage_service
+from app.services.operation_log_service import OperationLogService
+from app.utils.upload import ReceivedUpload, iter_zip_members
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+OCR_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png")
+# 结果含识别草稿（身份证号、电话等敏感信息）的任务类型，草稿加密保存为结果文件
+OCR_JOB_TYPES = ("ocr", "ocr_batch")
+
+
+class _ProgressReporter:
+    """节流写入任务进度（已处理数量，以及调用方提供的目前错误数），使用独立会话避免干扰任务本身的事务与游标"""
+
+    INTERVAL_SECONDS = 1.0
+
+    def __init__(self, job_id: str, phase: str) -> None:
+        self.job_id = job_id
+        self.phase = phase
+        self._last_report = 0.0
+        JobService._update_job(job_id, phase=phase, processed=0, total=None)
+
+    def __call__(self, processed: int, total: Optional[int], error_count: Optional[int] = None) -> None:
+        now = time.monotonic()
+        finished = total is not None and processed >= total
+        if not finished and now - self._last_report < self.INTERVAL_SECONDS:
+            return
+        self._last_report = now
+        values: Dict[str, Any] = {"processed": processed}
+        if total is not None:
+            values["total"] = total
+        if error_count is not None:
+            values["error_count"] = error_count
+        JobService._update_job(self.job_id, **values)
+
+
+class JobService:
+    """后台任务的提交、执行、查询与重启恢复"""
+
+    # 任务记录中最多保留的错误明细条数
+    MAX_STORED_ERRORS = 500
+    # 提交任务时最多每隔这么久清理一次过期任务
+    PURGE_INTERVAL_SECONDS = 3600
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+    _last_purge = 0.0
+
+    @classmethod
+    def submit_import(cls, db: Session, *, upload: ReceivedUpload, operator: User) -> BackgroundJob:
+        """保存待导入的 Excel 并提交导入任务"""
+        stored = file_storage_service.save_encrypted(upload.open(), upload.filename)
+        return cls._create_and_submit(
+            db,
+            job_type="import",
+            operator=operator,
+            params={"filename": upload.filename, "input_file": stored.relative_path},
+        )
+
+    @classmethod
+    def submit_export(cls, db: Session, *, params: Dict[str, Any], operator: User) -> BackgroundJob:
+        """提交导出任务，params 为 ExportJobCreate 的字段"""
+        return cls._create_and_submit(db, job_type="export", operator=operator, params=params)
+
+    @classmethod
+    def submit_ocr(cls, db: Session, *, upload: ReceivedUpload, operator: User) -> BackgroundJob:
+        """保存合同文件并提交 OCR 识别任务；识别完成后该加密文件即作为合同附件保留"""
+        filename = upload.filename
+        stored = ContractFileService.store_upload(upload)
+        return cls._create_and_submit(
+            db,
+            job_type="ocr",
+            operator=operator,
+            params={
+                "filename": filename,
+                "input_file": stored.relative_path,
+                "file_size": stored.size,
+                "checksum": stored.checksum,
+            },
+        )
+
+    @classmethod
+    def submit_ocr_batch(cls, db: Session, *, uploads: List[ReceivedUpload], operator: User) -> BackgroundJob:
+        """
+        保存批量上传的合同文件（zip 解压后逐个保存）并提交批量 OCR 任务
+        每个文件的识别结果作为 OcrResult 草稿逐个加密保存，任务结束后通过 result.items 读取，
+        供逐份核对后创建合同；草稿引用的上传文件在任务清理前不会被释放
+        """
+        files: List[Dict[str, Any]] = []
+
+        def add(filename: str, stored) -> None:
+            files.append({
+                "filename": filename,
+                "input_file": stored.relative_path,
+                "file_size": stored.size,
+                "checksum": stored.checksum,
+            })
+
+        for upload in uploads:
+            if upload.filename.lower().endswith(".zip"):
+                for filename, stream in iter_zip_members(
+                    upload.open(), extensions=OCR_EXTENSIONS, max_member_size=settings.MAX_UPLOAD_SIZE
+                ):
+                    cls._check_batch_limit(len(files))
+                    add(filename, ContractFileService.store(stream, filename))
+            elif os.path.splitext(upload.filename)[1].lower() in OCR_EXTENSIONS:
+                cls._check_batch_limit(len(files))
+                add(upload.filename, ContractFileService.store_upload(upload))
+            else:
+                raise ValueError(f"不支持的文件类型: {upload.filename}")
+
+        if not files:
+            raise ValueError("没有可识别的合同文件（支持 pdf/jpg/jpeg/png 或包含这些文件的 zip）")
+        return cls._create_and_submit(db, job_type="ocr_batch", operator=operator, params={"files": files})
+
+    @staticmethod
+    def _check_batch_limit(count: int) -> None:
+        if count >= settings.OCR_BATCH_MAX_FILES:
+            raise ValueError(f"单批最多识别 {settings.OCR_BATCH_MAX_FILES} 个文件")
+
+    @staticmethod
+    def get_job(db: Session, job_id: str, user: User) -> Optional[BackgroundJob]:
+        """查询任务，仅允许提交人本人或超级管理员查看"""
+        job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+        if job is None:
+            return None
+        if job.created_by != user.id and not getattr(user, "is_superuser", False):
+            return None
+        return job
+
+    @staticmethod
+    def load_result(job: BackgroundJob) -> Any:
+        """
+        任务结果；OCR 任务的识别草稿从加密的结果文件中读取
+        批量 OCR 任务运行中只返回逐文件状态，结束后（含中断）附带已完成文件的识别草稿
+        """
+        if job.job_type == "ocr_batch" and job.result:
+            finished = job.status in ("completed", "failed")
+            items = []
+            for item in job.result.get("items") or []:
+                entry = {key: item.get(key) for key in ("filename", "status", "error")}
+                if finished:
+                    entry["result"] = None
+                    if item.get("result_file"):
+                        try:
+                            entry["result"] = json.loads(file_storage_service.load_decrypted(item["result_file"]))
+                        except FileNotFoundError:
+                            logger.warning("OCR 识别草稿文件不存在: %s", item["result_file"])
+                items.append(entry)
+            return {**job.result, "items": items}
+        if job.job_type in OCR_JOB_TYPES and job.status == "completed" and job.result_file:
+            try:
+                return json.loads(file_storage_service.load_decrypted(job.result_file))
+            except FileNotFoundError:
+                logger.warning("OCR 任务结果文件不存在: %s", job.id)
+        return job.result
+
+    @staticmethod
+    def open_result(job: BackgroundJob) -> DecryptedFile:
+        """返回结果文件的流式解密句柄"""
+        if job.status != "completed" or not job.result_file:
+            raise ValueError("任务尚未完成或没有可下载的结果文件")
+        return file_storage_service.open_decrypted(job.result_file)
+
+    @classmethod
+    def recover_interrupted(cls) -> None:
+        """服务启动时处理上次未完成的任务：运行中的标记失败，排队中的重新提交"""
+        with SessionLocal() as db:
+            running = db.query(BackgroundJob).filter(BackgroundJob.status == "running").all()
+            for job in running:
+                job.status = "failed"
+                job.error_message = "服务重启，任务已中断，请重新提交"
+                job.finished_at = datetime.now(timezone.utc)
+            pending_ids = [
+                job_id
+                for (job_id,) in db.query(BackgroundJob.id).filter(BackgroundJob.status == "pending")
+            ]
+            db.commit()
+
+        for job_id in pending_ids:
+            cls._get_executor().submit(cls._run, job_id)
+        if running or pending_ids:
+            logger.info("后台任务恢复完成：中断 %d 个，重新排队 %d 个", len(running), len(pending_ids))
+
+    @classmethod
+    def purge_finished(cls, db: Session, *, retention_days: Optional[int] = None) -> int:
+        """
+        删除结束超过保留天数的任务记录及其结果文件（导出文件、OCR 草稿），返回删除的任务数
+        OCR 任务上传的合同文件解除任务引用，若也未被合同、附件或其他任务引用则一并释放
+        """
+        retention_days = settings.JOB_RETENTION_DAYS if retention_days is None else retention_days
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        jobs = (
+            db.query(BackgroundJob)
+            .filter(
+                BackgroundJob.status.in_(("completed", "failed")),
+                BackgroundJob.finished_at < cutoff,
+            )
+            .all()
+        )
+        result_files: List[str] = []
+        input_files: List[str] = []
+        for job in jobs:
+            if job.result_file:
+                result_files.append(job.result_file)
+            if job.job_type == "ocr_batch" and job.result:
+                result_files.extend(
+                    item["result_file"] for item in job.result.get("items") or [] if item.get("result_file")
+                )
+            input_files.extend(cls._input_files(job))
+        if jobs:
+            db.query(BackgroundJobFile).filter(
+                BackgroundJobFile.job_id.in_([job.id for job in jobs])
+            ).delete(synchronize_session=False)
+        for job in jobs:
+            db.delete(job)
+        db.commit()
+
+        for relative_path in result_files:
+            try:
+                file_storage_service.delete(relative_path)
+            except Exception:
+                logger.warning("删除任务结果文件失败: %s", relative_path, exc_info=True)
+        if input_files:
+            ContractFileService.release(db, input_files)
+        if jobs:
+            logger.info("已清理 %d 个过期后台任务", len(jobs))
+        return len(jobs)
+
+    @classmethod
+    def ensure_file_references(cls, db: Session) -> int:
+        """为升级前提交、尚未记录文件引用的 OCR 任务补写引用，返回补写的记录数"""
+        pinned = {
+            (job_id, file_path)
+            for job_id, file_path in db.query(BackgroundJobFile.job_id, BackgroundJobFile.file_path)
+        }
+        added = 0
+        for job in db.query(BackgroundJob).filter(BackgroundJob.job_type.in_(OCR_JOB_TYPES)):
+            for file_path in set(cls._input_files(job)):
+                if (job.id, file_path) not in pinned:
+                    db.add(BackgroundJobFile(job_id=job.id, file_path=file_path))
+                    added += 1
+        db.commit()
+        if added:
+            logger.info("已为 %d 个后台任务文件补写引用记录", added)
+        return added
+
+    @staticmethod
+    def _input_files(job: BackgroundJob) -> List[str]:
+        """OCR 任务上传的合同文件（识别草稿的 file_url 指向这些文件）"""
+        params = job.params or {}
+        if job.job_type == "ocr":
+            paths = [params.get("input_file")]
+        elif job.job_type == "ocr_batch":
+            paths = [entry.get("input_file") for entry in params.get("files") or []]
+        else:
+            return []
+        return [path for path in paths if path]
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=max(settings.JOB_WORKERS, 1),
+                    thread_name_prefix="background-job",
+                )
+            return cls._executor
+
+    @classmethod
+    def _create_and_submit(
+        cls,
+        db: Session,
+        *,
+        job_type: str,
+        operator: User,
+        params: Dict[str, Any],
+    ) -> BackgroundJob:
+        job = BackgroundJob(
+            job_type=job_type,
+            status="pending",
+            params=params,
+            processed=0,
+            error_count=0,
+            errors=[],
+            created_by=operator.id,
+        )
+        db.add(job)
+        db.flush()
+        # 任务清理前其上传的文件计入引用，释放或清理时不会删除
+        for file_path in set(cls._input_files(job)):
+            db.add(BackgroundJobFile(job_id=job.id, file_path=file_path))
+        db.commit()
+        db.refresh(job)
+        cls._get_executor().submit(cls._run, job.id)
+        cls._maybe_purge()
+        return job
+
+    @classmethod
+    def _maybe_purge(cls) -> None:
+        now = time.monotonic()
+        with cls._lock:
+            if now - cls._last_purge < cls.PURGE_INTERVAL_SECONDS:
+                return
+            cls._last_purge = now
+        cls._get_executor().submit(cls._purge_in_background)
+
+    @classmethod
+    def _purge_in_background(cls) -> None:
+        try:
+            with SessionLocal() as db:
+                cls.purge_finished(db)
+        except Exception:
+            logger.warning("清理过期后台任务失败", exc_info=True)
+
+    @classmethod
+    def _save_ocr_drafts(cls, job_id: str, draft: Dict[str, Any], *, summary: Dict[str, Any]) -> None:
+        """识别草稿加密保存为结果文件，任务记录的 result 只保留不含敏感信息的摘要"""
+        cls._update_job(
+            job_id,
+            result=summary,
+            result_file=cls._save_draft(draft),
+            result_filename=f"ocr_result_{job_id}.json",
+            result_media_type="application/json",
+        )
+
+    @staticmethod
+    def _save_draft(draft: Dict[str, Any]) -> str:
+        """单个识别草稿加密保存为结果文件，返回相对路径"""
+        content = json.dumps(draft, ensure_ascii=False).encode("utf-8")
+        return file_storage_service.save_encrypted(io.BytesIO(content), "ocr_result.json").relative_path
+
+    @staticmethod
+    def _release_inputs(db: Session, job_id: str, relative_paths: Iterable[str]) -> None:
+        """识别失败、不会出现在草稿中的上传文件：解除本任务的引用后按引用计数释放"""
+        paths = list(relative_paths)
+        db.query(BackgroundJobFile).filter(
+            BackgroundJobFile.job_id == job_id,
+            BackgroundJobFile.file_path.in_(paths),
+        ).delete(synchronize_session=False)
+        db.commit()
+        ContractFileService.release(db, paths)
+
+    @staticmethod
+    def _update_job(job_id: str, **values: Any) -> None:
+        with SessionLocal() as db:
+            db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update(values, synchronize_session=False)
+            db.commit()
+
+    @classmethod
+    def _run(cls, job_id: str) -> None:
+        with SessionLocal() as db:
+            # 以条件更新认领任务，避免同一任务被重复执行
+            claimed = (
+                db.query(BackgroundJob)
+                .filter(BackgroundJob.id == job_id, BackgroundJob.status == "pending")
+                .update(
+                    {"status": "running", "started_at": datetime.now(timezone.utc)},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                return
+            job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+
+            handler = cls._handlers().get(job.job_type)
+            operator = db.query(User).filter(User.id == job.created_by).first() if job.created_by else None
+            try:
+                if handler is None:
+                    raise ValueError(f"未知的任务类型: {job.job_type}")
+                handler(db, job, operator)
+            except Exception as exc:
+                logger.exception("后台任务执行失败: %s", job_id)
+                db.rollback()
+                cls._update_job(
+                    job_id,
+                    status="failed",
+                    error_message=str(exc),
+                    finished_at=datetime.now(timezone.utc),
+                )
+                return
+
+        cls._update_job(job_id, status="completed", phase=None, finished_at=datetime.now(timezone.utc))
+
+    @classmethod
+    def _handlers(cls) -> Dict[str, Callable[[Session, BackgroundJob, Optional[User]], None]]:
+        return {
+            "import": cls._run_import,
+            "export": cls._run_export,
+            "ocr": cls._run_ocr,
+            "ocr_batch": cls._run_ocr_batch,
+        }
+
+    @classmethod
+    def _run_import(cls, db: Session, job: BackgroundJob, operator: Optional[User]) -> None:
+        from app.utils.excel_import import parse_contracts_from_bytes
+
+        params = job.params or {}
+        job_id = job.id
+        content = file_storage_service.load_decrypted(params["input_file"])
+        try:
+            records = parse_contracts_from_bytes(content, progress=_ProgressReporter(job_id, "解析 Excel"))
+            import_result = ContractImportService.import_records(
+                db,
+                records,
+                operator=(operator.full_name or operator.username) if operator else None,
+                progress=_ProgressReporter(job_id, "写入数据库"),
+            )
+        finally:
+            try:
+                file_storage_service.delete(params["input_file"])
+            except Exception:
+                logger.warning("删除导入任务的临时文件失败: %s", params["input_file"])
+
+        created = import_result["created"]
+        updated = import_result["updated"]
+        errors = import_result["errors"]
+        cls._update_job(
+            job_id,
+            result={"imported": created + updated, "created": created, "updated": updated},
+            errors=errors[:cls.MAX_STORED_ERRORS],
+            error_count=len(errors),
+        )
+
+        OperationLogService.log(
+            db=db,
+            module="contracts",
+            action="import",
+            operator=operator,
+            summary=f"导入合同 Excel，新增 {created} 条，更新 {updated} 条",
+            detail="; ".join(errors) if errors else None,
+            extra={
+                "filename": params.get("filename"),
+                "created": created,
+                "updated": updated,
+                "errors": errors,
+                "job_id": job_id,
+            },
+        )
+
+    @classmethod
+    def _run_export(cls, db: Session, job: BackgroundJob, operator: Optional[User]) -> None:
+        from app.utils.data_export import data_exporter
+        from app.utils.excel_export import exporter
+
+        params = dict(job.params or {})
+        job_id = job.id
+        export_format = params.pop("format", "xlsx")
+        if export_format == "parquet" and not data_exporter.parquet_available():
+            raise ValueError("服务器未安装 pyarrow，暂不支持 Parquet 导出")
+        stream_writers = {
+            "xlsx": exporter.export_contracts_stream,
+            "csv": data_exporter.export_csv_stream,
+            "parquet": data_exporter.export_parquet_stream,
+        }
+
+        filters = {
+            key: params.get(key)
+            for key in ("department", "job_status", "search", "approval_status", "ids")
+        }
+        progress = _ProgressReporter(job_id, "生成导出文件")
+        total = ContractService._build_list_query(db, **filters).count()
+        cls._update_job(job_id, total=total)
+
+        filename = f"contracts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+        with tempfile.TemporaryFile() as output:
+            contracts = ContractService.iter_contracts_for_export(db=db, **filters)
+            for chunk in stream_writers[export_format](contracts, progress=lambda done, _: progress(done, total)):
+                output.write(chunk)
+            output.seek(0)
+            stored = file_storage_service.save_encrypted(output, filename)
+
+        cls._update_job(
+            job_id,
+            result={"rows": total, "size": stored.size},
+            result_file=stored.relative_path,
+            result_filename=filename,
+            result_media_type=EXPORT_MEDIA_TYPES[export_format],
+        )
+
+        OperationLogService.log(
+            db=db,
+            module="contracts",
+            action="export",
+            operator=operator,
+            summary="导出合同列表",
+            detail=f"导出文件 {filename}",
+            extra={**filters, "format": export_format, "job_id": job_id},
+        )
+
+    @classmethod
+    def _run_ocr(cls, db: Session, job: BackgroundJob, operator: Optional[User]) -> None:
+        from app.ocr.ocr_service import ocr_service
+
+        params = job.params or {}
+        job_id = job.id
+        filename = params.get("filename") or "contract"
+        cls._update_job(job_id, phase="OCR 识别", total=1)
+
+        content = file_storage_service.load_decrypted(params["input_file"])
+        temp_path: Optional[str] = None
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix.lower()) as tmp_file:
+                tmp_file.write(content)
+                temp_path = tmp_file.name
+            # 后台任务本身已排队，OCR 工作进程繁忙时等待空位而不是失败
+            fields, confidence, raw_text, low_confidence_fields = ocr_service.process_contract_file(
+                temp_path, wait=True, checksum=params.get("checksum")
+            )
+        except Exception:
+            cls._release_inputs(db, job_id, [params["input_file"]])
+            raise
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+        fields["file_url"] = params["input_file"]
+        result = OcrResult(
+            contract=fields,
+            confidence=confidence,
+            raw_text=raw_text,
+            low_confidence_fields=low_confidence_fields,
+            original_filename=filename,
+        )
+        cls._save_ocr_drafts(
+            job_id,
+            result.model_dump(mode="json"),
+            summary={"original_filename": filename, "low_confidence_fields": low_confidence_fields},
+        )
+        cls._update_job(job_id, processed=1)
+
+        OperationLogService.log(
+            db=db,
+            module="contracts",
+            action="upload",
+            operator=operator,
+            summary=f"上传合同文件 {filename}",
+            detail=f"已存储至加密目录: {params['input_file']}",
+            extra={
+                "original_filename": filename,
+                "average_confidence": fields.get("ocr_confidence"),
+                "confidence": confidence,
+                "low_confidence_fields": low_confidence_fields,
+                "file_size": params.get("file_size"),
+                "storage_path": params["input_file"],
+                "checksum": params.get("checksum"),
+                "job_id": job_id,
+            },
+        )
+
+    @classmethod
+    def _run_ocr_batch(cls, db: Session, job: BackgroundJob, operator: Optional[User]) -> None:
+        """
+        批量 OCR：图片按 OCR_BATCH_SIZE 分组批量推理，PDF 逐个识别（页段在工作进程间并行），
+        最多 OCR_BATCH_PARALLELISM 组同时进行；每组完成后识别草稿逐个加密保存为结果文件，
+        任务记录只写入逐文件状态、草稿文件路径与吞吐量，服务中断时已完成的草稿不会丢失
+        """
+        files: List[Dict[str, Any]] = (job.params or {}).get("files") or []
+        job_id = job.id
+        items: List[Dict[str, Any]] = [
+            {"filename": entry["filename"], "status": "pending", "error": None, "result_file": None}
+            for entry in files
+        ]
+        cls._update_job(job_id, phase="OCR 识别", total=len(files), result=cls._ocr_batch_summary(items, 0.0))
+
+        groups: List[List[int]] = []
+        images: List[int] = []
+        for index, entry in enumerate(files):
+            if Path(entry["filename"]).suffix.lower() == ".pdf":
+                groups.append([index])
+                continue
+            images.append(index)
+            if len(images) >= max(settings.OCR_BATCH_SIZE, 1):
+                groups.append(images)
+                images = []
+        if images:
+            groups.append(images)
+
+        lock = threading.Lock()
+        errors: List[str] = []
+        started = time.monotonic()
+        processed = 0
+
+        def run_group(indexes: List[int]) -> None:
+            nonlocal processed
+            entries = [files[index] for index in indexes]
+            try:
+                outcomes: List[Any] = cls._recognize_stored_files(entries)
+            except Exception as exc:
+                logger.warning("批量 OCR 识别失败: %s", [entry["filename"] for entry in entries], exc_info=True)
+                outcomes = [exc] * len(entries)
+
+            saved: List[Any] = []
+            for entry, outcome in zip(entries, outcomes):
+                if isinstance(outcome, Exception):
+                    saved.append(outcome)
+                    continue
+                try:
+                    saved.append(cls._save_draft(outcome))
+                except Exception as exc:
+                    logger.warning("保存 OCR 识别草稿失败: %s", entry["filename"], exc_info=True)
+                    saved.append(exc)
+
+            with lock:
+                for index, outcome in zip(indexes, saved):
+                    if isinstance(outcome, Exception):
+                        items[index].update(status="failed", error=str(outcome))
+                        errors.append(f"{files[index]['filename']}: {outcome}")
+                    else:
+                        items[index].update(status="completed", result_file=outcome)
+                processed += len(indexes)
+                # 任务记录只含逐文件状态与草稿文件路径，识别文本保存在加密的草稿文件中
+                cls._update_job(
+                    job_id,
+                    processed=processed,
+                    result=cls._ocr_batch_summary(items, time.monotonic() - started),
+                    errors=errors[:cls.MAX_STORED_ERRORS],
+                    error_count=len(errors),
+                )
+
+        with ThreadPoolExecutor(
+            max_workers=max(settings.OCR_BATCH_PARALLELISM, 1),
+            thread_name_prefix="ocr-batch",
+        ) as executor:
+            list(executor.map(run_group, groups))
+
+        # 识别失败的文件不会生成合同，解除任务引用并释放其存储；
+        # 同批中内容相同（去重为同一文件）且识别成功的文件仍被草稿引用，不能释放
+        completed_inputs = {
+            files[index]["input_file"] for index, item in enumerate(items) if item["status"] == "completed"
+        }
+        failed = {
+            files[index]["input_file"] for index, item in enumerate(items) if item["status"] == "failed"
+        } - completed_inputs
+        if failed:
+            cls._release_inputs(db, job_id, failed)
+
+        summary = cls._ocr_batch_summary(items, time.monotonic() - started)
+        OperationLogService.log(
+            db=db,
+            module="contracts",
+            action="upload",
+            operator=operator,
+            summary=f"批量上传合同文件 {len(files)} 个，识别成功 {summary['completed']} 个",
+            detail="; ".join(errors) if errors else None,
+            extra={
+                "job_id": job_id,
+                "files": len(files),
+                "completed": summary["completed"],
+                "failed": summary["failed"],
+                "contracts_per_minute": summary["contracts_per_minute"],
+            },
+        )
+
+    @staticmethod
+    def _recognize_stored_files(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """解密到临时文件后识别（单个 PDF 或一组图片），返回与输入顺序一致的 OcrResult 草稿"""
+        from app.ocr.ocr_service import ocr_service
+
+        temp_paths: List[str] = []
+        try:
+            for entry in entries:
+                decrypted = file_storage_service.open_decrypted(entry["input_file"])
+                with tempfile.NamedTemporaryFile(delete=False, suffix=Path(entry["filename"]).suffix.lower()) as tmp_file:
+                    temp_paths.append(tmp_file.name)
+                    for chunk in decrypted.iter_bytes():
+                        tmp_file.write(chunk)
+
+            checksums = [entry.get("checksum") for entry in entries]
+            if len(entries) == 1 and Path(entries[0]["filename"]).suffix.lower() == ".pdf":
+                outcomes = [ocr_service.process_contract_file(temp_paths[0], wait=True, checksum=checksums[0])]
+            else:
+                outcomes = ocr_service.process_contract_images(temp_paths, wait=True, checksums=checksums)
+        finally:
+            for temp_path in temp_paths:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+        drafts = []
+        for entry, (fields, confidence, raw_text, low_confidence_fields) in zip(entries, outcomes):
+            fields["file_url"] = entry["input_file"]
+            drafts.append(OcrResult(
+                contract=fields,
+                confidence=confidence,
+                raw_text=raw_text,
+                low_confidence_fields=low_confidence_fields,
+                original_filename=entry["filename"],
+            ).model_dump(mode="json"))
+        return drafts
+
+    @staticmethod
+    def _ocr_batch_summary(items: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        """批量识别的逐文件状态（含草稿文件路径，不含识别内容）、计数与吞吐量"""
+        completed = sum(1 for item in items if item["status"] == "completed")
+        return {
+            "items": items,
+            "completed": completed,
+            "failed": sum(1 for item in items if item["status"] == "failed"),
+            "elapsed_seconds": round(elapsed, 1),
+            "contracts_per_minute": round(completed * 60 / elapsed, 1) if elapsed > 0 else None,
+        }
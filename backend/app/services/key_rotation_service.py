@@ -0,0 +1,362 @@
+"""密钥轮换：把合同敏感字段、OCR 结果缓存和存储文件重新加密到当前主密钥，支持断点续跑"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from cryptography.fernet import InvalidToken
+from sqlalchemy import bindparam, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.contract import Contract
+from app.models.ocr_result_cache import OcrResultCache
+from app.config import settings
+from app.services.file_storage_service import file_storage_service
+from app.utils.encryption import (
+    BLIND_INDEX_FIELDS,
+    SENSITIVE_FIELDS,
+    blind_index,
+    plaintext_for_blind_index,
+    rotate_field,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = "./key_rotation_checkpoint.json"
+
+
+class RotationCheckpoint:
+    """
+    轮换进度检查点（JSON 文件）
+    fields.last_id 为已处理的最大合同 ID，ocr_cache.last_key 为已处理的最后一个缓存主键，
+    files.last_path 为已处理的最后一个文件路径
+    字段与文件两条流水线可在不同线程中同时写入
+    每段记录开始时的主密钥指纹 key_id；该段已完成或主密钥已更换时，下次运行自动从头开始
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH) -> None:
+        self._path = Path(path)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = {}
+        if self._path.exists():
+            self._data = json.loads(self._path.read_text(encoding="utf-8") or "{}")
+
+    def get(self, section: str, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._data.get(section, {}).get(key)
+
+    def start(self, section: str, *, key_id: str) -> None:
+        """开始处理一段：上次已完成或主密钥已更换时丢弃该段进度"""
+        with self._lock:
+            previous = self._data.get(section, {})
+            if previous.get("key_id") == key_id and not previous.get("completed"):
+                return
+            if previous:
+                logger.info("检查点 %s 段已完成或主密钥已更换，从头开始", section)
+            self._data[section] = {"key_id": key_id}
+            self._write()
+
+    def update(self, section: str, **values: Any) -> None:
+        with self._lock:
+            self._data.setdefault(section, {}).update(values)
+            self._write()
+
+    def _write(self) -> None:
+        temp_path = self._path.with_name(f".{self._path.name}.tmp")
+        temp_path.write_text(json.dumps(self._data, ensure_ascii=False, indent=2), encoding="utf-8")
+        temp_path.replace(self._path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data = {}
+            if self._path.exists():
+                self._path.unlink()
+
+
+def _key_id(raw_key: str) -> str:
+    """主密钥指纹（不可逆），用于判断检查点是否属于当前这次轮换"""
+    return hmac.new(raw_key.encode(), b"key-rotation-checkpoint", hashlib.sha256).hexdigest()[:16]
+
+
+def _throughput(count: float, elapsed: float) -> float:
+    return count / elapsed if elapsed > 0 else 0.0
+
+
+class KeyRotationService:
+    """
+    在线重新加密
+    - 读取路径使用密钥环（主密钥 + 旧密钥），轮换期间新旧密文都能正常解密
+    - 新写入的数据已使用主密钥，本服务只负责存量数据，完成后即可移除旧密钥
+    """
+
+    BATCH_SIZE = 500
+    FILE_CHUNK_SIZE = 200
+    FILE_WORKERS = 4
+
+    @staticmethod
+    def rotate_fields(
+        db: Session,
+        checkpoint: RotationCheckpoint,
+        *,
+        recompute_blind_index: bool = False,
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        按主键顺序分批重新加密合同敏感字段，每批提交后写入检查点
+        每行以读取时的密文为条件更新（比较并交换），期间被业务修改的行会跳过并计入 conflicts，
+        这些行已由业务写入使用主密钥加密
+        recompute_blind_index: 盲索引密钥随 ENCRYPTION_KEY 派生时需同时重算盲索引
+        返回：{"scanned", "rotated", "conflicts", "skipped", "elapsed", "rows_per_sec"}
+        """
+        table = Contract.__table__
+        size = batch_size or KeyRotationService.BATCH_SIZE
+        index_columns = list(BLIND_INDEX_FIELDS.values())
+        columns = [table.c.id, *[table.c[field] for field in SENSITIVE_FIELDS]]
+        if recompute_blind_index:
+            columns += [table.c[column] for column in index_columns]
+
+        # 条件包含全部敏感字段：任一字段被并发修改都不覆盖；显式保留 updated_at
+        guard = [table.c.id == bindparam('_id')] + [
+            table.c[field].is_not_distinct_from(bindparam(f'_old_{field}'))
+            for field in SENSITIVE_FIELDS
+        ]
+
+        result = {"scanned": 0, "rotated": 0, "conflicts": 0, "skipped": 0}
+        started = time.perf_counter()
+        checkpoint.start("fields", key_id=_key_id(settings.ENCRYPTION_KEY))
+        last_id = checkpoint.get("fields", "last_id") or ''
+
+        while True:
+            rows = (
+                db.query(*columns)
+                .filter(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(size)
+                .all()
+            )
+            if not rows:
+                break
+
+            for row in rows:
+                values: Dict[str, Any] = {}
+                for field in SENSITIVE_FIELDS:
+                    token = getattr(row, field)
+                    if not token:
+                        continue
+                    try:
+                        rotated = rotate_field(token)
+                    except InvalidToken:
+                        # 历史明文或未知密钥的密文，保持原样
+                        result["skipped"] += 1
+                        continue
+                    if rotated is not None:
+                        values[field] = rotated
+
+                if recompute_blind_index:
+                    for field, column in BLIND_INDEX_FIELDS.items():
+                        token = getattr(row, field)
+                        if not token:
+                            digest = None
+                        else:
+                            plaintext = plaintext_for_blind_index(token)
+                            if plaintext is None:
+                                # 无法解密时保留原有盲索引，不能对密文计算
+                                continue
+                            digest = blind_index(plaintext)
+                        if digest != getattr(row, column):
+                            values[column] = digest
+
+                if not values:
+                    continue
+
+                stmt = (
+                    table.update()
+                    .where(*guard)
+                    .values(updated_at=table.c.updated_at, **values)
+                )
+                params = {'_id': row.id, **{f'_old_{field}': getattr(row, field) for field in SENSITIVE_FIELDS}}
+                if db.execute(stmt, params).rowcount:
+                    result["rotated"] += 1
+                else:
+                    result["conflicts"] += 1
+
+            db.commit()
+            last_id = rows[-1].id
+            result["scanned"] += len(rows)
+            checkpoint.update("fields", last_id=last_id)
+
+            elapsed = time.perf_counter() - started
+            result["elapsed"] = elapsed
+            result["rows_per_sec"] = _throughput(result["scanned"], elapsed)
+            if progress:
+                progress(dict(result))
+
+        elapsed = time.perf_counter() - started
+        result["elapsed"] = elapsed
+        result["rows_per_sec"] = _throughput(result["scanned"], elapsed)
+        checkpoint.update("fields", completed=True)
+        logger.info(
+            "字段重新加密完成：扫描 %d 行，改写 %d 行，冲突 %d 行，跳过 %d 个值，%.0f 行/秒",
+            result["scanned"], result["rotated"], result["conflicts"], result["skipped"], result["rows_per_sec"],
+        )
+        return result
+
+    @staticmethod
+    def rotate_ocr_cache(
+        db: Session,
+        checkpoint: RotationCheckpoint,
+        *,
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        按主键顺序分批重新加密 OCR 结果缓存的文本行（与合同字段使用同一密钥环），每批提交后写入检查点
+        以读取时的密文为条件更新，期间被重新写入的记录已使用主密钥，计入 conflicts；
+        无法用密钥环解密的记录永远不会命中，直接删除并计入 purged
+        返回：{"scanned", "rotated", "conflicts", "purged", "elapsed", "rows_per_sec"}
+        """
+        table = OcrResultCache.__table__
+        size = batch_size or KeyRotationService.BATCH_SIZE
+        key = tuple_(table.c.checksum, table.c.engine_version)
+        guard = [
+            table.c.checksum == bindparam('_checksum'),
+            table.c.engine_version == bindparam('_engine_version'),
+            table.c.text_lines == bindparam('_old_text_lines'),
+        ]
+
+        result = {"scanned": 0, "rotated": 0, "conflicts": 0, "purged": 0}
+        started = time.perf_counter()
+        checkpoint.start("ocr_cache", key_id=_key_id(settings.ENCRYPTION_KEY))
+        last_key = checkpoint.get("ocr_cache", "last_key")
+
+        while True:
+            query = db.query(table.c.checksum, table.c.engine_version, table.c.text_lines)
+            if last_key:
+                query = query.filter(key > tuple(last_key))
+            rows = query.order_by(table.c.checksum, table.c.engine_version).limit(size).all()
+            if not rows:
+                break
+
+            for row in rows:
+                params = {
+                    '_checksum': row.checksum,
+                    '_engine_version': row.engine_version,
+                    '_old_text_lines': row.text_lines,
+                }
+                try:
+                    rotated = rotate_field(row.text_lines)
+                except InvalidToken:
+                    if db.execute(table.delete().where(*guard), params).rowcount:
+                        result["purged"] += 1
+                    else:
+                        result["conflicts"] += 1
+                    continue
+                if rotated is None:
+                    continue
+
+                stmt = table.update().where(*guard).values(text_lines=rotated, size=len(rotated))
+                if db.execute(stmt, params).rowcount:
+                    result["rotated"] += 1
+                else:
+                    result["conflicts"] += 1
+
+            db.commit()
+            last_key = [rows[-1].checksum, rows[-1].engine_version]
+            result["scanned"] += len(rows)
+            checkpoint.update("ocr_cache", last_key=last_key)
+
+            elapsed = time.perf_counter() - started
+            result["elapsed"] = elapsed
+            result["rows_per_sec"] = _throughput(result["scanned"], elapsed)
+            if progress:
+                progress(dict(result))
+
+        elapsed = time.perf_counter() - started
+        result["elapsed"] = elapsed
+        result["rows_per_sec"] = _throughput(result["scanned"], elapsed)
+        checkpoint.update("ocr_cache", completed=True)
+        logger.info(
+            "OCR 结果缓存重新加密完成：扫描 %d 行，改写 %d 行，冲突 %d 行，删除 %d 行无法解密的记录",
+            result["scanned"], result["rotated"], result["conflicts"], result["purged"],
+        )
+        return result
+
+    @staticmethod
+    def rotate_files(
+        checkpoint: RotationCheckpoint,
+        *,
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        按路径顺序遍历存储目录，分块交给线程池重新加密，每块完成后写入检查点
+        单个文件写临时文件后原子替换，读取方不会看到半写状态；旧格式文件同时转换为分块格式
+        返回：{"scanned", "rotated", "bytes", "failed", "missing", "elapsed", "files_per_sec", "mb_per_sec"}
+        """
+        result: Dict[str, Any] = {"scanned": 0, "rotated": 0, "bytes": 0, "failed": 0, "missing": 0}
+        started = time.perf_counter()
+        checkpoint.start("files", key_id=_key_id(settings.FILE_ENCRYPTION_KEY))
+        last_path = checkpoint.get("files", "last_path") or ''
+
+        def rotate_one(path: Path) -> tuple[str, int]:
+            try:
+                size = file_storage_service.rotate_file(path)
+            except FileNotFoundError:
+                # 遍历后被删除的文件
+                return "missing", 0
+            except InvalidToken:
+                logger.warning("文件无法用当前密钥环解密，已跳过: %s", path)
+                return "failed", 0
+            return ("unchanged", 0) if size is None else ("rotated", size)
+
+        def flush(chunk: List[Path], executor: ThreadPoolExecutor) -> None:
+            for status, size in executor.map(rotate_one, chunk):
+                result["scanned"] += 1
+                if status == "rotated":
+                    result["rotated"] += 1
+                    result["bytes"] += size
+                elif status != "unchanged":
+                    result[status] += 1
+            checkpoint.update("files", last_path=str(chunk[-1]))
+
+            elapsed = time.perf_counter() - started
+            result["elapsed"] = elapsed
+            result["files_per_sec"] = _throughput(result["scanned"], elapsed)
+            result["mb_per_sec"] = _throughput(result["bytes"] / (1024 * 1024), elapsed)
+            if progress:
+                progress(dict(result))
+
+        with ThreadPoolExecutor(
+            max_workers=max(workers or KeyRotationService.FILE_WORKERS, 1),
+            thread_name_prefix="key-rotation",
+        ) as executor:
+            chunk: List[Path] = []
+            for path in file_storage_service.iter_stored_files():
+                if str(path) <= last_path:
+                    continue
+                chunk.append(path)
+                if len(chunk) >= KeyRotationService.FILE_CHUNK_SIZE:
+                    flush(chunk, executor)
+                    chunk = []
+            if chunk:
+                flush(chunk, executor)
+
+        elapsed = time.perf_counter() - started
+        result["elapsed"] = elapsed
+        result["files_per_sec"] = _throughput(result["scanned"], elapsed)
+        result["mb_per_sec"] = _throughput(result["bytes"] / (1024 * 1024), elapsed)
+        checkpoint.update("files", completed=True)
+        logger.info(
+            "文件重新加密完成：扫描 %d 个，改写 %d 个（%.1f MB），失败 %d 个，%.1f 个/秒",
+            result["scanned"], result["rotated"], result["bytes"] / (1024 * 1024), result["failed"],
+            result["files_per_sec"],
+        )
+        return result
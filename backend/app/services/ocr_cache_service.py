@@ -0,0 +1,172 @@
+"""OCR 结果缓存：按文件 SHA-256 与引擎版本保存识别文本行，命中时跳过 OCR 推理"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.ocr_result_cache import OcrResultCache
+from app.utils.encryption import cipher
+
+logger = logging.getLogger(__name__)
+
+TextLines = List[Tuple[str, float]]
+
+
+class _CacheCounters:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def add(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+_counters = _CacheCounters()
+
+
+class OcrCacheService:
+    """OCR 结果缓存的读写与淘汰；缓存读写失败只记录日志，不影响识别"""
+
+    # 写入后最多每隔这么久执行一次淘汰
+    PRUNE_INTERVAL_SECONDS = 600
+    _last_prune = 0.0
+    _prune_lock = threading.Lock()
+
+    @staticmethod
+    def file_checksum(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as source:
+            for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def get(checksum: str, engine_version: str) -> Optional[TextLines]:
+        """查询缓存，命中时刷新最近使用时间"""
+        try:
+            with SessionLocal() as db:
+                entry = db.get(OcrResultCache, (checksum, engine_version))
+                if entry is None:
+                    _counters.add("misses")
+                    return None
+                payload = cipher.decrypt(entry.text_lines.encode()).decode()
+                entry.last_used_at = datetime.now(timezone.utc)
+                db.commit()
+        except Exception:
+            logger.warning("读取 OCR 结果缓存失败: %s", checksum, exc_info=True)
+            _counters.add("misses")
+            return None
+        _counters.add("hits")
+        return [(text, float(confidence)) for text, confidence in json.loads(payload)]
+
+    @staticmethod
+    def put(checksum: str, engine_version: str, text_lines: TextLines) -> None:
+        """写入缓存（已存在时覆盖），并按间隔触发淘汰"""
+        try:
+            token = cipher.encrypt(json.dumps(text_lines, ensure_ascii=False).encode()).decode()
+            with SessionLocal() as db:
+                db.merge(OcrResultCache(
+                    checksum=checksum,
+                    engine_version=engine_version,
+                    text_lines=token,
+                    size=len(token),
+                    last_used_at=datetime.now(timezone.utc),
+                ))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # 并发识别同一文件时另一请求已写入
+                    db.rollback()
+                    return
+            _counters.add("stores")
+        except Exception:
+            logger.warning("写入 OCR 结果缓存失败: %s", checksum, exc_info=True)
+            return
+        OcrCacheService._maybe_prune()
+
+    @staticmethod
+    def prune(
+        db: Session,
+        *,
+        max_age_days: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> int:
+        """删除超过保留天数的记录，总容量仍超限时按最近使用时间从旧到新删除，返回删除条数"""
+        max_age_days = settings.OCR_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        max_bytes = settings.OCR_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        removed = db.query(OcrResultCache).filter(OcrResultCache.last_used_at < cutoff).delete(
+            synchronize_session=False
+        )
+
+        total = int(db.query(func.coalesce(func.sum(OcrResultCache.size), 0)).scalar() or 0)
+        if total > max_bytes:
+            excess = total - max_bytes
+            victims = []
+            rows = (
+                db.query(OcrResultCache.checksum, OcrResultCache.engine_version, OcrResultCache.size)
+                .order_by(OcrResultCache.last_used_at)
+                .yield_per(500)
+            )
+            for checksum, engine_version, size in rows:
+                if excess <= 0:
+                    break
+                victims.append((checksum, engine_version))
+                excess -= size
+            for checksum, engine_version in victims:
+                db.query(OcrResultCache).filter(
+                    OcrResultCache.checksum == checksum,
+                    OcrResultCache.engine_version == engine_version,
+                ).delete(synchronize_session=False)
+            removed += len(victims)
+
+        db.commit()
+        if removed:
+            _counters.add("evictions", removed)
+            logger.info("OCR 结果缓存淘汰 %d 条记录", removed)
+        return removed
+
+    @staticmethod
+    def stats() -> Dict[str, float]:
+        """进程内的命中统计（自进程启动起）"""
+        return _counters.snapshot()
+
+    @classmethod
+    def _maybe_prune(cls) -> None:
+        now = time.monotonic()
+        with cls._prune_lock:
+            if now - cls._last_prune < cls.PRUNE_INTERVAL_SECONDS:
+                return
+            cls._last_prune = now
+        try:
+            with SessionLocal() as db:
+                cls.prune(db)
+        except Exception:
+            logger.warning("OCR 结果缓存淘汰失败", exc_info=True)
@@ -0,0 +1,124 @@
+"""合同只读视图：按需解密敏感字段，不修改底层 ORM 实例"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Collection, Dict, Iterable, List, Optional
+
+from app.config import settings
+from app.models.contract import Contract
+from app.utils.encryption import SENSITIVE_FIELDS, decrypt_field
+
+_SENSITIVE = frozenset(SENSITIVE_FIELDS)
+
+
+class ContractView:
+    """
+    合同的只读包装
+    - 非敏感字段直接读取底层实例
+    - 敏感字段在首次读取时解密并缓存，响应 Schema 未读取的字段不会解密
+    - hidden 中的敏感字段读取为 None（调用方声明不需要时跳过解密）
+    底层实例保持密文，即使之后被提交也不会把明文写回数据库
+    """
+
+    __slots__ = ("_contract", "_plain", "_hidden")
+
+    def __init__(
+        self,
+        contract: Contract,
+        plain: Optional[Dict[str, Any]] = None,
+        hidden: Collection[str] = (),
+    ) -> None:
+        object.__setattr__(self, "_contract", contract)
+        object.__setattr__(self, "_plain", dict(plain or {}))
+        object.__setattr__(self, "_hidden", frozenset(hidden))
+
+    @property
+    def contract(self) -> Contract:
+        """底层 ORM 实例（敏感字段为密文）"""
+        return self._contract
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._contract, name)
+        if name not in _SENSITIVE:
+            return value
+        if name in self._hidden:
+            return None
+        if name not in self._plain:
+            self._plain[name] = _decrypt(value)
+        return self._plain[name]
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"合同视图为只读，不能修改字段 {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"合同视图为只读，不能删除字段 {name}")
+
+    def __repr__(self) -> str:
+        return f"<ContractView(id={self._contract.id}, teacher_code={self._contract.teacher_code})>"
+
+
+def _decrypt(value: Optional[str]) -> Optional[str]:
+    # 与原有逻辑一致：空值原样返回，解密失败时保留原值
+    if not value:
+        return value
+    try:
+        return decrypt_field(value)
+    except Exception:
+        return value
+
+
+def contract_views(contracts: Iterable[Contract], hidden: Collection[str] = ()) -> List[ContractView]:
+    """将合同列表包装为惰性解密视图"""
+    return [ContractView(contract, hidden=hidden) for contract in contracts]
+
+
+# 批量解密的线程池与单个任务的密文数量
+_DECRYPT_CHUNK_SIZE = 256
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(settings.DECRYPT_WORKERS, 1),
+                thread_name_prefix="contract-decrypt",
+            )
+        return _executor
+
+
+def decrypt_contracts_batch(
+    contracts: List[Contract],
+    fields: Collection[str] = SENSITIVE_FIELDS,
+) -> List[ContractView]:
+    """
+    一次性解密一批合同的敏感字段并返回视图（用于导出等确定会读取全部字段的场景）
+    密文按块分发到线程池解密；批量较小或只配置一个线程时直接在当前线程完成
+    """
+    wanted = [field for field in fields if field in _SENSITIVE]
+    tokens = [
+        (index, field, getattr(contract, field, None))
+        for index, contract in enumerate(contracts)
+        for field in wanted
+        if getattr(contract, field, None)
+    ]
+
+    chunks = [tokens[start:start + _DECRYPT_CHUNK_SIZE] for start in range(0, len(tokens), _DECRYPT_CHUNK_SIZE)]
+    if len(chunks) > 1 and settings.DECRYPT_WORKERS > 1:
+        decrypted_chunks = _get_executor().map(_decrypt_chunk, chunks)
+    else:
+        decrypted_chunks = map(_decrypt_chunk, chunks)
+
+    plains: List[Dict[str, Any]] = [{} for _ in contracts]
+    for chunk, values in zip(chunks, decrypted_chunks):
+        for (index, field, _), value in zip(chunk, values):
+            plains[index][field] = value
+
+    return [ContractView(contract, plain=plain) for contract, plain in zip(contracts, plains)]
+
+
+def _decrypt_chunk(chunk: List[tuple]) -> List[Optional[str]]:
+    return [_decrypt(value) for _, _, value in chunk]
@@ -0,0 +1,158 @@
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Date, DateTime, Float, Integer
+
+from app.models.contract import Contract
+from app.utils.excel_export import ExcelExporter
+
+
+class _ChunkSink(io.RawIOBase):
+    """收集写入字节的只追加输出流，供 ParquetWriter 逐个行组写出后取走"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class DataExporter:
+    """CSV / Parquet 导出工具：按批次读取合同并逐批写出，跳过 Excel 的单元格样式开销"""
+
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def parquet_available() -> bool:
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def export_csv_stream(
+        contracts: Iterable[Contract],
+        fields: Sequence[tuple[str, str]] | None = None,
+        batch_size: int | None = None,
+        progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    ) -> Iterator[bytes]:
+        """流式导出 CSV（UTF-8 BOM，便于 Excel 直接打开中文表头）"""
+        export_fields = list(fields or ExcelExporter.DEFAULT_EXPORT_FIELDS)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow([header for _, header in export_fields])
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+        processed = 0
+        for batch in DataExporter._batched(contracts, batch_size or DataExporter.BATCH_SIZE):
+            buffer.seek(0)
+            buffer.truncate()
+            for contract in batch:
+                writer.writerow([
+                    DataExporter._csv_value(getattr(contract, field, None))
+                    for field, _ in export_fields
+                ])
+            processed += len(batch)
+            if progress:
+                progress(processed, None)
+            yield buffer.getvalue().encode("utf-8")
+
+        if progress:
+            progress(processed, processed)
+
+    @staticmethod
+    def export_parquet_stream(
+        contracts: Iterable[Contract],
+        fields: Sequence[tuple[str, str]] | None = None,
+        batch_size: int | None = None,
+        progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    ) -> Iterator[bytes]:
+        """流式导出 Parquet，每批合同写成一个行组，列名使用字段英文键"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        export_fields = list(fields or ExcelExporter.DEFAULT_EXPORT_FIELDS)
+        schema = pa.schema([
+            pa.field(field, DataExporter._arrow_type(pa, field))
+            for field, _ in export_fields
+        ])
+
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        processed = 0
+        try:
+            for batch in DataExporter._batched(contracts, batch_size or DataExporter.BATCH_SIZE):
+                columns = {
+                    field: [getattr(contract, field, None) for contract in batch]
+                    for field, _ in export_fields
+                }
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                processed += len(batch)
+                if progress:
+                    progress(processed, None)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        finally:
+            writer.close()
+        if progress:
+            progress(processed, processed)
+        yield sink.drain()
+
+    @staticmethod
+    def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, size))
+            if not batch:
+                return
+            yield batch
+
+    @staticmethod
+    def _csv_value(value: Any) -> Any:
+        if value is None:
+            return ''
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(value, date):
+            return value.strftime('%Y-%m-%d')
+        return value
+
+    @staticmethod
+    def _arrow_type(pa, field: str):
+        column = Contract.__table__.columns.get(field)
+        column_type = column.type if column is not None else None
+        if isinstance(column_type, DateTime):
+            return pa.timestamp('us', tz='UTC')
+        if isinstance(column_type, Date):
+            return pa.date32()
+        if isinstance(column_type, Integer):
+            return pa.int64()
+        if isinstance(column_type, Float):
+            return pa.float64()
+        return pa.string()
+
+
+data_exporter = DataExporter()
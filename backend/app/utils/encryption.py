@@ -1,19 +1,41 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from app.config import settings
 import base64
+import binascii
+import hashlib
+import hmac
+import re
+from typing import Any, Dict, List, Optional
 
-# 创建加密器
-# 注意：ENCRYPTION_KEY 必须是 32 字节长的 base64 编码字符串
-def get_cipher():
-    # 确保密钥是 32 字节
-    key = settings.ENCRYPTION_KEY.encode()[:32]
-    # 补齐到 32 字节
+
+def derive_fernet_key(raw_key: str) -> bytes:
+    """把配置中的密钥字符串截断/补齐到 32 字节并编码为 Fernet 密钥"""
+    key = raw_key.encode()[:32]
     key = key.ljust(32, b'0')
-    # Base64 编码
-    key_b64 = base64.urlsafe_b64encode(key)
-    return Fernet(key_b64)
+    return base64.urlsafe_b64encode(key)
+
+
+def parse_key_list(value: Optional[str]) -> List[str]:
+    """解析逗号分隔的旧密钥列表"""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def build_key_ring(primary_key: str, old_keys: Optional[str] = None) -> MultiFernet:
+    """
+    构建密钥环：用主密钥加密，按顺序尝试主密钥和旧密钥解密
+    轮换时把新密钥设为主密钥、原密钥移入旧密钥列表，重新加密完成后再移除旧密钥
+    """
+    keys = [primary_key, *[key for key in parse_key_list(old_keys) if key != primary_key]]
+    return MultiFernet([Fernet(derive_fernet_key(key)) for key in keys])
+
+
+# 创建加密器
+# 注意：ENCRYPTION_KEY 为当前主密钥，ENCRYPTION_OLD_KEYS 为轮换前的旧密钥（逗号分隔）
+def get_cipher() -> MultiFernet:
+    return build_key_ring(settings.ENCRYPTION_KEY, settings.ENCRYPTION_OLD_KEYS)
 
 cipher = get_cipher()
+_primary_cipher = Fernet(derive_fernet_key(settings.ENCRYPTION_KEY))
 
 def encrypt_field(value: str) -> str:
     """加密敏感字段"""
@@ -37,6 +59,96 @@ def decrypt_field(encrypted_value: str) -> str:
         print(f"Decryption error: {e}")
         return encrypted_value
 
+def rotate_field(encrypted_value: str) -> Optional[str]:
+    """
+    用主密钥重新加密密文，已是主密钥密文时返回 None（无需改写）
+    无法用密钥环解密时抛出 cryptography.fernet.InvalidToken
+    """
+    token = encrypted_value.encode()
+    try:
+        _primary_cipher.decrypt(token)
+        return None
+    except InvalidToken:
+        return cipher.rotate(token).decode()
+
 # 需要加密的字段列表
 SENSITIVE_FIELDS = ['id_number', 'phone_number', 'address', 'emergency_phone']
 
+
+# 盲索引：对明文做带密钥的 HMAC，支持对加密字段精确匹配查询
+# 敏感字段 -> 盲索引列
+BLIND_INDEX_FIELDS = {
+    'id_number': 'id_number_bidx',
+    'phone_number': 'phone_number_bidx',
+    'emergency_phone': 'emergency_phone_bidx',
+}
+
+_BLIND_INDEX_NOISE = re.compile(r'[\s\-()（）]')
+
+
+def get_blind_index_key() -> bytes:
+    if settings.BLIND_INDEX_KEY:
+        return settings.BLIND_INDEX_KEY.encode()
+    # 未单独配置时从字段加密密钥派生，避免与加密密钥直接复用
+    return hmac.new(settings.ENCRYPTION_KEY.encode(), b'contract-blind-index', hashlib.sha256).digest()
+
+
+_blind_index_key = get_blind_index_key()
+
+
+def normalize_for_blind_index(value: Any) -> str:
+    """去掉空白、连字符和括号并统一大小写，保证录入格式不同的同一号码得到相同索引"""
+    return _BLIND_INDEX_NOISE.sub('', str(value)).upper()
+
+
+def blind_index(value: Any) -> Optional[str]:
+    """计算明文的盲索引（HMAC-SHA256 十六进制），空值返回 None"""
+    if value is None:
+        return None
+    normalized = normalize_for_blind_index(value)
+    if not normalized:
+        return None
+    return hmac.new(_blind_index_key, normalized.encode(), hashlib.sha256).hexdigest()
+
+
+def blind_indexes_for(data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """根据 data 中出现的明文敏感字段计算对应盲索引列的值（需在加密前调用）"""
+    return {
+        index_column: blind_index(data[field])
+        for field, index_column in BLIND_INDEX_FIELDS.items()
+        if field in data
+    }
+
+
+_FERNET_TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+={0,2}$')
+# 版本(1) + 时间戳(8) + IV(16) + HMAC(32)，密文部分为 16 字节的整数倍且至少一个分组
+_FERNET_OVERHEAD = 57
+
+
+def looks_like_fernet_token(value: str) -> bool:
+    """判断字符串是否具有 Fernet 密文的格式（urlsafe base64、版本字节 0x80、长度符合分组）"""
+    if not _FERNET_TOKEN_PATTERN.match(value):
+        return False
+    try:
+        raw = base64.urlsafe_b64decode(value)
+    except (ValueError, binascii.Error):
+        return False
+    return (
+        len(raw) >= _FERNET_OVERHEAD + 16
+        and raw[0] == 0x80
+        and (len(raw) - _FERNET_OVERHEAD) % 16 == 0
+    )
+
+
+def plaintext_for_blind_index(value: str) -> Optional[str]:
+    """
+    取计算盲索引用的明文
+    能用密钥环解密时返回明文；不具有密文格式的值是历史明文（decrypt_field 读取时也原样返回），直接使用；
+    形如密文却无法解密（密钥已不在密钥环中或数据损坏）时返回 None，不能对密文计算盲索引
+    """
+    try:
+        return cipher.decrypt(value.encode()).decode()
+    except InvalidToken:
+        return None if looks_like_fernet_token(value) else value
+    except UnicodeError:
+        return None
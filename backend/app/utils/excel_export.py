@@ -1,8 +1,12 @@
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
-from typing import List, Sequence
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
 from datetime import datetime
 import io
+import os
+import tempfile
+
+import xlsxwriter
 
 from app.models.contract import Contract
 
@@ -56,6 +60,11 @@ class ExcelExporter:
         ('created_at', '创建时间'),
         ('updated_at', '更新时间'),
     ]
+
+    # 流式导出时每次向客户端发送的字节数
+    STREAM_CHUNK_SIZE = 64 * 1024
+    # 导出进度回调的上报间隔（行）
+    PROGRESS_INTERVAL = 500
     
     @staticmethod
     def export_contracts(
@@ -87,20 +96,7 @@ class ExcelExporter:
         # 写入数据
         for row_idx, contract in enumerate(contracts, start=2):
             for col_idx, (field, _) in enumerate(export_fields, start=1):
-                value = getattr(contract, field, '')
-                
-                # 格式化日期
-                if isinstance(value, datetime):
-                    value = value.strftime('%Y-%m-%d %H:%M:%S')
-                elif hasattr(value, 'strftime'):
-                    value = value.strftime('%Y-%m-%d')
-                elif field == 'ocr_confidence' and value not in (None, ''):
-                    value = f"{round(float(value) * 100, 2)}%"
-                
-                # 处理 None 值
-                if value is None:
-                    value = ''
-                
+                value = ExcelExporter.format_value(field, getattr(contract, field, ''))
                 ws.cell(row=row_idx, column=col_idx, value=value)
         
         # 自动调整列宽
@@ -118,6 +114,82 @@ class ExcelExporter:
         
         return output.getvalue()
 
+    @staticmethod
+    def export_contracts_stream(
+        contracts: Iterable[Contract],
+        fields: Sequence[tuple[str, str]] | None = None,
+        progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    ) -> Iterator[bytes]:
+        """
+        流式导出合同列表为 Excel 文件
+        使用 xlsxwriter constant_memory 模式逐行写入临时文件，内存占用与行数无关，
+        完成后按块读取临时文件返回给调用方
+        progress: 可选进度回调 (已写入行数, 总行数未知时为 None)
+        """
+        export_fields = list(fields or ExcelExporter.DEFAULT_EXPORT_FIELDS)
+
+        fd, temp_path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            wb = xlsxwriter.Workbook(temp_path, {'constant_memory': True})
+            ws = wb.add_worksheet("教师合同信息")
+
+            header_format = wb.add_format({
+                'bold': True,
+                'font_color': '#FFFFFF',
+                'bg_color': '#4472C4',
+                'align': 'center',
+                'valign': 'vcenter',
+            })
+
+            # constant_memory 模式下必须按行顺序写入，列宽需在写入数据前设置
+            for col_idx, (_, header) in enumerate(export_fields):
+                ws.set_column(col_idx, col_idx, len(header) * 2 + 5)
+                ws.write(0, col_idx, header, header_format)
+
+            row_idx = 0
+            for row_idx, contract in enumerate(contracts, start=1):
+                for col_idx, (field, _) in enumerate(export_fields):
+                    ws.write(row_idx, col_idx, ExcelExporter.format_value(field, getattr(contract, field, '')))
+                if progress and row_idx % ExcelExporter.PROGRESS_INTERVAL == 0:
+                    progress(row_idx, None)
+            if progress:
+                progress(row_idx, row_idx)
+
+            # 添加水印信息
+            ws.write(row_idx + 2, 0, f"导出时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            ws.write(row_idx + 3, 0, "教师合同管理系统")
+            wb.close()
+
+            with open(temp_path, 'rb') as output:
+                while True:
+                    chunk = output.read(ExcelExporter.STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def format_value(field: str, value: Any) -> Any:
+        """格式化导出单元格的值"""
+        # 格式化日期
+        if isinstance(value, datetime):
+            value = value.strftime('%Y-%m-%d %H:%M:%S')
+        elif hasattr(value, 'strftime'):
+            value = value.strftime('%Y-%m-%d')
+        elif field == 'ocr_confidence' and value not in (None, ''):
+            value = f"{round(float(value) * 100, 2)}%"
+
+        # 处理 None 值
+        if value is None:
+            value = ''
+
+        return value
+
     @staticmethod
     def generate_template(
         fields: Sequence[tuple[str, str]] | None = None,
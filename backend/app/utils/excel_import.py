@@ -1,5 +1,5 @@
 import io
-from typing import List, Tuple, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, date, timedelta
 
 from openpyxl import load_workbook
@@ -33,7 +33,44 @@ DATE_FORMATS = (
 )
 
 
-def parse_contracts_from_bytes(file_bytes: bytes) -> List[Tuple[int, Dict[str, Any]]]:
+# 解析进度回调的上报间隔（行）
+PROGRESS_INTERVAL = 200
+
+
+def parse_contracts_from_bytes(
+    file_bytes: bytes,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    解析导入 Excel，返回 [(行号, 字段字典), ...]
+    progress: 可选进度回调 (已扫描数据行数, 数据行总数)
+    """
+    column_map, rows = load_sheet_rows(file_bytes)
+
+    total_rows = len(rows)
+    records: List[Tuple[int, Dict[str, Any]]] = []
+    for scanned, (row_index, row) in enumerate(rows, start=1):
+        if progress and scanned % PROGRESS_INTERVAL == 0:
+            progress(scanned, total_rows)
+
+        record = convert_row(column_map, row_index, row)
+        if record is not None:
+            records.append((row_index, record))
+
+    if progress:
+        progress(total_rows, total_rows)
+
+    if not records:
+        raise ValueError('未在 Excel 中解析到有效数据行')
+
+    return records
+
+
+def load_sheet_rows(file_bytes: bytes) -> Tuple[Dict[int, str], List[Tuple[int, Tuple[Any, ...]]]]:
+    """
+    读取导入 Excel 的表头映射与非空数据行
+    返回 (列序号 -> 字段名, [(行号, 原始单元格值), ...])
+    """
     if not file_bytes:
         raise ValueError('文件为空，无法导入')
 
@@ -59,35 +96,37 @@ def parse_contracts_from_bytes(file_bytes: bytes) -> List[Tuple[int, Dict[str, A
         readable = [FIELD_TO_LABEL.get(field, field) for field in missing_columns]
         raise ValueError(f"模板缺少必要列：{'、'.join(readable)}")
 
-    records: List[Tuple[int, Dict[str, Any]]] = []
-    for row_index, row in enumerate(worksheet.iter_rows(min_row=2, values_only=True), start=2):
-        if _is_empty_row(row):
-            continue
-
-        record: Dict[str, Any] = {}
-        for col_index, value in enumerate(row, start=1):
-            field = column_map.get(col_index)
-            if not field:
-                continue
-
-            try:
-                cleaned = _convert_cell_value(field, value)
-            except ValueError as exc:
-                column_name = FIELD_TO_LABEL.get(field, field)
-                raise ValueError(f'第 {row_index} 行 {column_name} 格式错误：{exc}') from exc
-
-            if cleaned is not None:
-                record[field] = cleaned
-
-        if not any(record.get(field) for field in MANDATORY_FIELDS):
+    rows = [
+        (row_index, row)
+        for row_index, row in enumerate(worksheet.iter_rows(min_row=2, values_only=True), start=2)
+        if not _is_empty_row(row)
+    ]
+    return column_map, rows
+
+
+def convert_row(column_map: Dict[int, str], row_index: int, row: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+    """
+    将一行原始单元格值转换为字段字典
+    工号与姓名均为空的行返回 None；单元格格式错误时抛出 ValueError
+    """
+    record: Dict[str, Any] = {}
+    for col_index, value in enumerate(row, start=1):
+        field = column_map.get(col_index)
+        if not field:
             continue
 
-        records.append((row_index, record))
+        try:
+            cleaned = _convert_cell_value(field, value)
+        except ValueError as exc:
+            column_name = FIELD_TO_LABEL.get(field, field)
+            raise ValueError(f'第 {row_index} 行 {column_name} 格式错误：{exc}') from exc
 
-    if not records:
-        raise ValueError('未在 Excel 中解析到有效数据行')
+        if cleaned is not None:
+            record[field] = cleaned
 
-    return records
+    if not any(record.get(field) for field in MANDATORY_FIELDS):
+        return None
+    return record
 
 
 def _convert_cell_value(field: str, value: Any) -> Any:
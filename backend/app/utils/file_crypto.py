@@ -0,0 +1,159 @@
+"""
+合同文件分块加密格式（AES-256-GCM）
+
+文件结构：
+    头部 24 字节：magic(4) | 版本(1) | 明文分块大小(4) | 密钥 ID(8) | nonce 前缀(7)
+    分块若干：每块为 明文分块 + 16 字节 GCM 标签，除最后一块外明文长度均为分块大小
+
+每块的 nonce 为 前缀 + 块序号(4) + 末块标记(1)，并以头部作为附加认证数据，
+分块被截断、重排或替换都会导致解密失败；任意字节区间只需解密覆盖它的分块。
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import struct
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"PMCE"
+VERSION = 1
+CHUNK_SIZE = 64 * 1024
+TAG_SIZE = 16
+HEADER = struct.Struct(">4sBI8s7s")
+
+
+def derive_file_key(raw_key: str) -> bytes:
+    """由配置中的密钥字符串派生 AES-256 密钥（与 Fernet 密钥使用相同的截断/补齐规则）"""
+    padded = raw_key.encode()[:32].ljust(32, b'0')
+    return hmac.new(padded, b"contract-file-aesgcm-v1", hashlib.sha256).digest()
+
+
+def is_chunked(prefix: bytes) -> bool:
+    """根据文件开头判断是否为分块格式（旧格式为 Fernet 令牌，以 gAAAAA 开头）"""
+    return prefix[:len(MAGIC)] == MAGIC
+
+
+class ChunkedFileCipher:
+    """分块加密器：第一个密钥用于加密，所有密钥都可用于解密（按头部中的密钥 ID 选择）"""
+
+    def __init__(self, keys: List[bytes], chunk_size: int = CHUNK_SIZE) -> None:
+        if not keys:
+            raise ValueError("至少需要一个文件加密密钥")
+        self._chunk_size = chunk_size
+        self._primary_id = self._key_id(keys[0])
+        self._ciphers: Dict[bytes, AESGCM] = {}
+        for key in keys:
+            self._ciphers.setdefault(self._key_id(key), AESGCM(key))
+
+    @staticmethod
+    def _key_id(key: bytes) -> bytes:
+        return hashlib.sha256(key).digest()[:8]
+
+    @staticmethod
+    def _nonce(prefix: bytes, index: int, last: bool) -> bytes:
+        return prefix + struct.pack(">I", index) + (b"\x01" if last else b"\x00")
+
+    def encrypt_chunks(self, pieces: Iterable[bytes], output: BinaryIO) -> Tuple[int, str]:
+        """
+        把任意切分的明文片段重新切成定长分块逐块加密写入 output
+        返回 (明文大小, 明文 sha256)；内存占用不超过两个分块
+        """
+        header = HEADER.pack(MAGIC, VERSION, self._chunk_size, self._primary_id, os.urandom(7))
+        prefix = header[-7:]
+        cipher = self._ciphers[self._primary_id]
+        output.write(header)
+
+        digest = hashlib.sha256()
+        size = 0
+        index = 0
+        buffer = bytearray()
+        for piece in pieces:
+            if not piece:
+                continue
+            digest.update(piece)
+            size += len(piece)
+            buffer += piece
+            # 保留至少一个完整分块，直到确认后面还有数据才能判断它不是末块
+            while len(buffer) > self._chunk_size:
+                chunk = bytes(buffer[:self._chunk_size])
+                del buffer[:self._chunk_size]
+                output.write(cipher.encrypt(self._nonce(prefix, index, False), chunk, header))
+                index += 1
+
+        output.write(cipher.encrypt(self._nonce(prefix, index, True), bytes(buffer), header))
+        return size, digest.hexdigest()
+
+    def encrypt_stream(self, source: BinaryIO, output: BinaryIO) -> Tuple[int, str]:
+        """从文件对象流式读取并加密，返回 (明文大小, 明文 sha256)"""
+        return self.encrypt_chunks(iter(lambda: source.read(self._chunk_size), b""), output)
+
+    def is_primary(self, header: bytes) -> bool:
+        """头部记录的密钥是否为当前主密钥"""
+        return HEADER.unpack(header[:HEADER.size])[3] == self._primary_id
+
+    def plaintext_size(self, header: bytes, file_size: int) -> int:
+        """根据头部与密文文件大小计算明文大小"""
+        _, _, chunk_size, _, _ = self._unpack_header(header)
+        body = file_size - HEADER.size
+        stored_chunk = chunk_size + TAG_SIZE
+        if body < TAG_SIZE:
+            raise InvalidToken
+        count = -(-body // stored_chunk)
+        return (count - 1) * chunk_size + body - (count - 1) * stored_chunk - TAG_SIZE
+
+    def iter_decrypt(
+        self,
+        source: BinaryIO,
+        file_size: int,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> Iterator[bytes]:
+        """
+        解密明文区间 [start, end]（含两端，end 为空表示到文件末尾），逐块产出
+        认证失败时抛出 InvalidToken
+        """
+        source.seek(0)
+        header = source.read(HEADER.size)
+        _, _, chunk_size, key_id, prefix = self._unpack_header(header)
+        cipher = self._ciphers.get(key_id)
+        if cipher is None:
+            raise InvalidToken
+
+        total = self.plaintext_size(header, file_size)
+        end = total - 1 if end is None else min(end, total - 1)
+        if total == 0:
+            # 空文件也要校验末块标签，防止被截断成空
+            source.seek(HEADER.size)
+            self._decrypt(cipher, prefix, 0, True, source.read(TAG_SIZE), header)
+            return
+        if start > end:
+            return
+
+        stored_chunk = chunk_size + TAG_SIZE
+        last_index = (total - 1) // chunk_size if total else 0
+        first = start // chunk_size
+        source.seek(HEADER.size + first * stored_chunk)
+        for index in range(first, end // chunk_size + 1):
+            plain = self._decrypt(cipher, prefix, index, index == last_index, source.read(stored_chunk), header)
+            offset = index * chunk_size
+            yield plain[max(start - offset, 0):end - offset + 1]
+
+    @staticmethod
+    def _unpack_header(header: bytes) -> tuple:
+        if len(header) < HEADER.size or not is_chunked(header):
+            raise InvalidToken
+        fields = HEADER.unpack(header[:HEADER.size])
+        if fields[1] != VERSION or fields[2] <= 0:
+            raise InvalidToken
+        return fields
+
+    def _decrypt(self, cipher: AESGCM, prefix: bytes, index: int, last: bool, data: bytes, header: bytes) -> bytes:
+        try:
+            return cipher.decrypt(self._nonce(prefix, index, last), data, header)
+        except InvalidTag as exc:
+            raise InvalidToken from exc
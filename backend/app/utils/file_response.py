@@ -0,0 +1,73 @@
+"""加密文件下载响应：流式解密并支持 HTTP Range 单区间请求"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.services.file_storage_service import DecryptedFile
+
+_RANGE_PATTERN = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析 Range 请求头，返回闭区间 (start, end)；无 Range 或格式不支持（如多区间）时返回 None
+    区间无法满足时抛出 ValueError
+    """
+    if not header:
+        return None
+    match = _RANGE_PATTERN.match(header)
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N：最后 N 个字节
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("请求区间无效")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("请求区间无效")
+    return start, min(end, size - 1)
+
+
+def decrypted_file_response(
+    decrypted: DecryptedFile,
+    *,
+    range_header: Optional[str] = None,
+    media_type: str = "application/octet-stream",
+    headers: Optional[Dict[str, str]] = None,
+) -> StreamingResponse:
+    """构造流式下载响应：带 Range 时返回 206 与对应区间，否则返回完整内容"""
+    response_headers = {"Accept-Ranges": "bytes", **(headers or {})}
+    try:
+        byte_range = parse_byte_range(range_header, decrypted.size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="请求区间超出文件大小",
+            headers={"Content-Range": f"bytes */{decrypted.size}"},
+        )
+
+    if byte_range is None:
+        response_headers["Content-Length"] = str(decrypted.size)
+        return StreamingResponse(decrypted.iter_bytes(), media_type=media_type, headers=response_headers)
+
+    start, end = byte_range
+    response_headers["Content-Range"] = f"bytes {start}-{end}/{decrypted.size}"
+    response_headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        decrypted.iter_bytes(start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=response_headers,
+    )
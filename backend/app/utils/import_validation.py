@@ -0,0 +1,54 @@
+"""
+合同导入的逐行转换与校验
+
+预览大文件时在 spawn 子进程中执行，子进程需按模块路径导入本模块：
+这里只依赖 Schema 与 Excel 单元格转换，不要引入路由、OCR 或服务层模块。
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.schemas.contract import ContractCreate, ContractUpdate
+from app.utils.excel_import import FIELD_TO_LABEL, convert_row
+
+
+def validation_message(row_index: int, exc: ValidationError) -> str:
+    error_msgs = '; '.join(
+        [f"{FIELD_TO_LABEL.get(err['loc'][-1], err['loc'][-1])}: {err['msg']}" for err in exc.errors()]
+    )
+    return f'第 {row_index} 行数据校验失败：{error_msgs}'
+
+
+def validate_rows(
+    column_map: Dict[int, str],
+    rows: List[Tuple[int, Tuple[Any, ...], str]],
+) -> List[Tuple[int, Optional[Dict[str, Any]], Any, Optional[str]]]:
+    """
+    转换并校验一批原始行（可在子进程中执行）
+    rows: [(行号, 原始单元格值, 'create' | 'update')]
+    返回 [(行号, 字段字典, 校验后的 Schema 实例, 错误信息)]，空行的字段字典为 None
+    """
+    results = []
+    for row_index, raw_row, kind in rows:
+        try:
+            record = convert_row(column_map, row_index, raw_row)
+        except ValueError as exc:
+            results.append((row_index, None, None, str(exc)))
+            continue
+        if record is None:
+            results.append((row_index, None, None, None))
+            continue
+
+        record['approval_status'] = record.get('approval_status') or "approved"
+        if not record.get('teacher_code'):
+            results.append((row_index, record, None, f'第 {row_index} 行缺少工号，已跳过'))
+            continue
+        try:
+            payload = ContractCreate(**record) if kind == 'create' else ContractUpdate(**record)
+        except ValidationError as exc:
+            results.append((row_index, record, None, validation_message(row_index, exc)))
+            continue
+        results.append((row_index, record, payload, None))
+    return results
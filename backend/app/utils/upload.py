@@ -0,0 +1,220 @@
+"""
+上传接收
+- UploadSizeLimitMiddleware 在 Starlette 解析 multipart、把请求体写入临时文件之前限制请求体大小
+- receive_upload 直接使用 Starlette 缓存上传内容的临时文件，校验大小并计算摘要，不再复制一份
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from contextlib import asynccontextmanager
+from typing import IO, AsyncIterator, BinaryIO, Collection, Dict, Iterator, Optional, Tuple, Union
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# multipart 边界、表单头与其他表单字段占用的余量
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadRejected(ValueError):
+    """上传内容不符合要求（为空或超过大小限制）"""
+
+
+class _RequestTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """
+    限制请求体大小：声明的 Content-Length 超限时不读取请求体直接返回 413；
+    未声明长度（分块传输）时边接收边计数，超限立即停止接收，剩余内容不会再写入磁盘
+    limits: 路径 -> 上限（字节），其余请求使用 default_limit
+    """
+
+    def __init__(self, app: ASGIApp, *, default_limit: int, limits: Optional[Dict[str, int]] = None) -> None:
+        self.app = app
+        self.default_limit = default_limit
+        self.limits = limits or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(scope["path"].rstrip("/"), self.default_limit)
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > limit:
+                    await self._reject(scope, receive, send, limit)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise _RequestTooLarge()
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            # 超限后丢弃应用自身的响应（解析失败时 FastAPI 会返回 400），统一返回 413
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _RequestTooLarge:
+            pass
+        if exceeded:
+            await self._reject(scope, receive, send, limit)
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, limit: int) -> None:
+        response = JSONResponse(
+            {"detail": f"上传内容超过大小限制（{limit // (1024 * 1024)} MB）"},
+            status_code=413,
+            headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)
+
+
+class ReceivedUpload:
+    """
+    已接收的上传内容，退出 receive_upload 后失效
+    内容直接从 Starlette 的上传临时文件读取；需要文件路径时（OCR 引擎按路径读取）才写出一个命名临时文件
+    """
+
+    def __init__(self, file: BinaryIO, *, filename: str, size: int, checksum: str, suffix: str = "") -> None:
+        self.filename = filename
+        self.size = size
+        self.checksum = checksum
+        self._file = file
+        self._suffix = suffix
+        self._path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def open(self) -> BinaryIO:
+        """返回定位到开头的上传内容（同一个文件对象，不要并发读取）"""
+        self._file.seek(0)
+        return self._file
+
+    @property
+    def path(self) -> str:
+        with self._lock:
+            if self._path is None:
+                with tempfile.NamedTemporaryFile(delete=False, suffix=self._suffix) as temp_file:
+                    self._path = temp_file.name
+                    shutil.copyfileobj(self.open(), temp_file, UPLOAD_CHUNK_SIZE)
+            return self._path
+
+    def discard(self) -> None:
+        if self._path is not None:
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+            self._path = None
+
+
+@asynccontextmanager
+async def receive_upload(
+    file: UploadFile,
+    *,
+    max_size: Optional[int] = None,
+    suffix: str = "",
+    filename: Optional[str] = None,
+) -> AsyncIterator[ReceivedUpload]:
+    """
+    校验已接收上传的大小并计算摘要（在线程池中读取，不阻塞事件循环）
+    请求体在解析前已由 UploadSizeLimitMiddleware 限制；这里按单个文件的上限再次校验
+    文件为空或超过大小限制时抛出 UploadRejected
+    """
+    limit = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+
+    def inspect() -> Tuple[int, str]:
+        source = file.file
+        source.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+            size += len(chunk)
+            if size > limit:
+                raise UploadRejected("文件大小超过限制")
+            digest.update(chunk)
+        return size, digest.hexdigest()
+
+    size, checksum = await run_in_threadpool(inspect)
+    if size == 0:
+        raise UploadRejected("文件内容为空")
+
+    upload = ReceivedUpload(
+        file.file,
+        filename=filename or file.filename or "upload",
+        size=size,
+        checksum=checksum,
+        suffix=suffix,
+    )
+    try:
+        yield upload
+    finally:
+        await run_in_threadpool(upload.discard)
+
+
+def iter_zip_members(
+    source: Union[str, IO[bytes]],
+    *,
+    extensions: Collection[str],
+    max_member_size: Optional[int] = None,
+) -> Iterator[Tuple[str, IO[bytes]]]:
+    """
+    遍历 zip 中扩展名符合要求的文件，返回 (文件名, 可读流)；跳过目录与 macOS 元数据
+    单个文件解压后超过大小限制时抛出 UploadRejected（读取量受 zip 中声明的大小约束）
+    """
+    limit = settings.MAX_UPLOAD_SIZE if max_member_size is None else max_member_size
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise UploadRejected("压缩包已损坏或不是 zip 格式")
+
+    with archive:
+        for member in archive.infolist():
+            if member.is_dir() or member.filename.startswith("__MACOSX/"):
+                continue
+            filename = _zip_member_name(member)
+            if os.path.splitext(filename)[1].lower() not in extensions:
+                continue
+            if member.file_size > limit:
+                raise UploadRejected(f"压缩包内文件 {filename} 超过大小限制")
+            with archive.open(member) as stream:
+                yield filename, stream
+
+
+def _zip_member_name(member: zipfile.ZipInfo) -> str:
+    name = member.filename
+    # 未设置 UTF-8 标志的文件名按 cp437 解码，Windows 中文系统打包的 zip 实际为 GBK
+    if not member.flag_bits & 0x800:
+        try:
+            name = name.encode("cp437").decode("gbk")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return os.path.basename(name.rstrip("/"))
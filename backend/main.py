@@ -5,8 +5,10 @@ import logging
 from logging.config import dictConfig
 from pathlib import Path
 
+from anyio import to_thread
 from sqlalchemy import text
 
+from app.config import settings
 from app.database import engine, Base, SessionLocal
 from app.routers import (
     contracts_router,
@@ -17,7 +19,12 @@ from app.routers import (
     profile_router,
     announcement_router,
     operations_router,
+    jobs_router,
 )
+from app.ocr.ocr_worker_pool import ocr_worker_pool
+from app.services.file_storage_service import file_storage_service
+from app.services.ocr_cache_service import OcrCacheService
+from app.utils.upload import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
 
 
 def setup_logging() -> None:
@@ -94,7 +101,7 @@ logger = logging.getLogger("app")
 
 # 数据库补丁：确保新增列存在
 def ensure_contract_columns() -> None:
-    """确保 contracts 表的审批相关字段存在并具备默认值。"""
+    """确保 contracts 表的审批相关字段、默认值、分页索引（created_at 非空）及盲索引列存在。"""
     with engine.begin() as conn:
         conn.execute(text(
             "ALTER TABLE IF EXISTS contracts ADD COLUMN IF NOT EXISTS approval_status VARCHAR(20)"
@@ -108,14 +115,61 @@ def ensure_contract_columns() -> None:
         conn.execute(text(
             "UPDATE contracts SET approval_status = 'pending' WHERE approval_status IS NULL"
         ))
+        conn.execute(text(
+            "UPDATE contracts SET created_at = COALESCE(updated_at, now()) WHERE created_at IS NULL"
+        ))
+        conn.execute(text(
+            "ALTER TABLE IF EXISTS contracts ALTER COLUMN created_at SET NOT NULL"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_contracts_created_at_id ON contracts (created_at, id)"
+        ))
+        for column in ("id_number_bidx", "phone_number_bidx", "emergency_phone_bidx"):
+            conn.execute(text(
+                f"ALTER TABLE IF EXISTS contracts ADD COLUMN IF NOT EXISTS {column} VARCHAR(64)"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_contracts_{column} ON contracts ({column})"
+            ))
+
+
+def ensure_search_indexes() -> None:
+    """为合同搜索字段创建 pg_trgm GIN 索引，使 LIKE '%关键词%' 查询可走索引。"""
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for column in ("name", "teacher_code", "department"):
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_contracts_{column}_trgm "
+                    f"ON contracts USING gin ({column} gin_trgm_ops)"
+                ))
+    except Exception as e:
+        logger.warning(f"搜索索引创建失败，合同搜索将退回普通 LIKE 查询（非致命错误）: {e}")
+
+
+def ensure_contract_stats() -> None:
+    """首次部署时根据现有合同生成 contract_stats 汇总表。"""
+    from app.services.contract_stats_service import ContractStatsService
+    try:
+        with SessionLocal() as session:
+            ContractStatsService.ensure_initialized(session)
+    except Exception as e:
+        logger.warning(f"合同统计汇总表初始化失败，可运行 python -m scripts.contract_stats rebuild 手动重建: {e}")
 
 
 # 创建数据库表
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # 同步路由处理函数（数据库、加解密、Excel、OCR）均在该线程池中执行，不阻塞事件循环
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_WORKERS
+
     # 启动时创建表
     Base.metadata.create_all(bind=engine)
     ensure_contract_columns()
+    ensure_search_indexes()
+    ensure_contract_stats()
     
     # 初始化字段配置（容错处理）
     try:
@@ -127,8 +181,35 @@ async def lifespan(app: FastAPI):
         logger.warning(f"字段配置初始化失败（非致命错误）: {e}")
     
     logger.info("数据库结构初始化完成")
+
+    # 恢复上次未完成的后台任务（容错处理）
+    from app.services.job_service import JobService
+    try:
+        with SessionLocal() as session:
+            JobService.ensure_file_references(session)
+    except Exception as e:
+        logger.warning(f"后台任务文件引用补写失败（非致命错误）: {e}")
+    try:
+        JobService.recover_interrupted()
+    except Exception as e:
+        logger.warning(f"后台任务恢复失败（非致命错误）: {e}")
+    try:
+        with SessionLocal() as session:
+            JobService.purge_finished(session)
+    except Exception as e:
+        logger.warning(f"过期后台任务清理失败（非致命错误）: {e}")
+
+    # 启动 OCR 工作进程并在后台预热模型，避免首个上传请求承担模型加载耗时
+    if settings.OCR_ENABLED:
+        try:
+            ocr_worker_pool.start()
+        except Exception as e:
+            logger.warning(f"OCR 工作进程启动失败，将在 API 进程内识别（非致命错误）: {e}")
+
     yield
-    # 关闭时的清理工作（如果需要）
+    # 关闭时停止后台任务线程池与 OCR 工作进程
+    JobService.shutdown()
+    ocr_worker_pool.shutdown()
 
 app = FastAPI(
     title="教师合同管理系统 API",
@@ -147,6 +228,16 @@ allowed_origins = [
     "http://127.0.0.1:8000",
     # "http://192.168.110.252:8000",
 ]
+# 请求体大小限制需在 CORS 之内，413 响应才带有跨域头
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    default_limit=settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+    limits={
+        "/api/jobs/ocr/batch": settings.OCR_BATCH_MAX_ARCHIVE_SIZE + MULTIPART_OVERHEAD,
+        "/api/jobs/import": settings.IMPORT_MAX_SIZE + MULTIPART_OVERHEAD,
+        "/api/contracts/import": settings.IMPORT_MAX_SIZE + MULTIPART_OVERHEAD,
+    },
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -165,6 +256,7 @@ app.include_router(settings_router, prefix="/api", tags=["settings"])
 app.include_router(profile_router, prefix="/api", tags=["profile"])
 app.include_router(announcement_router, prefix="/api", tags=["announcements"])
 app.include_router(operations_router, prefix="/api", tags=["operations"])
+app.include_router(jobs_router, prefix="/api", tags=["jobs"])
 
 @app.get("/")
 async def root():
@@ -176,4 +268,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    limiter = to_thread.current_default_thread_limiter()
+    return {
+        "status": "healthy",
+        "threadpool": {"total": limiter.total_tokens, "busy": limiter.borrowed_tokens},
+        "ocr_workers": ocr_worker_pool.stats(),
+        "ocr_cache": OcrCacheService.stats(),
+        "attachment_cache": file_storage_service.cache_stats(),
+    }
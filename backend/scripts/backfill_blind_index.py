@@ -0,0 +1,44 @@
+"""
+为已有合同回填身份证号、电话的盲索引列
+
+    python -m scripts.backfill_blind_index            # 只处理缺少盲索引的行，可重复运行
+    python -m scripts.backfill_blind_index --all      # 更换 BLIND_INDEX_KEY 后全量重算
+
+在 backend 目录下运行，使用 .env / 环境变量中的 DATABASE_URL。
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import app.models  # noqa: F401  注册全部模型，保证外键可解析
+from app.database import SessionLocal
+from app.services.blind_index_service import BlindIndexService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="回填合同盲索引")
+    parser.add_argument("--all", action="store_true", help="全量重算所有行")
+    parser.add_argument("--batch-size", type=int, default=BlindIndexService.BATCH_SIZE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def report(scanned: int, updated: int) -> None:
+        elapsed = time.perf_counter() - started
+        print(f"已扫描 {scanned} 行，更新 {updated} 行，{scanned / elapsed:.0f} 行/秒")
+
+    with SessionLocal() as db:
+        result = BlindIndexService.backfill(
+            db,
+            recompute=args.all,
+            batch_size=args.batch_size,
+            progress=report,
+        )
+    print(f"完成：扫描 {result['scanned']} 行，更新 {result['updated']} 行")
+    if result['undecryptable']:
+        print(f"有 {result['undecryptable']} 个字段无法解密，盲索引保持为空，详见日志")
+
+
+if __name__ == "__main__":
+    main()
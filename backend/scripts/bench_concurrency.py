@@ -0,0 +1,161 @@
+"""
+OCR 上传期间的接口延迟基准测试
+
+先在空闲状态下并发请求 GET /api/contracts 一段时间，再在持续上传合同文件进行 OCR 识别
+（POST /api/contracts/upload）的同时重复同样的请求，对比两个阶段的 p50/p95/p99 延迟。
+处理函数阻塞事件循环时，第二阶段的 p99 会接近单次 OCR 的耗时。
+
+针对运行中的服务（需要已启用 OCR），在 backend 目录下运行：
+    python -m scripts.bench_concurrency --base-url http://127.0.0.1:8000 \\
+        --username admin --password ****** --file samples/contract.pdf --duration 30
+
+上传的文件会按内容存储为合同文件但不会创建合同，测试后可运行
+python -m scripts.gc_contract_files 清理。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import mimetypes
+import os
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+def _request(url: str, *, data: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None, timeout: float = 600):
+    request = urllib.request.Request(url, data=data, headers=headers or {}, method="POST" if data else "GET")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def _login(base_url: str, username: str, password: str) -> str:
+    body = json.dumps({"username": username, "password": password}).encode("utf-8")
+    payload = _request(f"{base_url}/api/auth/login", data=body, headers={"Content-Type": "application/json"})
+    return json.loads(payload)["access_token"]
+
+
+def _multipart(path: str) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    filename = os.path.basename(path)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    with open(path, "rb") as source:
+        content = source.read()
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _poll_contracts(url: str, headers: Dict[str, str], stop: threading.Event) -> tuple[List[float], int]:
+    timings: List[float] = []
+    errors = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            _request(url, headers=headers, timeout=120)
+        except (urllib.error.URLError, OSError):
+            errors += 1
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, errors
+
+
+def _run_phase(url: str, headers: Dict[str, str], concurrency: int, duration: float) -> tuple[List[float], int]:
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(_poll_contracts, url, headers, stop) for _ in range(concurrency)]
+        time.sleep(duration)
+        stop.set()
+        results = [future.result() for future in futures]
+    timings = [value for samples, _ in results for value in samples]
+    return timings, sum(errors for _, errors in results)
+
+
+def _upload_loop(url: str, headers: Dict[str, str], body: bytes, stop: threading.Event, durations: List[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            _request(url, data=body, headers=headers)
+        except (urllib.error.URLError, OSError) as exc:
+            print(f"OCR 上传失败: {exc}")
+            return
+        durations.append(time.perf_counter() - started)
+
+
+def _report(label: str, timings: List[float], errors: int, duration: float) -> None:
+    if not timings:
+        print(f"{label:<12}{'无成功请求':>10}{errors:>8}")
+        return
+    print(
+        f"{label:<12}{len(timings) / duration:>10.1f}{errors:>8}"
+        f"{statistics.median(timings):>10.1f}{_percentile(timings, 95):>10.1f}"
+        f"{_percentile(timings, 99):>10.1f}{max(timings):>10.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OCR 上传期间的接口延迟基准测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="服务地址")
+    parser.add_argument("--username", required=True, help="具有合同读取与创建权限的账号")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--file", required=True, help="用于 OCR 上传的合同文件（pdf/jpg/png）")
+    parser.add_argument("--duration", type=float, default=30, help="每个阶段的持续时间（秒）")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发请求合同列表的客户端数")
+    parser.add_argument("--uploads", type=int, default=1, help="同时进行的 OCR 上传数")
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip("/")
+    headers = {"Authorization": f"Bearer {_login(base_url, args.username, args.password)}"}
+    list_url = f"{base_url}/api/contracts?page=1&page_size={args.page_size}"
+    body, content_type = _multipart(args.file)
+
+    print(f"合同列表并发 {args.concurrency}，每阶段 {args.duration:.0f} 秒，OCR 上传并发 {args.uploads}")
+    print(f"{'阶段':<12}{'请求/秒':>10}{'失败':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+    idle_timings, idle_errors = _run_phase(list_url, headers, args.concurrency, args.duration)
+    _report("空闲", idle_timings, idle_errors, args.duration)
+
+    stop = threading.Event()
+    upload_durations: List[float] = []
+    upload_headers = {**headers, "Content-Type": content_type}
+    uploaders = [
+        threading.Thread(
+            target=_upload_loop,
+            args=(f"{base_url}/api/contracts/upload", upload_headers, body, stop, upload_durations),
+            daemon=True,
+        )
+        for _ in range(args.uploads)
+    ]
+    for uploader in uploaders:
+        uploader.start()
+    try:
+        busy_timings, busy_errors = _run_phase(list_url, headers, args.concurrency, args.duration)
+    finally:
+        stop.set()
+    _report("OCR 上传中", busy_timings, busy_errors, args.duration)
+
+    for uploader in uploaders:
+        uploader.join()
+    if upload_durations:
+        print(f"OCR 上传完成 {len(upload_durations)} 次，平均耗时 {statistics.mean(upload_durations):.1f} 秒")
+    else:
+        print("测试期间没有完成的 OCR 上传，可适当延长 --duration")
+
+
+if __name__ == "__main__":
+    main()
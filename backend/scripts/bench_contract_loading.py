@@ -0,0 +1,167 @@
+"""
+合同查询加载策略基准测试
+
+对比旧的 lazy="joined"（每次查询 LEFT JOIN 附件/生命周期/日志三张表）
+与新的加载策略（列表只取标量列、生命周期视图 selectin 批量加载）
+在列表分页、导出、到期扫描、生命周期四类查询上的取回行数与耗时。
+
+使用内存 SQLite 和合成数据，运行方式（在 backend 目录下）：
+    python -m scripts.bench_contract_loading --contracts 2000 --children 5
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import statistics
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import joinedload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Contract, ContractAttachment, ContractLog, ContractTimeline
+from app.services.contract_service import CONTRACT_LIFECYCLE_LOAD, CONTRACT_LIST_LOAD
+
+# 模拟旧版模型上的 lazy="joined"
+LEGACY_JOINED_LOAD = (
+    joinedload(Contract.attachments),
+    joinedload(Contract.timelines),
+    joinedload(Contract.logs),
+)
+
+
+class _CountingCursor(sqlite3.Cursor):
+    fetched = 0
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _CountingCursor.fetched += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        _CountingCursor.fetched += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        _CountingCursor.fetched += len(rows)
+        return rows
+
+
+class _CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=_CountingCursor):
+        return super().cursor(factory)
+
+
+def _build_session_factory():
+    engine = create_engine(
+        "sqlite://",
+        creator=lambda: sqlite3.connect(":memory:", factory=_CountingConnection, check_same_thread=False),
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def _seed(session_factory, contracts: int, children: int) -> str:
+    today = date.today()
+    with session_factory() as db:
+        for index in range(contracts):
+            contract = Contract(
+                teacher_code=f"B{index:06d}",
+                name=f"教师{index}",
+                department=f"部门{index % 12}",
+                job_status="在职",
+                approval_status="approved",
+                contract_end=today + timedelta(days=index % 120),
+            )
+            contract.attachments = [
+                ContractAttachment(name=f"附件{i}.pdf", file_url=f"2025/01/01/{index}_{i}.pdf", file_type="pdf")
+                for i in range(children)
+            ]
+            contract.timelines = [
+                ContractTimeline(event_type="uploaded", title=f"事件{i}", extra_data={})
+                for i in range(children)
+            ]
+            contract.logs = [
+                ContractLog(action=f"操作{i}", detail="基准测试数据", changes=[])
+                for i in range(children)
+            ]
+            db.add(contract)
+        db.commit()
+        return db.query(Contract.id).first()[0]
+
+
+def _scenarios(contract_id: str):
+    today = date.today()
+
+    def list_page(db, options):
+        return (
+            db.query(Contract)
+            .options(*options)
+            .filter(Contract.approval_status == "approved")
+            .order_by(Contract.created_at.desc())
+            .limit(20)
+            .all()
+        )
+
+    def export_all(db, options):
+        return db.query(Contract).options(*options).filter(Contract.approval_status == "approved").all()
+
+    def expiring(db, options):
+        return (
+            db.query(Contract)
+            .options(*options)
+            .filter(Contract.contract_end >= today, Contract.contract_end <= today + timedelta(days=30))
+            .all()
+        )
+
+    def lifecycle(db, options):
+        contract = db.query(Contract).options(*options).filter(Contract.id == contract_id).first()
+        return [contract.attachments, contract.timelines, contract.logs]
+
+    return [
+        ("列表分页(20条)", list_page, CONTRACT_LIST_LOAD),
+        ("全量导出", export_all, CONTRACT_LIST_LOAD),
+        ("30天到期扫描", expiring, CONTRACT_LIST_LOAD),
+        ("生命周期详情", lifecycle, CONTRACT_LIFECYCLE_LOAD),
+    ]
+
+
+def _measure(session_factory, func, options, repeat: int) -> tuple[int, float]:
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        with session_factory() as db:
+            _CountingCursor.fetched = 0
+            started = time.perf_counter()
+            func(db, options)
+            timings.append((time.perf_counter() - started) * 1000)
+            rows = _CountingCursor.fetched
+    return rows, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="合同查询加载策略基准测试")
+    parser.add_argument("--contracts", type=int, default=2000, help="合成合同数量")
+    parser.add_argument("--children", type=int, default=5, help="每份合同的附件/事件/日志数量")
+    parser.add_argument("--repeat", type=int, default=5, help="每个场景重复次数（取中位数）")
+    args = parser.parse_args()
+
+    session_factory = _build_session_factory()
+    contract_id = _seed(session_factory, args.contracts, args.children)
+
+    print(f"合同 {args.contracts} 份，每份附件/事件/日志各 {args.children} 条")
+    print(f"{'场景':<14}{'旧:行数':>10}{'旧:耗时ms':>12}{'新:行数':>10}{'新:耗时ms':>12}")
+    for label, func, options in _scenarios(contract_id):
+        before_rows, before_ms = _measure(session_factory, func, LEGACY_JOINED_LOAD, args.repeat)
+        after_rows, after_ms = _measure(session_factory, func, options, args.repeat)
+        print(f"{label:<14}{before_rows:>10}{before_ms:>12.1f}{after_rows:>10}{after_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
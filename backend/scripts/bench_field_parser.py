@@ -0,0 +1,100 @@
+"""
+合同字段解析基准测试
+
+用合成的多页合同（每页一张员工信息表加若干段合同正文）对比：
+  - 旧的解析方式：每个字段按标签逐个 re.search 扫描全部文本行
+  - 当前的 FieldParser：一次扫描建立 标签 -> 行号 索引，按字段只访问命中的行
+输出每种页数下的单次解析耗时与每行耗时，用于确认解析耗时随文本量线性增长。
+
+纯 CPU 测试，不需要 OCR 模型，在 backend 目录下运行：
+    python -m scripts.bench_field_parser --pages 1 5 20 --repeat 20
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, List, Optional, Tuple
+
+from app.ocr.field_parser import FIELD_LABELS, SECTION_HEADERS, FieldParser
+
+TextLines = List[Tuple[str, float]]
+
+SAMPLE_VALUES = {
+    'teacher_code': 'T2024001', 'name': '张三', 'gender': '男', 'age': '32', 'nation': '汉族',
+    'id_number': '440101199201011234', 'birthplace': '广东广州', 'political_status': '群众',
+    'department': '数学组', 'position': '教师', 'entry_date': '2020年9月1日', 'phone_number': '13800000000',
+    'education': '本科', 'graduation_school': '华南师范大学', 'major': '数学与应用数学',
+    'contract_start': '2024-09-01', 'contract_end': '2027-08-31', 'address': '广州市天河区某路 1 号',
+}
+
+CLAUSE = (
+    '第{n}条 乙方应遵守甲方依法制定的规章制度，按时完成甲方安排的教育教学工作任务，'
+    '甲方按月足额支付劳动报酬，并依法为乙方缴纳社会保险费。'
+)
+
+
+def build_contract(pages: int, seed: int = 7) -> TextLines:
+    """合成 pages 页合同的 OCR 文本行：首页为信息表，每页约 60 行正文"""
+    rng = random.Random(seed)
+    lines: TextLines = [('劳动合同书', 0.99), ('基础信息', 0.98)]
+    for key, labels, _ in FIELD_LABELS:
+        if key in SAMPLE_VALUES:
+            lines.append((labels[0], round(rng.uniform(0.9, 1.0), 3)))
+            lines.append((SAMPLE_VALUES[key], round(rng.uniform(0.75, 1.0), 3)))
+    clause = 1
+    for _ in range(pages):
+        for _ in range(60):
+            lines.append((CLAUSE.format(n=clause), round(rng.uniform(0.8, 1.0), 3)))
+            clause += 1
+    return lines
+
+
+def legacy_parse(text_lines: TextLines) -> dict:
+    """模拟旧版：每个字段的每个标签都用 re.search 扫描全部文本行（表格形式）"""
+    fields = {}
+    for key, labels, _ in FIELD_LABELS:
+        value: Optional[str] = None
+        for pattern in labels:
+            for index, (text, _) in enumerate(text_lines):
+                if re.search(pattern, text, re.IGNORECASE) and index + 1 < len(text_lines):
+                    next_text = text_lines[index + 1][0]
+                    if next_text.strip() and next_text not in SECTION_HEADERS:
+                        value = next_text.strip()
+                        break
+            if value:
+                break
+        if value:
+            fields[key] = value
+    return fields
+
+
+def _measure(parse: Callable[[TextLines], object], text_lines: TextLines, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(text_lines)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='合同字段解析基准测试')
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--repeat', type=int, default=20, help='每项重复次数（取最快一次）')
+    args = parser.parse_args()
+
+    print(f"{'页数':<6}{'行数':>8}{'旧版 ms':>12}{'当前 ms':>12}{'当前 µs/行':>14}{'加速':>8}")
+    for pages in args.pages:
+        text_lines = build_contract(pages)
+        legacy_ms = _measure(legacy_parse, text_lines, args.repeat)
+        current_ms = _measure(lambda lines: FieldParser(lines).extract_all_fields(), text_lines, args.repeat)
+        print(
+            f"{pages:<6}{len(text_lines):>8}{legacy_ms:>12.2f}{current_ms:>12.2f}"
+            f"{current_ms * 1000 / len(text_lines):>14.2f}{legacy_ms / current_ms:>8.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+OCR 批量推理基准测试
+
+在 CPU 上用不同的批大小（每次送入模型的页数，同时作为文本识别框的批大小）识别同一组页面，
+对比每秒处理页数。页面预先渲染为内存中的数组，计时只包含模型推理与结果解析。
+
+需要安装 PaddleOCR 与 Poppler，在 backend 目录下运行：
+    python -m scripts.bench_ocr_batch --file samples/contract.pdf --batch-sizes 1 4 8
+    python -m scripts.bench_ocr_batch --file samples/page.png --pages 16   # 单张图片重复 16 页
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Any, List
+
+from app.ocr.ocr_engine import PaddleOCREngine
+
+
+def _load_pages(path: str, pages: int) -> List[Any]:
+    engine = PaddleOCREngine(batch_size=1)
+    if os.path.splitext(path)[1].lower() == ".pdf":
+        count = engine.count_pdf_pages(path)
+        rendered = engine.render_pdf_pages(path, 1, count)
+    else:
+        import numpy as np
+        from PIL import Image
+
+        with Image.open(path) as image:
+            rendered = [np.ascontiguousarray(np.asarray(image.convert("RGB"))[:, :, ::-1])]
+    # 页数不足时循环使用已渲染的页面
+    return [rendered[index % len(rendered)] for index in range(pages or len(rendered))]
+
+
+def _measure(pages: List[Any], batch_size: int, repeat: int) -> tuple[float, int]:
+    engine = PaddleOCREngine(batch_size=batch_size)
+    engine.device = "cpu"
+    if not engine.warm_up():
+        raise SystemExit("PaddleOCR 初始化失败，请检查安装与模型目录")
+    # 预热一次，排除首次推理的图优化与内存分配开销
+    engine.process_batch(pages[:batch_size])
+
+    best = float("inf")
+    lines = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = engine.process_batch(pages)
+        best = min(best, time.perf_counter() - started)
+        lines = sum(len(page_lines) for page_lines in results)
+    return len(pages) / best, lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OCR 批量推理基准测试")
+    parser.add_argument("--file", required=True, help="PDF 或图片文件")
+    parser.add_argument("--pages", type=int, default=0, help="参与测试的页数（默认为文件页数）")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3, help="每个批大小重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    pages = _load_pages(args.file, args.pages)
+    print(f"页面 {len(pages)} 页，CPU 推理")
+    print(f"{'批大小':<8}{'页/秒':>10}{'识别行数':>10}")
+    for batch_size in args.batch_sizes:
+        pages_per_second, lines = _measure(pages, batch_size, args.repeat)
+        print(f"{batch_size:<8}{pages_per_second:>10.2f}{lines:>10}")
+
+
+if __name__ == "__main__":
+    main()
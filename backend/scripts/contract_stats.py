@@ -0,0 +1,49 @@
+"""
+合同统计汇总表（contract_stats）维护命令
+
+    python -m scripts.contract_stats rebuild   # 从 contracts 表全量重建
+    python -m scripts.contract_stats check     # 对比汇总表与实时统计，不一致时退出码为 1
+
+在 backend 目录下运行，使用 .env / 环境变量中的 DATABASE_URL。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+import app.models  # noqa: F401  注册全部模型，保证外键可解析
+from app.database import Base, SessionLocal, engine
+from app.services.contract_stats_service import ContractStatsService
+from app.services.dashboard_service import DashboardService
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="合同统计汇总表维护")
+    parser.add_argument("command", choices=("rebuild", "check"))
+    parser.add_argument("--limit", type=int, default=20, help="check 时最多输出的不一致分组数")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables["contract_stats"]])
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            groups = ContractStatsService.rebuild(db)
+            DashboardService.invalidate()
+            print(f"重建完成，共 {groups} 个分组")
+            return 0
+
+        mismatches = ContractStatsService.check(db)
+        if not mismatches:
+            print("汇总表与实时统计一致")
+            return 0
+
+        print(f"发现 {len(mismatches)} 个不一致的分组：")
+        for item in mismatches[:args.limit]:
+            print(json.dumps(item, ensure_ascii=False))
+        print("可运行 python -m scripts.contract_stats rebuild 重建")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
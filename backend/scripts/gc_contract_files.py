@@ -0,0 +1,39 @@
+"""
+清理无引用的内容寻址合同文件
+
+    python -m scripts.gc_contract_files --dry-run    # 只统计，不删除
+    python -m scripts.gc_contract_files              # 删除无引用且超过保护期的文件
+    python -m scripts.gc_contract_files --grace 0    # 不保留保护期（确认没有进行中的上传时使用）
+
+在 backend 目录下运行，使用 .env / 环境变量中的 DATABASE_URL 与 CONTRACT_STORAGE_DIR。
+"""
+from __future__ import annotations
+
+import argparse
+
+import app.models  # noqa: F401  注册全部模型，保证外键可解析
+from app.database import SessionLocal
+from app.services.contract_file_service import ContractFileService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="清理无引用的合同文件")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不删除")
+    parser.add_argument(
+        "--grace",
+        type=int,
+        default=ContractFileService.RELEASE_GRACE_SECONDS,
+        help="最近上传或复用的文件保护期（秒）",
+    )
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        result = ContractFileService.collect_garbage(db, grace_seconds=args.grace, dry_run=args.dry_run)
+    print(
+        f"扫描 {result['scanned']} 个文件，无引用 {result['unreferenced']} 个，"
+        f"{'将删除' if args.dry_run else '已删除'} {result['removed']} 个"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+把历史存储目录（/data/contracts、/app/storage/contracts、/app/storage）中的合同文件迁入主存储目录
+
+    python -m scripts.migrate_storage --dry-run      # 只统计各目录中的文件数
+    python -m scripts.migrate_storage                # 移动到 CONTRACT_STORAGE_DIR
+    python -m scripts.migrate_storage --index-only   # 不移动（如历史目录只读），只写入位置索引
+
+只处理合同、附件与后台任务记录中引用的文件，历史目录中的其他文件不受影响。
+使用 --index-only 时文件位置记录到 CONTRACT_STORAGE_DIR/.locations.json，运行中的服务在下次未命中时自动加载。
+主目录中已存在不同内容的同名文件时以主目录为准，历史副本保持原样并列出路径，需人工核对。
+升级前已上线的旧版本会逐个目录查找，可在升级前先执行本命令。
+
+在 backend 目录下运行，使用 .env / 环境变量中的 DATABASE_URL 与 CONTRACT_STORAGE_DIR。
+"""
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from typing import Iterator
+
+import app.models  # noqa: F401  注册全部模型，保证外键可解析
+from app.database import SessionLocal
+from app.models.background_job import BackgroundJob
+from app.models.contract import Contract
+from app.models.contract_attachment import ContractAttachment
+from app.services.file_storage_service import file_storage_service
+
+
+def _referenced_paths(db) -> Iterator[str]:
+    for column in (Contract.file_url, ContractAttachment.file_url, BackgroundJob.result_file):
+        for (path,) in db.query(column).filter(column.isnot(None), column != "").distinct().yield_per(1000):
+            yield path
+    for params, result in db.query(BackgroundJob.params, BackgroundJob.result).yield_per(1000):
+        params = params or {}
+        if params.get("input_file"):
+            yield params["input_file"]
+        # 批量 OCR 任务：逐个上传的合同文件与逐个保存的识别草稿
+        for entry in params.get("files") or []:
+            if entry.get("input_file"):
+                yield entry["input_file"]
+        for item in (result or {}).get("items") or []:
+            if isinstance(item, dict) and item.get("result_file"):
+                yield item["result_file"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="迁移历史存储目录中的合同文件")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不移动")
+    parser.add_argument("--index-only", action="store_true", help="不移动文件，只记录位置索引")
+    args = parser.parse_args()
+
+    counts: Counter = Counter()
+    with SessionLocal() as db:
+        for relative_path in sorted(set(_referenced_paths(db))):
+            try:
+                status = file_storage_service.migrate_file(
+                    relative_path,
+                    move=not args.index_only,
+                    dry_run=args.dry_run,
+                )
+            except ValueError:
+                status = "invalid"
+                print(f"非法路径，已跳过: {relative_path}")
+            if status == "conflict":
+                print(f"主目录已有不同内容的同名文件，保留主目录文件: {relative_path}")
+            counts[status] += 1
+
+    if not args.dry_run:
+        file_storage_service.save_locations()
+
+    labels = {
+        "in_place": "已在主目录",
+        "legacy": "位于历史目录",
+        "moved": "已移动",
+        "duplicate": "主目录已有相同文件",
+        "indexed": "已记录位置索引",
+        "conflict": "与主目录文件冲突",
+        "missing": "文件不存在",
+        "invalid": "非法路径",
+    }
+    print("，".join(f"{labels[key]} {counts[key]} 个" for key in labels if counts[key]) or "没有需要处理的文件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+把存量合同敏感字段、OCR 结果缓存与合同文件重新加密到当前主密钥（不停机轮换）
+
+轮换步骤：
+    1. 把新密钥写入 ENCRYPTION_KEY / FILE_ENCRYPTION_KEY，原密钥移入
+       ENCRYPTION_OLD_KEYS / FILE_ENCRYPTION_OLD_KEYS（逗号分隔），逐台重启服务；
+       此后新写入使用新密钥，新旧密文都能正常读取
+    2. 运行本命令重新加密存量数据，可随时中断，再次运行会从检查点继续
+       （已完成的部分或主密钥更换后的下一次轮换会自动从头开始）：
+
+        python -m scripts.rotate_keys                  # 字段与文件同时处理
+        python -m scripts.rotate_keys --fields         # 只处理数据库字段（含 OCR 结果缓存）
+        python -m scripts.rotate_keys --files --workers 8
+        python -m scripts.rotate_keys --reset          # 丢弃检查点，从头开始
+
+    3. 完成后清空 *_OLD_KEYS 并再次重启服务
+
+未配置 BLIND_INDEX_KEY 时盲索引密钥由 ENCRYPTION_KEY 派生，字段轮换会同时重算盲索引；
+在重算完成前，按身份证号/电话精确查询可能查不到旧数据。
+
+在 backend 目录下运行，使用 .env / 环境变量中的 DATABASE_URL 与 CONTRACT_STORAGE_DIR。
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+from typing import Any, Dict
+
+import app.models  # noqa: F401  注册全部模型，保证外键可解析
+from app.config import settings
+from app.database import SessionLocal
+from app.services.key_rotation_service import (
+    DEFAULT_CHECKPOINT_PATH,
+    KeyRotationService,
+    RotationCheckpoint,
+)
+
+_print_lock = threading.Lock()
+
+
+def _report(label: str):
+    def report(stats: Dict[str, Any]) -> None:
+        if label == "fields":
+            line = (
+                f"[字段] 已扫描 {stats['scanned']} 行，改写 {stats['rotated']} 行，"
+                f"冲突 {stats['conflicts']} 行，{stats['rows_per_sec']:.0f} 行/秒"
+            )
+        elif label == "ocr_cache":
+            line = (
+                f"[OCR 缓存] 已扫描 {stats['scanned']} 行，改写 {stats['rotated']} 行，"
+                f"删除 {stats['purged']} 行，{stats['rows_per_sec']:.0f} 行/秒"
+            )
+        else:
+            line = (
+                f"[文件] 已扫描 {stats['scanned']} 个，改写 {stats['rotated']} 个，"
+                f"{stats['files_per_sec']:.1f} 个/秒，{stats['mb_per_sec']:.2f} MB/秒"
+            )
+        with _print_lock:
+            print(line)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="重新加密合同字段与文件")
+    parser.add_argument("--fields", action="store_true", help="只处理数据库字段与 OCR 结果缓存")
+    parser.add_argument("--files", action="store_true", help="只处理存储文件")
+    parser.add_argument("--batch-size", type=int, default=KeyRotationService.BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=KeyRotationService.FILE_WORKERS, help="文件重新加密线程数")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="检查点文件路径")
+    parser.add_argument("--reset", action="store_true", help="忽略已有检查点，从头开始")
+    args = parser.parse_args()
+
+    run_fields = args.fields or not args.files
+    run_files = args.files or not args.fields
+
+    checkpoint = RotationCheckpoint(args.checkpoint)
+    if args.reset:
+        checkpoint.reset()
+
+    recompute_blind_index = not settings.BLIND_INDEX_KEY
+    if run_fields and recompute_blind_index:
+        print("未配置 BLIND_INDEX_KEY，盲索引随 ENCRYPTION_KEY 派生，将同时重算盲索引")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, BaseException] = {}
+
+    def run_field_pass() -> None:
+        try:
+            with SessionLocal() as db:
+                results["fields"] = KeyRotationService.rotate_fields(
+                    db,
+                    checkpoint,
+                    recompute_blind_index=recompute_blind_index,
+                    batch_size=args.batch_size,
+                    progress=_report("fields"),
+                )
+                results["ocr_cache"] = KeyRotationService.rotate_ocr_cache(
+                    db,
+                    checkpoint,
+                    batch_size=args.batch_size,
+                    progress=_report("ocr_cache"),
+                )
+        except BaseException as exc:  # noqa: BLE001  在主线程统一报告
+            errors["fields"] = exc
+
+    def run_file_pass() -> None:
+        try:
+            results["files"] = KeyRotationService.rotate_files(
+                checkpoint,
+                workers=args.workers,
+                progress=_report("files"),
+            )
+        except BaseException as exc:  # noqa: BLE001
+            errors["files"] = exc
+
+    threads = []
+    if run_fields:
+        threads.append(threading.Thread(target=run_field_pass, name="rotate-fields"))
+    if run_files:
+        threads.append(threading.Thread(target=run_file_pass, name="rotate-files"))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if "fields" in results:
+        stats = results["fields"]
+        print(
+            f"字段完成：扫描 {stats['scanned']} 行，改写 {stats['rotated']} 行，冲突 {stats['conflicts']} 行，"
+            f"跳过 {stats['skipped']} 个无法解密的值，耗时 {stats['elapsed']:.1f} 秒，{stats['rows_per_sec']:.0f} 行/秒"
+        )
+    if "ocr_cache" in results:
+        stats = results["ocr_cache"]
+        print(
+            f"OCR 缓存完成：扫描 {stats['scanned']} 行，改写 {stats['rotated']} 行，冲突 {stats['conflicts']} 行，"
+            f"删除 {stats['purged']} 行无法解密的记录，耗时 {stats['elapsed']:.1f} 秒"
+        )
+    if "files" in results:
+        stats = results["files"]
+        print(
+            f"文件完成：扫描 {stats['scanned']} 个，改写 {stats['rotated']} 个，失败 {stats['failed']} 个，"
+            f"耗时 {stats['elapsed']:.1f} 秒，{stats['files_per_sec']:.1f} 个/秒，{stats['mb_per_sec']:.2f} MB/秒"
+        )
+    for name, exc in errors.items():
+        print(f"{name} 处理中断：{exc!r}，修复后重新运行即可从检查点继续")
+
+    failed = results.get("files", {}).get("failed", 0)
+    return 1 if errors or failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())